@@ -1,10 +1,34 @@
+import importlib.util
 import os
+import sys
 from pathlib import Path
 
 
 def agent_scripts():
+    """Agent name -> the script defining it; the scripts sit next to this file."""
     root = Path(os.path.dirname(os.path.realpath(__file__)))
     return {
-        "NewAgent": root / "new_agent" / "new_agent.py",
-        "MRBTPAgent": root / "new_agent" / "bt_agent.py"
+        "MRBTPAgent": root / "bt_agent.py",
+        "FullBurgerAgent": root / "mrbtp_agent.py",
     }
+
+
+def load_agent_class(name):
+    """Import the agent script registered under name and return its agent class."""
+    from cooperative_cuisine.base_agent.base_agent import BaseAgent
+
+    script = agent_scripts()[name]
+    # Agent scripts import their helpers (constants, state_model, ...) as
+    # top-level modules from their own directory.
+    if str(script.parent) not in sys.path:
+        sys.path.insert(0, str(script.parent))
+    spec = importlib.util.spec_from_file_location(f"agent_{name}", script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    classes = [
+        obj for obj in vars(module).values()
+        if isinstance(obj, type) and issubclass(obj, BaseAgent) and obj.__module__ == module.__name__
+    ]
+    if not classes:
+        raise ValueError(f"No agent class found in {script}")
+    return classes[-1]
@@ -0,0 +1,130 @@
+import argparse
+import itertools
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from pathlib import Path
+
+from cooperative_cuisine import ROOT_DIR
+from cooperative_cuisine.environment import Environment
+
+from agent_scripts import agent_scripts, load_agent_class
+from episode_stats import EpisodeStats, instrument
+from kitchen_sim import make_sim_environment
+from stepped_runner import run_via_env_stepped
+
+# Fields of an episode result averaged in the aggregated report.
+SUMMARY_FIELDS = ("burgers_served", "meals_served", "time_to_first_serve", "steps", "failures", "wall_time")
+
+
+def make_environment(layout, seed, duration, sim=False):
+    """layout is the name of a layout shipped with cooperative_cuisine or a .layout path."""
+    if str(layout).endswith(".layout"):
+        layout_path = Path(layout)
+    else:
+        layout_path = ROOT_DIR / "configs" / "layouts" / f"{layout}.layout"
+    if sim:
+        return make_sim_environment(layout_path, seed, duration)
+    env = Environment(
+        env_config=ROOT_DIR / "configs" / "environment_config.yaml",
+        layout_config=layout_path,
+        item_info=ROOT_DIR / "configs" / "item_info.yaml",
+        seed=seed,
+    )
+    env.add_player("0")
+    env.env_time_end = env.env_time + timedelta(seconds=duration)
+    return env
+
+
+def run_episode(spec):
+    """Run one episode described by spec and return its result dict."""
+    result = dict(spec)
+    started = time.perf_counter()
+    try:
+        env = make_environment(spec["layout"], spec["seed"], spec["duration"], sim=spec.get("sim", False))
+        env_start = env.env_time
+        agent = load_agent_class(spec["agent"])()
+        agent.own_player_id = "0"
+        stats = EpisodeStats(clock=lambda: (env.env_time - env_start).total_seconds())
+        instrument(agent, stats)
+        if spec.get("stepped", True):
+            run_via_env_stepped(agent, env)
+        else:
+            agent.run_via_env_reference(env)
+        result.update(stats.to_dict())
+    except Exception:
+        result["error"] = traceback.format_exc()
+    result["wall_time"] = time.perf_counter() - started
+    return result
+
+
+def episode_specs(agents, layouts, seeds, duration, stepped=True, sim=False):
+    for episode, (agent, layout, seed) in enumerate(itertools.product(agents, layouts, seeds)):
+        yield {
+            "episode": episode,
+            "agent": agent,
+            "layout": layout,
+            "seed": seed,
+            "duration": duration,
+            "stepped": stepped,
+            "sim": sim,
+        }
+
+
+def summarize(results):
+    """Mean of SUMMARY_FIELDS per (agent, layout), plus failure counts."""
+    groups = {}
+    for r in results:
+        groups.setdefault(f"{r['agent']}/{r['layout']}", []).append(r)
+    summary = {}
+    for key, runs in sorted(groups.items()):
+        ok = [r for r in runs if "error" not in r]
+        entry = {"episodes": len(runs), "errors": len(runs) - len(ok)}
+        for field in SUMMARY_FIELDS:
+            values = [r[field] for r in ok if r.get(field) is not None]
+            entry[field] = sum(values) / len(values) if values else None
+        summary[key] = entry
+    return summary
+
+
+def run_batch(specs, workers=None, report_path="batch_report.jsonl"):
+    """Fan specs out over a process pool, streaming each result to report_path."""
+    results = []
+    with open(report_path, "w") as report, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_episode, spec) for spec in specs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            report.write(json.dumps(result) + "\n")
+            report.flush()
+            status = "ERROR" if "error" in result else f"{result['burgers_served']} burgers"
+            print(f"[{len(results)}/{len(futures)}] {result['agent']} {result['layout']} seed={result['seed']}: {status}")
+        summary = summarize(results)
+        report.write(json.dumps({"summary": summary}) + "\n")
+    return results, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless episodes in parallel.")
+    parser.add_argument("--agents", nargs="+", default=["MRBTPAgent"], choices=sorted(agent_scripts()))
+    parser.add_argument("--layouts", nargs="+", default=["basic"])
+    parser.add_argument("--seeds", type=int, default=4, help="number of seeds per agent/layout")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=200, help="episode length in env seconds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--real-time", action="store_true", help="run against wall-clock time instead of lock-step")
+    parser.add_argument("--report", default="batch_report.jsonl")
+    parser.add_argument("--sim", action="store_true", help="use the in-process kitchen simulator instead of the Environment")
+    args = parser.parse_args()
+
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    specs = list(episode_specs(args.agents, args.layouts, seeds, args.duration, stepped=not args.real_time, sim=args.sim))
+    _, summary = run_batch(specs, workers=args.workers, report_path=args.report)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+from agent_scripts import load_agent_class
+from batch_runner import make_environment
+from episode_stats import EpisodeStats, instrument
+from stepped_runner import DEFAULT_FRAME, run_via_env_stepped
+from trace_log import replay
+
+BENCHMARK_AGENTS = ("MRBTPAgent", "FullBurgerAgent")
+BASELINE_PATH = Path(__file__).parent / "benchmarks" / "baseline.json"
+
+# metric -> True if larger is better; used to decide what counts as a regression.
+METRICS = {
+    "ticks_per_second": True,
+    "latency_p50_us": False,
+    "latency_p95_us": False,
+    "latency_p99_us": False,
+    "alloc_blocks_per_tick": False,
+    "steps_to_first_serve": False,
+    "burgers_per_minute": True,
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def timed(agent, latencies):
+    """Record the wall time of parse_state + manage_tasks for every tick.
+
+    Only the two calls themselves are timed, so wrappers applied later
+    (e.g. EpisodeStats' instrument) stay out of the latency.
+    """
+    parse_state = agent.parse_state
+    manage_tasks = agent.manage_tasks
+    parse_ns = [0]
+
+    def timed_parse_state(state):
+        started = time.perf_counter_ns()
+        parse_state(state)
+        parse_ns[0] = time.perf_counter_ns() - started
+
+    async def timed_manage_tasks(state):
+        started = time.perf_counter_ns()
+        await manage_tasks(state)
+        latencies.append(parse_ns[0] + time.perf_counter_ns() - started)
+
+    agent.parse_state = timed_parse_state
+    agent.manage_tasks = timed_manage_tasks
+
+
+def counted(agent, allocations):
+    """Record the memory blocks each tick leaves allocated (sys.getallocatedblocks).
+
+    This is a count of objects and buffers, not bytes: what a tick keeps
+    alive, so caches filling up and per-tick garbage the collector has
+    not reclaimed yet both show; temporaries freed within the tick do not.
+    """
+    parse_state = agent.parse_state
+    manage_tasks = agent.manage_tasks
+    before = [0]
+
+    def counted_parse_state(state):
+        before[0] = sys.getallocatedblocks()
+        parse_state(state)
+
+    async def counted_manage_tasks(state):
+        await manage_tasks(state)
+        allocations.append(sys.getallocatedblocks() - before[0])
+
+    agent.parse_state = counted_parse_state
+    agent.manage_tasks = counted_manage_tasks
+
+
+def new_agent(name):
+    agent = load_agent_class(name)()
+    agent.own_player_id = "0"
+    return agent
+
+
+def benchmark_agent(name, layout, seed, duration, sim=False):
+    # Pass 1: latency and game progress, without tracing overhead.
+    env = make_environment(layout, seed, duration, sim=sim)
+    env_start = env.env_time
+    agent = new_agent(name)
+    stats = EpisodeStats(clock=lambda: (env.env_time - env_start).total_seconds())
+    latencies = []
+    timed(agent, latencies)
+    instrument(agent, stats)
+    run_via_env_stepped(agent, env)
+
+    # Pass 2: allocations, on an identical episode.
+    env = make_environment(layout, seed, duration, sim=sim)
+    agent = new_agent(name)
+    allocations = []
+    counted(agent, allocations)
+    run_via_env_stepped(agent, env)
+
+    return episode_metrics(latencies, allocations, stats, duration / 60)
+
+
+def benchmark_trace(name, trace_path):
+    """Same metrics as benchmark_agent, with a recorded trace as the input."""
+    agent = new_agent(name)
+    # Recorded ticks are one stepped frame apart.
+    stats = EpisodeStats(clock=lambda: stats.steps * DEFAULT_FRAME.total_seconds())
+    latencies = []
+    timed(agent, latencies)
+    instrument(agent, stats)
+    replay(agent, trace_path)
+
+    agent = new_agent(name)
+    allocations = []
+    counted(agent, allocations)
+    replay(agent, trace_path)
+    return episode_metrics(latencies, allocations, stats, stats.steps * DEFAULT_FRAME.total_seconds() / 60)
+
+
+def episode_metrics(latencies, allocations, stats, minutes):
+    latencies.sort()
+    total_s = sum(latencies) / 1e9
+    return {
+        "ticks": len(latencies),
+        "ticks_per_second": len(latencies) / total_s if total_s else None,
+        "latency_p50_us": percentile(latencies, 50) / 1e3 if latencies else None,
+        "latency_p95_us": percentile(latencies, 95) / 1e3 if latencies else None,
+        "latency_p99_us": percentile(latencies, 99) / 1e3 if latencies else None,
+        "alloc_blocks_per_tick": sum(allocations) / len(allocations) if allocations else None,
+        "steps_to_first_serve": stats.steps_to_first_serve,
+        "burgers_per_minute": stats.burgers_served / minutes if minutes else None,
+        "failures": stats.failures,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List of human-readable regressions of results against baseline."""
+    regressions = []
+    for agent, metrics in results["agents"].items():
+        base = baseline.get("agents", {}).get(agent)
+        if base is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            new, old = metrics.get(metric), base.get(metric)
+            if new is None or old is None:
+                if old is not None and new is None:
+                    regressions.append(f"{agent}.{metric}: {old} -> missing")
+                continue
+            if higher_is_better:
+                worse = new < old * (1 - tolerance)
+            else:
+                worse = new > old * (1 + tolerance)
+            if worse:
+                regressions.append(f"{agent}.{metric}: {old:.4g} -> {new:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agents on a fixed layout and seed.")
+    parser.add_argument("--agents", nargs="+", default=list(BENCHMARK_AGENTS))
+    parser.add_argument("--layout", default="basic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=200, help="episode length in env seconds")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--trace", help="replay this recorded trace instead of running the environment")
+    parser.add_argument("--sim", action="store_true", help="use the in-process kitchen simulator instead of the Environment")
+    args = parser.parse_args()
+
+    results = {
+        "layout": args.layout,
+        "seed": args.seed,
+        "duration": args.duration,
+        "python": platform.python_version(),
+        "trace": args.trace,
+        "sim": args.sim,
+        "agents": {},
+    }
+    for name in args.agents:
+        print(f"Benchmarking {name} ...")
+        if args.trace:
+            results["agents"][name] = benchmark_trace(name, args.trace)
+        else:
+            results["agents"][name] = benchmark_agent(name, args.layout, args.seed, args.duration, sim=args.sim)
+        print(json.dumps(results["agents"][name], indent=2))
+
+    Path(args.out).write_text(json.dumps(results, indent=2))
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"Baseline written to {baseline_path}")
+        return 0
+    return check_baseline(results, baseline_path, args.tolerance)
+
+
+def check_baseline(results, baseline_path, tolerance):
+    """Exit status for results against the baseline file: 0 ok, 1 regressed, 2 no baseline.
+
+    A missing baseline is an error rather than a pass, so a CI job that
+    lost its baseline cannot go green without comparing anything.
+    """
+    if not baseline_path.exists():
+        print(
+            f"ERROR no baseline at {baseline_path}; record one on the reference machine "
+            "with --update-baseline and commit it.",
+            file=sys.stderr,
+        )
+        return 2
+    regressions = compare(results, json.loads(baseline_path.read_text()), tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
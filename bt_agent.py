@@ -1,9 +1,22 @@
+import atexit
+import os
+
 from cooperative_cuisine.base_agent.base_agent import BaseAgent, run_agent_from_args
 from cooperative_cuisine.base_agent.agent_task import Task, TaskStatus
 import py_trees
 import numpy as np
 from cooperative_cuisine.action import ActionType
-from constants import TASK_POSITIONS
+from constants import KITCHEN_POSITIONS, PLATE_STATIONS, TASK_POSITIONS
+from state_model import KitchenState
+from navigation import get_navigation
+from bt_profiler import TreeProfiler
+from recipe_compiler import RecipeBook
+from layout_analyzer import layout_for_state
+from pipeline import PLATE
+from route_optimizer import RouteOptimizer, plate_candidates
+from scheduler import COLLECT, PREP, Scheduler
+from path_planner import ARRIVED, MOVE_SECONDS, WAIT, env_seconds, get_path_planner
+from intention_broker import get_intention_manager
 
 # ==============================================================================
 # Behaviors
@@ -20,8 +33,8 @@ class GoTo(py_trees.behaviour.Behaviour):
 
     def initialise(self):
         self.logger.debug(f"  >{self.name}.initialise()")
-        if isinstance(self.position, str) and self.position in TASK_POSITIONS:
-            pos = TASK_POSITIONS[self.position]
+        if isinstance(self.position, str) and self.position in self.agent.task_positions:
+            pos = self.agent.task_positions[self.position]
         elif isinstance(self.position, str) and hasattr(self.agent, self.position):
              pos = getattr(self.agent, self.position)
         else:
@@ -80,6 +93,16 @@ class Interact(py_trees.behaviour.Behaviour):
         self.logger.debug(f"  >{self.name}.terminate({new_status})")
 
 
+def holds(item, item_type):
+    """True if item is item_type or is equipment (a pan) holding it."""
+    if item.get("type") == item_type:
+        return True
+    ready = item.get("content_ready")
+    if ready and ready.get("type") == item_type:
+        return True
+    return any(content.get("type") == item_type for content in item.get("content_list") or ())
+
+
 class HasItem(py_trees.behaviour.Behaviour):
     def __init__(self, agent, should_have, item_type=None, name="HasItem"):
         super(HasItem, self).__init__(name)
@@ -92,29 +115,31 @@ class HasItem(py_trees.behaviour.Behaviour):
         if self.should_have != has_item:
             return py_trees.common.Status.FAILURE
         
-        if self.item_type and (not has_item or self.agent.held_item.get("type") != self.item_type):
+        if self.item_type and (not has_item or not holds(self.agent.held_item, self.item_type)):
             return py_trees.common.Status.FAILURE
             
         return py_trees.common.Status.SUCCESS
 
+class WaitForItem(py_trees.behaviour.Behaviour):
+    """RUNNING until item_type is ready at a station, e.g. a patty cooked in the pan."""
+    def __init__(self, agent, position, item_type, name="WaitForItem"):
+        super(WaitForItem, self).__init__(name)
+        self.agent = agent
+        self.position = position
+        self.item_type = item_type
+
+    def update(self):
+        if self.agent.kitchen.item_ready(self.agent.task_positions[self.position], self.item_type):
+            return py_trees.common.Status.SUCCESS
+        return py_trees.common.Status.RUNNING
+
 class FindFreeCounter(py_trees.behaviour.Behaviour):
     def __init__(self, agent, name="FindFreeCounter"):
         super(FindFreeCounter, self).__init__(name)
         self.agent = agent
 
     def update(self):
-        free_counter_pos = None
-        for c in self.agent.state_counters:
-            if (
-                c.get("occupied_by") is None
-                and c.get("type") not in ("CuttingBoard", "Pan")
-            ):
-                free_counter_pos = np.array(c["pos"])
-                break
-        if free_counter_pos is None:
-            free_counter_pos = np.array(TASK_POSITIONS["CUTTING_BOARD_1"])
-        
-        self.agent.plate_counter_pos = free_counter_pos
+        self.agent.plate_counter_pos = self.agent.find_free_counter()
         return py_trees.common.Status.SUCCESS
 
 # ==============================================================================
@@ -122,14 +147,74 @@ class FindFreeCounter(py_trees.behaviour.Behaviour):
 # ==============================================================================
 
 class BTAgent(BaseAgent):
-    def __init__(self, *args, **kwargs):
+    # Tick anyway after this many unchanged steps, as a safety net.
+    max_skipped_ticks = 30
+
+    def __init__(self, *args, intention_manager=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.behaviour_tree = self.create_behaviour_tree()
+        # Carries the shared path reservations; process-wide unless given.
+        self.intention_manager = intention_manager if intention_manager is not None else get_intention_manager()
+        self.kitchen = KitchenState()
+        # Filled in place from the state arrays on every tick; current_agent_pos
+        # gets a copy, so positions kept elsewhere (plans, traces) never change.
+        self._pos = np.zeros(2)
+        # Replaced by positions derived from the real kitchen on the first state.
+        self.layout = None
+        self.task_positions = TASK_POSITIONS
+        self.navigation = get_navigation()
+        self.path_planner = get_path_planner(self.navigation, self.intention_manager)
+        self.route = RouteOptimizer(self.navigation, self.task_positions, plate_candidates(KITCHEN_POSITIONS, TASK_POSITIONS))
+        self._route_models = {}
+        self.recipe_book = RecipeBook.load_default()
+        self.scheduler = Scheduler(self.recipe_book, self.navigation, self.task_positions)
+        self.current_meal = "Burger"
+        self._trees = {}
+        self.profiler = None
+        self.behaviour_tree = self.tree_for(self.current_meal)
         self.plate_counter_pos = None
-
-    def create_behaviour_tree(self):
-        
-        root = py_trees.composites.Sequence(name="BurgerMaking", memory=True)
+        self._last_fingerprint = None
+        self._skipped_ticks = 0
+        # MRBTP_BT_PROFILE=<prefix> profiles every tick and writes
+        # <prefix>.folded / <prefix>.txt on exit.
+        profile_prefix = os.environ.get("MRBTP_BT_PROFILE")
+        if profile_prefix:
+            self.profiler = TreeProfiler(self.behaviour_tree).enable()
+            atexit.register(self.dump_profile, profile_prefix)
+
+    def dump_profile(self, prefix):
+        self.profiler.write_collapsed(f"{prefix}.folded")
+        with open(f"{prefix}.txt", "w") as f:
+            f.write(self.profiler.summary() + "\n")
+
+    def load_recipes(self, recipe_book):
+        """Switch to another RecipeBook; compiled trees are rebuilt on demand."""
+        self.recipe_book = recipe_book
+        self.scheduler = Scheduler(recipe_book, self.navigation, self.task_positions)
+        self._trees.clear()
+        self.behaviour_tree = self.tree_for(self.current_meal)
+
+    def tree_for(self, meal):
+        """Compiled tree for meal, built once and reused for every order of it."""
+        tree = self._trees.get(meal)
+        if tree is None:
+            tree = self._trees[meal] = self.create_behaviour_tree(meal)
+            if self.profiler is not None:
+                self.profiler.attach(tree)
+        return tree
+
+    def select_meal(self, state):
+        """Point the tree at the first open order this kitchen can make."""
+        for order in state.get("orders", ()):
+            meal = order.get("meal")
+            if meal and meal in self.recipe_book.meals() and self.recipe_book.can_make(meal, self.task_positions):
+                if meal != self.current_meal:
+                    self.current_meal = meal
+                    self.behaviour_tree = self.tree_for(meal)
+                return
+
+    def create_behaviour_tree(self, meal="Burger"):
+        sections, station = self.recipe_book.plan(meal)
+        root = py_trees.composites.Sequence(name=f"{meal}Making", memory=True)
 
         # 1. Get Plate
         get_plate = py_trees.composites.Sequence(name="GetPlate", memory=True)
@@ -138,60 +223,125 @@ class BTAgent(BaseAgent):
         get_plate.add_child(Put(self))
         get_plate.add_child(HasItem(self, should_have=True, item_type="Plate"))
 
+        serve = py_trees.composites.Sequence(name="Serve", memory=True)
+        if station is None:
+            # 2. Place Plate
+            place_plate = py_trees.composites.Sequence(name="PlacePlate", memory=True)
+            place_plate.add_child(HasItem(self, should_have=True, item_type="Plate"))
+            place_plate.add_child(FindFreeCounter(self))
+            place_plate.add_child(GoTo(self, "plate_counter_pos"))
+            place_plate.add_child(Put(self))
+            place_plate.add_child(HasItem(self, should_have=False))
+            root.add_children([get_plate, place_plate])
+
+            # 3. Prepare every ingredient and put it on the plate, starting
+            #    long cooks first and doing other prep while they run.
+            for segment in self.order_segments(meal, self.scheduler.schedule(meal)):
+                prefix = {PREP: "Process", COLLECT: "Collect"}.get(segment.kind, "Start")
+                seq = py_trees.composites.Sequence(name=f"{prefix}_{segment.need}", memory=True)
+                seq.add_children(self._instantiate(segment.ops))
+                if segment.kind == PREP:
+                    seq.add_child(self._create_place_item_sequence(segment.need, "plate_counter_pos"))
+                elif segment.kind == COLLECT:
+                    # Picking up at the station lifts the pan with the item in
+                    # it: tip it onto the plate, then take the pan back.
+                    seq.add_child(self._create_place_item_sequence(
+                        segment.need, "plate_counter_pos", final_placement=False
+                    ))
+                    seq.add_child(self._create_return_sequence(segment.ops[-1][2]))
+                root.add_child(seq)
+
+            # 4. The meal is assembled on the counter; pick it up from the same spot.
+            serve.add_child(GoTo(self, "plate_counter_pos"))
+            serve.add_child(Put(self))
+            serve.add_child(HasItem(self, should_have=True, item_type=meal))
+        else:
+            # Meals made in equipment (e.g. soups): fill the station, then plate up from it.
+            for need, ops in sections:
+                seq = py_trees.composites.Sequence(name=f"Process_{need}", memory=True)
+                seq.add_children(self._instantiate(ops))
+                seq.add_child(self._create_place_item_sequence(need, station))
+                root.add_child(seq)
+            # The station cooks the meal on its own; only fetch the plate once it is done.
+            wait_meal = py_trees.composites.Sequence(name=f"Wait_{meal}", memory=True)
+            wait_meal.add_child(HasItem(self, should_have=False))
+            wait_meal.add_child(GoTo(self, station))
+            wait_meal.add_child(WaitForItem(self, station, meal))
+            root.add_child(wait_meal)
+            root.add_child(get_plate)
+            serve.add_child(GoTo(self, station))
+            serve.add_child(Put(self))
+            serve.add_child(HasItem(self, should_have=True))
+
+        # Now holding the meal, go to serving window and drop it.
+        serve.add_child(GoTo(self, "SERVING_WINDOW"))
+        serve.add_child(Put(self))
+        serve.add_child(HasItem(self, should_have=False))
+        root.add_child(serve)
 
-        # 2. Place Plate
-        place_plate = py_trees.composites.Sequence(name="PlacePlate", memory=True)
-        place_plate.add_child(HasItem(self, should_have=True, item_type="Plate"))
-        place_plate.add_child(FindFreeCounter(self))
-        place_plate.add_child(GoTo(self, "plate_counter_pos"))
-        place_plate.add_child(Put(self))
-        place_plate.add_child(HasItem(self, should_have=False))
-
-        # 3. Get & Place Bun
-        get_bun = self._create_get_and_place_item_sequence("Bun", "GET_BUN")
-        
-        # 4. Get, Cut & Place Lettuce
-        get_lettuce = self._create_get_cut_and_place_item_sequence("Lettuce", "GET_LETTUCE", "CUTTING_BOARD_1")
-
-        # 5. Get, Cut & Place Tomato
-        get_tomato = self._create_get_cut_and_place_item_sequence("Tomato", "GET_TOMATO", "CUTTING_BOARD_1")
-
-        # 6. Get, Cut, Cook, Finish & Serve
-        process_and_serve = py_trees.composites.Sequence(name="ProcessMeatAndServe", memory=True)
-        process_and_serve.add_child(self._create_get_and_place_item_sequence("Meat", "GET_MEAT", "CUTTING_BOARD_1", put_on_plate=False))
-        process_and_serve.add_child(self._create_interaction_sequence("RawPatty", "CUTTING_BOARD_1", "Meat"))
-        process_and_serve.add_child(self._create_place_item_sequence("RawPatty", "PAN", final_placement=False))
-        process_and_serve.add_child(self._create_interaction_sequence("CookedPatty", "PAN", "RawPatty"))
-        # Now holding CookedPatty, go place it on the plate.
-        process_and_serve.add_child(GoTo(self, "plate_counter_pos"))
-        process_and_serve.add_child(Put(self))
-        # The Burger is now assembled on the counter. The agent is empty-handed.
-        # Pick up the burger from the same spot.
-        process_and_serve.add_child(Put(self))
-        # Now holding the Burger, go to serving window and drop it.
-        process_and_serve.add_child(HasItem(self, should_have=True, item_type="Burger"))
-        process_and_serve.add_child(GoTo(self, "SERVING_WINDOW"))
-        process_and_serve.add_child(Put(self))
-        process_and_serve.add_child(HasItem(self, should_have=False))
-
-
-        root.add_children([get_plate, place_plate, get_bun, get_lettuce, get_tomato, process_and_serve])
-        
         return py_trees.trees.BehaviourTree(root)
 
-    def _create_get_and_place_item_sequence(self, item_name, get_pos_name, place_pos_name=None, put_on_plate=True):
-        if place_pos_name is None:
-            place_pos_name = "plate_counter_pos"
-            
-        seq = py_trees.composites.Sequence(name=f"GetAndPlace_{item_name}", memory=True)
+    def order_segments(self, meal, segments):
+        """Put the PREP segments in the order that walks least from the best plate counter."""
+        slots, free = [], []
+        for i, segment in enumerate(segments):
+            stops = tuple(op[2] for op in segment.ops)
+            if segment.kind == PREP:
+                stops += (PLATE,)
+            elif segment.kind == COLLECT:
+                stops += (PLATE, stops[-1])
+            if segment.kind == PREP:
+                slots.append(None)
+                free.append((str(i), stops))
+            else:
+                slots.append((str(i), stops))
+        self._route_models[meal] = model = (tuple(slots), tuple(free))
+        ranked = self.route.plan(*model)
+        if not ranked:
+            return segments
+        order = iter(int(name) for name in ranked[0][2])
+        return [segments[next(order)] if segment.kind == PREP else segment for segment in segments]
+
+    def _instantiate(self, ops):
+        """Fresh nodes for a RecipeBook template."""
+        nodes = []
+        for op in ops:
+            if op[0] == "get":
+                nodes.append(self._create_get_item_sequence(op[1], op[2]))
+            elif op[0] == "put_at":
+                nodes.append(self._create_place_item_sequence(op[1], op[2], final_placement=False))
+            elif op[0] == "interact":
+                nodes.append(self._create_interaction_sequence(op[1], op[2], op[3]))
+            elif op[0] == "collect":
+                nodes.append(self._create_collect_sequence(op[1], op[2]))
+        return nodes
+
+    def _create_collect_sequence(self, item_name, station_pos_name):
+        seq = py_trees.composites.Sequence(name=f"Collect_{item_name}", memory=True)
         seq.add_child(HasItem(self, should_have=False))
-        seq.add_child(GoTo(self, get_pos_name))
+        seq.add_child(GoTo(self, station_pos_name))
+        seq.add_child(WaitForItem(self, station_pos_name, item_name))
         seq.add_child(Put(self))
         seq.add_child(HasItem(self, should_have=True, item_type=item_name))
-        seq.add_child(GoTo(self, place_pos_name))
+        return seq
+
+    def _create_return_sequence(self, station_pos_name):
+        """Put whatever is still in hand (the emptied pan) back on its station."""
+        ret = py_trees.composites.Selector(name=f"Return_{station_pos_name}", memory=True)
+        ret.add_child(HasItem(self, should_have=False))
+        put_back = py_trees.composites.Sequence(name=f"PutBack_{station_pos_name}", memory=True)
+        put_back.add_child(GoTo(self, station_pos_name))
+        put_back.add_child(Put(self))
+        put_back.add_child(HasItem(self, should_have=False))
+        ret.add_child(put_back)
+        return ret
+
+    def _create_get_item_sequence(self, item_name, get_pos_name):
+        seq = py_trees.composites.Sequence(name=f"Get_{item_name}", memory=True)
+        seq.add_child(HasItem(self, should_have=False))
+        seq.add_child(GoTo(self, get_pos_name))
         seq.add_child(Put(self))
-        if put_on_plate:
-            seq.add_child(HasItem(self, should_have=False))
+        seq.add_child(HasItem(self, should_have=True, item_type=item_name))
         return seq
 
     def _create_interaction_sequence(self, resulting_item, interaction_pos, initial_item_name):
@@ -206,19 +356,6 @@ class BTAgent(BaseAgent):
         seq.add_child(HasItem(self, should_have=True, item_type=resulting_item))
         return seq
         
-    def _create_get_cut_and_place_item_sequence(self, item_name, get_pos_name, cut_pos_name):
-        seq = py_trees.composites.Sequence(name=f"Process_{item_name}", memory=True)
-        # Get item and place on cutting board
-        seq.add_child(self._create_get_and_place_item_sequence(item_name, get_pos_name, cut_pos_name, put_on_plate=False))
-        # Cut item
-        chopped_item_name = f"Chopped{item_name}"
-        if item_name == "Meat":
-            chopped_item_name = "RawPatty"
-        seq.add_child(self._create_interaction_sequence(chopped_item_name, cut_pos_name, item_name))
-        # Get chopped item and place on plate
-        seq.add_child(self._create_place_item_sequence(chopped_item_name, "plate_counter_pos"))
-        return seq
-
     def _create_place_item_sequence(self, item_to_place, place_pos_name, final_placement=True):
         seq = py_trees.composites.Sequence(name=f"Place_{item_to_place}", memory=True)
         seq.add_child(HasItem(self, should_have=True, item_type=item_to_place))
@@ -228,18 +365,51 @@ class BTAgent(BaseAgent):
             seq.add_child(HasItem(self, should_have=False))
         return seq
 
+    def travel_cost(self, target):
+        """Exact walking steps from the current position to target."""
+        return self.navigation.travel_cost(self.current_agent_pos, target)
+
+    def find_free_counter(self):
+        """Free counter on the shortest route for the current meal, else the least
+        walking to the stations that feed the plate."""
+        model = self._route_models.get(self.current_meal)
+        for _, plate, _ in self.route.plan(*model) if model else ():
+            if self.kitchen.is_free(plate):
+                return np.array(plate, dtype=float)
+        stations = [self.task_positions[name] for name in PLATE_STATIONS if name in self.task_positions]
+        counter = self.kitchen.free_counters.best_for_stations(stations, self.navigation)
+        if counter is None:
+            counter = self.kitchen.free_counters.nearest(self.current_agent_pos, self.navigation)
+        if counter is None:
+            return np.array(self.task_positions["CUTTING_BOARD_1"])
+        return np.array(counter["pos"])
+
+    def use_layout(self, layout):
+        """Switch task positions and path data to a layout derived at runtime."""
+        self.layout = layout
+        if not layout.task_positions:
+            return
+        self.task_positions = layout.task_positions
+        self.navigation = get_navigation(layout.kitchen_positions, layout.task_positions)
+        self.path_planner = get_path_planner(self.navigation, self.intention_manager)
+        self.scheduler = Scheduler(self.recipe_book, self.navigation, self.task_positions)
+        self.route = RouteOptimizer(
+            self.navigation, self.task_positions, plate_candidates(layout.kitchen_positions, layout.task_positions)
+        )
+        # Recompile: segment order depends on the kitchen's geometry.
+        self._route_models.clear()
+        self._trees.clear()
+        self.behaviour_tree = self.tree_for(self.current_meal)
+
     def parse_state(self, state):
+        if self.layout is None and state.get("counters"):
+            self.use_layout(layout_for_state(state))
+        self.kitchen.apply(state)
         self.state_counters = state["counters"]
-        for player in state["players"]:
-            if player["id"] == self.own_player_id:
-                self.current_agent_pos = np.array(player["pos"])
-                self.held_item = player["holding"]
-                if player["current_nearest_counter_id"]:
-                    for counter in self.state_counters:
-                        if counter["id"] == player["current_nearest_counter_id"]:
-                            self.nearest_counter = counter
-                            return
-        self.nearest_counter = None
+        if self.kitchen.player_pos(self.own_player_id, self._pos):
+            self.current_agent_pos = self._pos.copy()
+            self.held_item = self.kitchen.player(self.own_player_id)["holding"]
+        self.nearest_counter = self.kitchen.nearest_counter(self.own_player_id)
 
     async def handle_task(self, state):
         if self.current_task:
@@ -260,8 +430,48 @@ class BTAgent(BaseAgent):
             await self._execute_action(action_type=ActionType.PICK_UP_DROP)
             self.finalize_current_task(TaskStatus.SUCCESS, "Picked up or dropped off")
 
+    async def handle_task_goto(self, state):
+        # Walk cell by cell: alone along the layout's distance field, with
+        # teammates around along the cells reserved in the shared space-time
+        # table. BaseAgent does the final approach and facing.
+        if len(state.get("players", ())) < 2:
+            step = self.navigation.next_step(self.current_agent_pos, self.current_task.task_args)
+        else:
+            step = self.path_planner.next_cell(
+                self.own_player_id, self.current_agent_pos, self.current_task.task_args, env_seconds(state)
+            )
+        if step is None or step == ARRIVED:
+            await super().handle_task_goto(state)
+        elif step != WAIT:
+            direction = np.array(step, dtype=float) - self.current_agent_pos
+            norm = np.linalg.norm(direction)
+            if norm > 0:
+                await self._execute_action(
+                    action_type=ActionType.MOVEMENT, action_data=direction / norm, duration=MOVE_SECONDS
+                )
+
+    def tree_fingerprint(self):
+        """Everything the tree reads; it only needs a tick when this changes."""
+        held = self.held_item.get("type") if self.held_item else None
+        nearest = self.nearest_counter["id"] if self.nearest_counter else None
+        occupancy = tuple(self.kitchen.cell_version(pos) for pos in self.task_positions.values())
+        plate = None
+        if self.plate_counter_pos is not None:
+            plate = (tuple(self.plate_counter_pos), self.kitchen.cell_version(self.plate_counter_pos))
+        return self.current_task is None, held, nearest, occupancy, plate
+
     async def manage_tasks(self, state):
+        running = self.behaviour_tree.root.status == py_trees.common.Status.RUNNING
+        if not running:
+            # Between meals: the next order decides which compiled tree runs.
+            self.select_meal(state)
+        fingerprint = self.tree_fingerprint()
+        if running and fingerprint == self._last_fingerprint and self._skipped_ticks < self.max_skipped_ticks:
+            self._skipped_ticks += 1
+            return
         self.behaviour_tree.tick()
+        self._skipped_ticks = 0
+        self._last_fingerprint = self.tree_fingerprint()
 
 if __name__ == "__main__":
     run_agent_from_args(BTAgent) 
\ No newline at end of file
@@ -0,0 +1,131 @@
+# bt_profiler.py
+
+import collections
+import time
+
+
+class NodeStats:
+    def __init__(self, path):
+        self.path = path
+        self.ticks = 0
+        self.cumulative_ns = 0
+        self.self_ns = 0
+        self.statuses = collections.Counter()
+        self.transitions = collections.Counter()
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "ticks": self.ticks,
+            "cumulative_ms": self.cumulative_ns / 1e6,
+            "self_ms": self.self_ns / 1e6,
+            "statuses": dict(self.statuses),
+            "transitions": {f"{a}->{b}": n for (a, b), n in self.transitions.items()},
+        }
+
+
+class TreeProfiler:
+    """Opt-in per-node timing for a py_trees tree.
+
+    ``enable`` swaps every node's ``tick`` generator for a timed one that
+    records cumulative and self time, tick counts, the status returned and
+    status transitions. ``disable`` restores the original methods, so a
+    tree that is not being profiled runs exactly as before.
+    """
+
+    def __init__(self, tree):
+        self.root = getattr(tree, "root", tree)
+        self.roots = [self.root]
+        self.stats = {}
+        self._stack = []
+        self.enabled = False
+
+    def enable(self):
+        if not self.enabled:
+            for root in self.roots:
+                self._patch(root, ())
+            self.enabled = True
+        return self
+
+    def disable(self):
+        if self.enabled:
+            for root in self.roots:
+                for node in root.iterate():
+                    node.__dict__.pop("tick", None)
+            self.enabled = False
+        return self
+
+    def attach(self, tree):
+        """Profile another tree too, e.g. one compiled for a different meal."""
+        root = getattr(tree, "root", tree)
+        self.roots.append(root)
+        if self.enabled:
+            self._patch(root, ())
+        return self
+
+    def reset(self):
+        for node_stats in self.stats.values():
+            node_stats.__init__(node_stats.path)
+
+    def _patch(self, node, parent_path):
+        path = parent_path + (node.name,)
+        self.stats[node.id] = node_stats = NodeStats(";".join(path))
+        node.tick = self._timed_tick(node, node.tick, node_stats)
+        for child in getattr(node, "children", ()):
+            self._patch(child, path)
+
+    def _timed_tick(self, node, original, node_stats):
+        stack = self._stack
+
+        def tick():
+            before = node.status
+            node_stats.ticks += 1
+            ticking = original()
+            while True:
+                # Children add their elapsed time here so it can be taken out of self time.
+                children_ns = [0]
+                stack.append(children_ns)
+                started = time.perf_counter_ns()
+                try:
+                    item = next(ticking)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed = time.perf_counter_ns() - started
+                    stack.pop()
+                    node_stats.cumulative_ns += elapsed
+                    node_stats.self_ns += elapsed - children_ns[0]
+                    if stack:
+                        stack[-1][0] += elapsed
+                # A node yields itself once its status for this tick is final;
+                # parents may stop iterating right after that.
+                if item is node:
+                    node_stats.statuses[node.status.name] += 1
+                    if node.status != before:
+                        node_stats.transitions[(before.name, node.status.name)] += 1
+                yield item
+
+        return tick
+
+    def collapsed_stacks(self):
+        """Lines of "root;child;leaf self_us" for flamegraph.pl / speedscope."""
+        totals = collections.Counter()
+        for node_stats in self.stats.values():
+            totals[node_stats.path] += node_stats.self_ns // 1000
+        return [f"{path} {us}" for path, us in totals.items() if us > 0]
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            f.write("\n".join(self.collapsed_stacks()) + "\n")
+
+    def summary(self):
+        """Per-node table sorted by cumulative time."""
+        rows = sorted(self.stats.values(), key=lambda s: s.cumulative_ns, reverse=True)
+        lines = [f"{'node':<60} {'ticks':>7} {'running':>8} {'cum ms':>9} {'self ms':>9}  transitions"]
+        for s in rows:
+            transitions = ", ".join(f"{a}->{b}:{n}" for (a, b), n in s.transitions.most_common())
+            lines.append(
+                f"{s.path[-60:]:<60} {s.ticks:>7} {s.statuses.get('RUNNING', 0):>8} "
+                f"{s.cumulative_ns / 1e6:>9.3f} {s.self_ns / 1e6:>9.3f}  {transitions}"
+            )
+        return "\n".join(lines)
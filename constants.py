@@ -41,3 +41,12 @@ TASK_POSITIONS = {
     "SERVING_WINDOW": (0, 2),
 }
 
+# Stations whose items end up on the plate; the plate counter is chosen to
+# keep the walks between them and the plate short.
+PLATE_STATIONS = ("GET_BUN", "CUTTING_BOARD_1", "PAN", "SERVING_WINDOW")
+
+# Station that holds each piece of equipment named in item_info.yaml.
+EQUIPMENT_STATIONS = {
+    "CuttingBoard": "CUTTING_BOARD_1",
+    "Pan": "PAN",
+}
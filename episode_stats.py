@@ -0,0 +1,74 @@
+# episode_stats.py
+
+from cooperative_cuisine.base_agent.agent_task import TaskStatus
+
+# Items that count as a served order when dropped at a serving window.
+MEALS = ("Burger", "Salad", "TomatoSoup", "OnionSoup", "Fries", "FishAndChips", "Pizza")
+
+
+def meal_of(item):
+    """The meal an item carries: its own type, or the ready content of a plate."""
+    if not item:
+        return None
+    ready = item.get("content_ready")
+    if ready:
+        return ready.get("type")
+    return item.get("type")
+
+
+class EpisodeStats:
+    """Per-episode counters collected from an instrumented agent."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.steps = 0
+        self.failures = 0
+        self.burgers_served = 0
+        self.meals_served = 0
+        self.time_to_first_serve = None
+        self.steps_to_first_serve = None
+        self._held_meal = None
+
+    def observe(self, agent):
+        """Called after parse_state; detects a meal handed over at a serving window."""
+        self.steps += 1
+        held = meal_of(getattr(agent, "held_item", None))
+        if self._held_meal and held is None:
+            counter = agent.nearest_counter
+            if counter is not None and counter.get("type") == "ServingWindow":
+                self.meals_served += 1
+                if self._held_meal == "Burger":
+                    self.burgers_served += 1
+                if self.time_to_first_serve is None:
+                    self.time_to_first_serve = self.clock()
+                    self.steps_to_first_serve = self.steps
+        self._held_meal = held if held in MEALS else None
+
+    def to_dict(self):
+        return {
+            "steps": self.steps,
+            "failures": self.failures,
+            "burgers_served": self.burgers_served,
+            "meals_served": self.meals_served,
+            "time_to_first_serve": self.time_to_first_serve,
+            "steps_to_first_serve": self.steps_to_first_serve,
+        }
+
+
+def instrument(agent, stats):
+    """Wrap the agent's parse_state/finalize_current_task to feed stats."""
+    parse_state = agent.parse_state
+    finalize_current_task = agent.finalize_current_task
+
+    def counted_parse_state(state):
+        parse_state(state)
+        stats.observe(agent)
+
+    def counted_finalize_current_task(status, *args, **kwargs):
+        if status == TaskStatus.FAILED:
+            stats.failures += 1
+        return finalize_current_task(status, *args, **kwargs)
+
+    agent.parse_state = counted_parse_state
+    agent.finalize_current_task = counted_finalize_current_task
+    return agent
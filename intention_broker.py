@@ -0,0 +1,409 @@
+# intention_broker.py
+
+import asyncio
+import logging
+import os
+import secrets
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from types import MappingProxyType
+
+from intention_manager import GLOBAL_INTENTION_MANAGER, IntentionManager, Subscription
+
+logger = logging.getLogger(__name__)
+
+
+def runtime_dir():
+    """Per-user directory for the socket and its key, readable by the user only."""
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        return os.path.join(base, "mrbtp")
+    return os.path.join(tempfile.gettempdir(), f"mrbtp-{os.getuid()}")
+
+
+DEFAULT_ADDRESS = os.path.join(runtime_dir(), "intentions.sock")
+# Reconnect attempts (one second apart) before the mirror is declared stale.
+RECONNECT_ATTEMPTS = 5
+
+
+def _private_dir(path):
+    """Create path 0700 or check that an existing one is ours and private."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be owned by this user and not accessible to others")
+
+
+def key_path(address):
+    return address + ".key"
+
+
+def load_authkey(address):
+    """Shared secret for address: MRBTP_INTENTION_AUTHKEY, else the key file the broker wrote."""
+    key = os.environ.get("MRBTP_INTENTION_AUTHKEY")
+    if key:
+        return key.encode()
+    with open(key_path(address), "rb") as f:
+        return f.read()
+
+
+def _write_authkey(address):
+    key = os.environ.get("MRBTP_INTENTION_AUTHKEY")
+    if key:
+        return key.encode()
+    key = secrets.token_hex(32).encode()
+    fd = os.open(key_path(address), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _remove_stale_socket(address):
+    """Unlink address if it is a socket nobody listens on; refuse anything else."""
+    try:
+        info = os.lstat(address)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise FileExistsError(f"{address} exists and is not a stale socket of this user")
+    probe = socket.socket(socket.AF_UNIX)
+    try:
+        probe.connect(address)
+    except OSError:
+        os.unlink(address)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"An intention broker is already listening on {address}")
+
+# Manager methods a client may call over the wire.
+REMOTE_METHODS = frozenset({
+    "update_intention",
+    "clear_intention",
+    "get_all_intentions",
+    "detect_conflicts",
+    "agents_targeting",
+    "changes_since",
+    "broadcast_message",
+    "get_messages",
+    "get_conflict_events",
+})
+
+
+def _hang_up(conn):
+    """Shut conn's socket down so a thread blocked in recv() on it wakes with EOFError."""
+    try:
+        with socket.socket(fileno=os.dup(conn.fileno())) as sock:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class IntentionBroker:
+    """Serves one IntentionManager to agents in other processes.
+
+    Clients talk to it over a Unix socket in a private per-user directory
+    and must prove they know the authkey before anything is unpickled; the
+    key is written next to the socket (mode 0600) unless
+    MRBTP_INTENTION_AUTHKEY provides one. Each connection is either a
+    request channel (one call, one reply) or a subscription stream: it
+    starts with a full snapshot and is followed by coalesced deltas.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, manager=None):
+        self.address = address
+        self.manager = manager or IntentionManager()
+        self._listener = None
+        self._thread = None
+        self._conns = set()
+        self._conns_lock = threading.Lock()
+
+    def _listen(self):
+        _private_dir(os.path.dirname(os.path.abspath(self.address)))
+        _remove_stale_socket(self.address)
+        authkey = _write_authkey(self.address)
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=authkey)
+
+    def serve_forever(self):
+        self._listen()
+        self._accept_loop()
+
+    def _accept_loop(self):
+        listener = self._listener
+        while True:
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                logger.warning("Rejected an intention broker client with a wrong authkey")
+                continue
+            except (OSError, EOFError):
+                # Either close() shut the listener or the client hung up mid-handshake.
+                if self._listener is None:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def start(self):
+        """Serve from a daemon thread; returns once the socket is listening."""
+        self._listen()
+        self._thread = threading.Thread(target=self._accept_loop, name="IntentionBroker", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._listener is None:
+            return
+        listener, self._listener = self._listener, None
+        listener.close()
+        # Hang up on connected clients so their streams notice and reconnect.
+        with self._conns_lock:
+            conns, self._conns = self._conns, set()
+        for conn in conns:
+            _hang_up(conn)
+        for path in (self.address, key_path(self.address)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _serve(self, conn):
+        with self._conns_lock:
+            self._conns.add(conn)
+        try:
+            while True:
+                op, args, kwargs = conn.recv()
+                if op == "subscribe":
+                    self._stream(conn)
+                    return
+                try:
+                    conn.send((True, self._call(op, args, kwargs)))
+                except Exception as exc:
+                    conn.send((False, exc))
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._conns_lock:
+                self._conns.discard(conn)
+            conn.close()
+
+    def _call(self, op, args, kwargs):
+        if op not in REMOTE_METHODS:
+            raise ValueError(f"Unknown intention manager call: {op}")
+        result = getattr(self.manager, op)(*args, **kwargs)
+        if op == "get_all_intentions":
+            result = dict(result)
+        return result
+
+    def _stream(self, conn):
+        send_lock = threading.Lock()
+
+        def forward(changes):
+            with send_lock:
+                try:
+                    conn.send(changes)
+                except OSError:
+                    pass
+
+        # Deltas raised while the snapshot is in flight wait on send_lock and
+        # are applied after it, so the client never ends up behind.
+        with send_lock:
+            subscription = self.manager.subscribe(forward, mode=Subscription.THREAD)
+            conn.send(dict(self.manager.get_all_intentions()))
+        try:
+            conn.recv()
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.manager.unsubscribe(subscription)
+
+
+class RemoteIntentionManager:
+    """IntentionManager API backed by an IntentionBroker in another process.
+
+    Writes and queries are request/reply calls to the broker. Reads of the
+    intentions themselves come from a local mirror that a background
+    stream keeps current, so get_all_intentions never leaves the process.
+    If the broker goes away the stream reconnects and resynchronises the
+    mirror; once that fails ``connected`` turns False and reads raise
+    ConnectionError instead of serving a stale mirror.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey if authkey is not None else load_authkey(address)
+        self._conn = self._connect()
+        self._lock = threading.Lock()
+        self._subscribers = ()
+        self._executors = {}
+        self._mirror = MappingProxyType({})
+        self._closed = False
+        self.connected = True
+        self.reconnects = 0
+        self._stream_conn = self._subscribe_stream()
+        self._mirror = MappingProxyType(self._stream_conn.recv())
+        self._thread = threading.Thread(target=self._follow, name="IntentionStream", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+
+    def _subscribe_stream(self):
+        conn = self._connect()
+        conn.send(("subscribe", (), {}))
+        return conn
+
+    def _request(self, op, *args, **kwargs):
+        with self._lock:
+            try:
+                self._conn.send((op, args, kwargs))
+                ok, result = self._conn.recv()
+            except (EOFError, OSError):
+                # One retry on a fresh connection; the broker may have restarted.
+                self._conn.close()
+                try:
+                    self._conn = self._connect()
+                except OSError as exc:
+                    raise ConnectionError(f"Intention broker at {self.address} is gone") from exc
+                self._conn.send((op, args, kwargs))
+                ok, result = self._conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def _apply(self, changes):
+        mirror = dict(self._mirror)
+        for agent_id, intention in changes.items():
+            if intention is None:
+                mirror.pop(agent_id, None)
+            else:
+                mirror[agent_id] = intention
+        self._mirror = MappingProxyType(mirror)
+        for subscription in self._subscribers:
+            for agent_id, intention in changes.items():
+                subscription.push(agent_id, intention)
+
+    def _resync(self):
+        """Reconnect the stream; returns False once every attempt failed."""
+        for _ in range(RECONNECT_ATTEMPTS):
+            if self._closed:
+                return False
+            time.sleep(1.0)
+            try:
+                conn = self._subscribe_stream()
+                snapshot = conn.recv()
+            except (EOFError, OSError):
+                continue
+            self._stream_conn = conn
+            # Deliver the new picture, including agents that left while we were away.
+            changes = {a: None for a in self._mirror if a not in snapshot}
+            changes.update(snapshot)
+            self._apply(changes)
+            self.reconnects += 1
+            logger.warning("Reconnected to the intention broker at %s", self.address)
+            return True
+        return False
+
+    def _follow(self):
+        while True:
+            try:
+                while True:
+                    self._apply(self._stream_conn.recv())
+            except (EOFError, OSError):
+                pass
+            if self._closed:
+                return
+            logger.warning("Lost the intention broker at %s; reconnecting", self.address)
+            if not self._resync():
+                self.connected = False
+                logger.error("Intention broker at %s is gone; intentions are no longer shared", self.address)
+                return
+
+    def update_intention(self, agent_id, action, target, status):
+        self._request("update_intention", agent_id, action, target, status)
+
+    def clear_intention(self, agent_id):
+        self._request("clear_intention", agent_id)
+
+    def get_all_intentions(self):
+        if not self.connected:
+            raise ConnectionError(f"Intention broker at {self.address} is gone")
+        return self._mirror
+
+    def subscribe(self, callback_fn, mode=Subscription.SYNC, loop=None):
+        """Same contract as IntentionManager.subscribe; "sync" runs on the stream thread."""
+        executor = None
+        if mode == Subscription.THREAD:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="IntentionSubscriber")
+        elif mode == Subscription.ASYNCIO and loop is None:
+            loop = asyncio.get_running_loop()
+        subscription = Subscription(
+            callback_fn, mode, executor=executor, loop=loop, current=lambda: self._mirror
+        )
+        if executor is not None:
+            self._executors[subscription] = executor
+        self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+        executor = self._executors.pop(subscription, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def detect_conflicts(self):
+        return self._request("detect_conflicts")
+
+    def agents_targeting(self, target):
+        return self._request("agents_targeting", target)
+
+    def changes_since(self, version):
+        return self._request("changes_since", version)
+
+    def broadcast_message(self, agent_id, message):
+        self._request("broadcast_message", agent_id, message)
+
+    def get_messages(self, consumer_id):
+        return self._request("get_messages", consumer_id)
+
+    def get_conflict_events(self, consumer_id):
+        return self._request("get_conflict_events", consumer_id)
+
+    def close(self):
+        self._closed = True
+        for subscription in self._subscribers:
+            self.unsubscribe(subscription)
+        self._conn.close()
+        _hang_up(self._stream_conn)
+        self._thread.join()
+        self._stream_conn.close()
+
+
+_remote_managers = {}
+_remote_lock = threading.Lock()
+
+
+def get_intention_manager():
+    """Broker-backed manager when MRBTP_INTENTION_BROKER is set, else the in-process one."""
+    address = os.environ.get("MRBTP_INTENTION_BROKER")
+    if not address:
+        return GLOBAL_INTENTION_MANAGER
+    with _remote_lock:
+        if address not in _remote_managers:
+            _remote_managers[address] = RemoteIntentionManager(address)
+        return _remote_managers[address]
+
+
+if __name__ == "__main__":
+    broker = IntentionBroker(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ADDRESS)
+    print(f"Intention broker listening on {broker.address}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.close()
@@ -125,8 +125,15 @@
 # GLOBAL_INTENTION_MANAGER = IntentionManager()
 # intention_manager.py
 
+import asyncio
+import inspect
+import logging
 import threading
 import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 
 class Intention:
@@ -144,60 +151,452 @@ class Intention:
         )
 
 
+class IntentionSnapshot(Mapping):
+    """Immutable, versioned agent_id -> Intention mapping.
+
+    Entries live in a fixed number of hash buckets. ``set``/``remove``
+    return a new snapshot that copies only the touched bucket and shares
+    the others, so publishing costs the same no matter how many agents
+    there are.
+    """
+
+    __slots__ = ("version", "_buckets", "_len")
+    BUCKETS = 32
+
+    def __init__(self, version=0, buckets=None, length=0):
+        self.version = version
+        self._buckets = buckets or (None,) * self.BUCKETS
+        self._len = length
+
+    def __getitem__(self, key):
+        bucket = self._buckets[hash(key) % self.BUCKETS]
+        if bucket is None:
+            raise KeyError(key)
+        return bucket[key]
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            if bucket:
+                yield from bucket
+
+    def __len__(self):
+        return self._len
+
+    def __repr__(self):
+        return f"<IntentionSnapshot v{self.version} {dict(self)}>"
+
+    def _with_bucket(self, idx, bucket, length, version):
+        buckets = list(self._buckets)
+        buckets[idx] = bucket or None
+        return IntentionSnapshot(version, tuple(buckets), length)
+
+    def set(self, key, value, version):
+        idx = hash(key) % self.BUCKETS
+        bucket = dict(self._buckets[idx] or ())
+        length = self._len if key in bucket else self._len + 1
+        bucket[key] = value
+        return self._with_bucket(idx, bucket, length, version)
+
+    def remove(self, key, version):
+        idx = hash(key) % self.BUCKETS
+        bucket = dict(self._buckets[idx] or ())
+        del bucket[key]
+        return self._with_bucket(idx, bucket, self._len - 1, version)
+
+
+class Subscription:
+    """Per-subscriber mailbox of pending deltas.
+
+    Changes pushed while a delivery is queued or running are merged per
+    agent, so a burst of updates reaches the subscriber as one call with
+    the latest intention of every agent that changed (None once cleared).
+    Deliveries to one subscriber never overlap. With ``current`` (a
+    callable returning the live agent_id -> Intention mapping) the values
+    are read from it at delivery time, so pushes that arrive out of order
+    still deliver the latest state. A callback that raises is logged and
+    does not stop later deliveries.
+    """
+
+    SYNC = "sync"
+    THREAD = "thread"
+    ASYNCIO = "asyncio"
+
+    def __init__(self, callback_fn, mode=SYNC, executor=None, loop=None, current=None):
+        self.callback_fn = callback_fn
+        self.mode = mode
+        self._executor = executor
+        self._loop = loop
+        self._current = current
+        self._pending = {}
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def push(self, agent_id, intention):
+        with self._lock:
+            self._pending[agent_id] = intention
+            if self._scheduled:
+                return
+            self._scheduled = True
+        if self.mode == self.THREAD:
+            self._executor.submit(self._drain)
+        elif self.mode == self.ASYNCIO:
+            self._loop.call_soon_threadsafe(self._loop.create_task, self._drain_async())
+        else:
+            self._drain()
+
+    def _take(self):
+        with self._lock:
+            changes, self._pending = self._pending, {}
+            if not changes:
+                self._scheduled = False
+        if changes and self._current is not None:
+            current = self._current()
+            changes = {agent_id: current.get(agent_id) for agent_id in changes}
+        return changes
+
+    def _abort(self):
+        # A delivery died half way; let the next push schedule a new one.
+        with self._lock:
+            self._scheduled = False
+
+    def _failed(self):
+        logger.exception("Intention subscriber %r failed", self.callback_fn)
+
+    def _drain(self):
+        changes = self._take()
+        try:
+            while changes:
+                try:
+                    self.callback_fn(changes)
+                except Exception:
+                    self._failed()
+                changes = self._take()
+        finally:
+            if changes:
+                self._abort()
+
+    async def _drain_async(self):
+        changes = self._take()
+        try:
+            while changes:
+                try:
+                    result = self.callback_fn(changes)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    self._failed()
+                changes = self._take()
+        finally:
+            if changes:
+                self._abort()
+
+
+class MessageBus:
+    """Fixed-capacity ring buffer of messages with a read cursor per consumer.
+
+    Publishing overwrites the oldest slot once the buffer is full. Every
+    consumer reads from its own cursor, so one consumer polling never hides
+    messages from the others. A consumer that falls more than ``capacity``
+    messages behind skips ahead, and the skipped messages are counted in
+    ``overruns``. ``dropped`` counts evicted messages that at least one
+    registered consumer never read.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self._buffer = [None] * capacity
+        self._head = 0
+        self._cursors = {}
+        self._cond = threading.Condition()
+        self._async_waiters = []
+        self.dropped = 0
+        self.overruns = {}
+
+    def publish(self, agent_id, message):
+        with self._cond:
+            evicted = self._head - self.capacity
+            if evicted >= 0 and any(c <= evicted for c in self._cursors.values()):
+                self.dropped += 1
+            self._buffer[self._head % self.capacity] = {"from": agent_id, "message": message}
+            self._head += 1
+            waiters, self._async_waiters = self._async_waiters, []
+            self._cond.notify_all()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def register(self, consumer_id, from_start=True):
+        """Start a cursor at the oldest retained message, or at the next one."""
+        with self._cond:
+            self._cursor(consumer_id, self._oldest() if from_start else self._head)
+
+    def unregister(self, consumer_id):
+        with self._cond:
+            self._cursors.pop(consumer_id, None)
+
+    def _oldest(self):
+        return max(0, self._head - self.capacity)
+
+    def _cursor(self, consumer_id, start):
+        if consumer_id is None:
+            raise ValueError("Each consumer needs its own consumer_id")
+        if consumer_id not in self._cursors:
+            self._cursors[consumer_id] = start
+            self.overruns[consumer_id] = 0
+        return self._cursors[consumer_id]
+
+    def _read_locked(self, consumer_id, max_messages):
+        cursor = self._cursor(consumer_id, self._oldest())
+        oldest = self._oldest()
+        if cursor < oldest:
+            self.overruns[consumer_id] += oldest - cursor
+            cursor = oldest
+        end = self._head if max_messages is None else min(self._head, cursor + max_messages)
+        msgs = [self._buffer[i % self.capacity] for i in range(cursor, end)]
+        self._cursors[consumer_id] = end
+        return msgs
+
+    def read(self, consumer_id, max_messages=None):
+        """Messages the consumer has not seen yet; never blocks."""
+        with self._cond:
+            return self._read_locked(consumer_id, max_messages)
+
+    def wait(self, consumer_id, timeout=None, max_messages=None):
+        """Block until the consumer has unread messages (or timeout) and read them."""
+        with self._cond:
+            self._cursor(consumer_id, self._oldest())
+            self._cond.wait_for(lambda: self._cursors[consumer_id] < self._head, timeout)
+            return self._read_locked(consumer_id, max_messages)
+
+    async def wait_async(self, consumer_id, max_messages=None):
+        """Await unread messages for the consumer without blocking the loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                msgs = self._read_locked(consumer_id, max_messages)
+                if msgs:
+                    return msgs
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            await future
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def target_key(target):
+    """Hashable form of an intention target (positions may be lists or arrays)."""
+    if hasattr(target, "tolist"):
+        target = target.tolist()
+    if isinstance(target, list):
+        return tuple(target_key(t) for t in target)
+    return target
+
+
+_NO_TARGET = object()
+_MISSING = object()
+
+
 class IntentionManager:
-    def __init__(self):
-        self._intentions = {}
+    def __init__(self, max_workers=4, message_capacity=1024, history=4096):
+        # Writers serialise on _lock and publish a new snapshot; readers just
+        # grab the current reference.
+        self._snapshot = IntentionSnapshot()
         self._lock = threading.Lock()
-        self._subscribers = []
-        self._messages = []
-        self._message_lock = threading.Lock()
+        # version -> agent_id changed in that version, trimmed to `history`.
+        self._changelog = {}
+        self._history = history
+        # Replaced, never mutated, so publishers can iterate without a lock.
+        self._subscribers = ()
+        self._subscribers_lock = threading.Lock()
+        self._max_workers = max_workers
+        self._executor = None
+        self._messages = MessageBus(message_capacity)
+        # Reverse index kept in step with the snapshot, guarded by _lock.
+        self._agents_by_target = {}
+        self._target_of = {}
+        self._conflicts = set()
+        self._conflict_events = MessageBus(message_capacity)
 
     def update_intention(self, agent_id, action, target, status):
         """Call when an agent starts or updates its current action."""
+        intention = Intention(agent_id, action, target, status)
         with self._lock:
-            intention = Intention(agent_id, action, target, status)
-            self._intentions[agent_id] = intention
-        self._notify_subscribers()
+            self._publish(self._snapshot.set(agent_id, intention, self._snapshot.version + 1), agent_id)
+            self._publish_conflict_events(agent_id, self._retarget(agent_id, target_key(target)))
+        self._notify_subscribers(agent_id, intention)
 
     def clear_intention(self, agent_id):
         """Call when an agent completes or abandons its action."""
         with self._lock:
-            if agent_id in self._intentions:
-                del self._intentions[agent_id]
-        self._notify_subscribers()
+            if agent_id not in self._snapshot:
+                return
+            self._publish(self._snapshot.remove(agent_id, self._snapshot.version + 1), agent_id)
+            self._publish_conflict_events(agent_id, self._retarget(agent_id, _NO_TARGET))
+        self._notify_subscribers(agent_id, None)
+
+    def _publish(self, snapshot, agent_id):
+        # Log first so a reader that sees the new version also finds its entry.
+        self._changelog[snapshot.version] = agent_id
+        self._changelog.pop(snapshot.version - self._history, None)
+        self._snapshot = snapshot
 
     def get_all_intentions(self):
-        with self._lock:
-            return dict(self._intentions)
+        """Current snapshot of agent_id -> Intention; never blocks on writers.
 
-    def subscribe(self, callback_fn):
-        """Subscribe to intention‐updates: callback_fn gets the full dict."""
-        self._subscribers.append(callback_fn)
+        This is an immutable IntentionSnapshot (a Mapping), not the dict
+        copy earlier versions returned: it has the read-only dict methods
+        and stays unchanged by later writes, but item assignment and
+        pop() are gone. Take dict(...) of it for a private mutable copy.
+        """
+        return self._snapshot
 
-    def _notify_subscribers(self):
-        current = self.get_all_intentions()
-        for cb in self._subscribers:
-            cb(current)
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def changes_since(self, version):
+        """(current version, {agent_id: Intention or None}) changed after version.
+
+        The changes are None when version is older than the retained
+        history; take a fresh get_all_intentions() snapshot in that case.
+        """
+        snapshot = self._snapshot
+        changed = set()
+        for v in range(version + 1, snapshot.version + 1):
+            agent_id = self._changelog.get(v, _MISSING)
+            if agent_id is _MISSING:
+                return snapshot.version, None
+            changed.add(agent_id)
+        return snapshot.version, {a: snapshot.get(a) for a in changed}
+
+    def subscribe(self, callback_fn, mode=Subscription.SYNC, loop=None):
+        """Subscribe to intention deltas.
+
+        callback_fn gets ``{agent_id: Intention or None}`` holding only the
+        agents that changed since its previous delivery. ``mode`` picks where
+        it runs: inline ("sync"), on a shared thread pool ("thread") or on an
+        asyncio loop ("asyncio", defaults to the running loop; coroutine
+        callbacks are awaited).
+        """
+        executor = None
+        if mode == Subscription.THREAD:
+            executor = self._get_executor()
+        elif mode == Subscription.ASYNCIO and loop is None:
+            loop = asyncio.get_running_loop()
+        subscription = Subscription(
+            callback_fn, mode, executor=executor, loop=loop, current=self.get_all_intentions
+        )
+        with self._subscribers_lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._subscribers_lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def _get_executor(self):
+        with self._subscribers_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="IntentionSubscriber"
+                )
+            return self._executor
+
+    def _notify_subscribers(self, agent_id, intention):
+        for subscription in self._subscribers:
+            subscription.push(agent_id, intention)
+
+    @property
+    def messages(self):
+        return self._messages
 
     def broadcast_message(self, agent_id, message):
         """Generic message bus for negotiation, failures, etc."""
-        with self._message_lock:
-            self._messages.append({"from": agent_id, "message": message})
+        self._messages.publish(agent_id, message)
+
+    def get_messages(self, consumer_id):
+        """Unread messages for consumer_id.
+
+        Every consumer needs its own id (an agent's id works): the cursor
+        lives with the id, so two callers sharing one would split the
+        stream between them.
+        """
+        return self._messages.read(consumer_id)
+
+    def wait_messages(self, consumer_id, timeout=None):
+        return self._messages.wait(consumer_id, timeout)
+
+    async def wait_messages_async(self, consumer_id):
+        return await self._messages.wait_async(consumer_id)
 
-    def get_messages(self):
-        with self._message_lock:
-            msgs = list(self._messages)
-            self._messages.clear()
-            return msgs
+    def _retarget(self, agent_id, new_key):
+        """Move agent_id to new_key in the reverse index; returns conflict events."""
+        old_key = self._target_of.get(agent_id, _NO_TARGET)
+        if old_key is not _NO_TARGET and old_key == new_key:
+            return []
+        events = []
+        if old_key is not _NO_TARGET:
+            agents = self._agents_by_target[old_key]
+            agents.discard(agent_id)
+            if len(agents) == 1:
+                self._conflicts.discard(old_key)
+                events.append(("resolved", old_key, frozenset(agents)))
+            elif len(agents) > 1:
+                events.append(("changed", old_key, frozenset(agents)))
+            elif not agents:
+                del self._agents_by_target[old_key]
+            del self._target_of[agent_id]
+        if new_key is not _NO_TARGET:
+            agents = self._agents_by_target.setdefault(new_key, set())
+            agents.add(agent_id)
+            self._target_of[agent_id] = new_key
+            if len(agents) == 2:
+                self._conflicts.add(new_key)
+                events.append(("started", new_key, frozenset(agents)))
+            elif len(agents) > 2:
+                events.append(("changed", new_key, frozenset(agents)))
+        return events
+
+    def _publish_conflict_events(self, agent_id, events):
+        # Called under _lock, so the stream has the same order as the writes.
+        version = self._snapshot.version
+        for kind, key, agents in events:
+            self._conflict_events.publish(
+                agent_id, {"event": kind, "target": key, "agents": agents, "version": version}
+            )
 
     def detect_conflicts(self):
         """Find targets that more than one agent is working on."""
         with self._lock:
-            target_map = {}
-            for intent in self._intentions.values():
-                key = intent.target
-                target_map.setdefault(key, []).append(intent)
-            return [(t, its) for t, its in target_map.items() if len(its) > 1]
+            return [
+                (key, [self._snapshot[a] for a in self._agents_by_target[key]])
+                for key in self._conflicts
+            ]
+
+    def agents_targeting(self, target):
+        """Ids of the agents whose intention points at target."""
+        with self._lock:
+            return frozenset(self._agents_by_target.get(target_key(target), ()))
+
+    def has_conflict(self, target):
+        return target_key(target) in self._conflicts
+
+    @property
+    def conflict_events(self):
+        """Stream of {"event": "started"|"changed"|"resolved", "target", "agents", "version"}.
+
+        Events are published in write order; version is the snapshot
+        version of the write that caused them.
+        """
+        return self._conflict_events
+
+    def get_conflict_events(self, consumer_id):
+        return self._conflict_events.read(consumer_id)
+
+    async def wait_conflict_events_async(self, consumer_id):
+        return await self._conflict_events.wait_async(consumer_id)
 
 
 # Singleton to import from anywhere:
@@ -0,0 +1,117 @@
+# intention_utils.py
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# Kept next to the layout cache rather than in whatever directory the agent starts in.
+INTENTIONS_FILE = os.environ.get(
+    "MRBTP_INTENTIONS_FILE", str(Path.home() / ".cache" / "mrbtp" / "intentions.json")
+)
+FLUSH_INTERVAL = float(os.environ.get("MRBTP_INTENTIONS_FLUSH_INTERVAL", "0.5"))
+
+
+def load_intentions(path=INTENTIONS_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_intentions(intentions, path=INTENTIONS_FILE):
+    """Merge intentions into the file, replacing it atomically."""
+    merged = load_intentions(path)
+    merged.update({str(k): v for k, v in intentions.items()})
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".intentions-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(merged, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class IntentionWriter:
+    """Write-behind intention persistence.
+
+    ``record`` is cheap enough for the agent's control loop: it drops
+    intentions that did not change and only stashes the rest. A daemon
+    thread coalesces everything recorded within ``flush_interval`` seconds
+    into a single atomic ``save_intentions`` call.
+    """
+
+    def __init__(self, path=INTENTIONS_FILE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._last = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="IntentionWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, agent_id, intention):
+        """Queue the intention for writing if it differs from the last one recorded."""
+        with self._lock:
+            if self._last.get(agent_id) == intention:
+                return False
+            self._last[agent_id] = intention
+            self._pending[agent_id] = intention
+        return True
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            save_intentions(pending, self.path)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        """Stop the writer thread and persist whatever is still pending."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+
+class NullIntentionWriter:
+    """IntentionWriter stand-in that persists nothing (offline replays, tests)."""
+
+    def record(self, agent_id, intention):
+        return False
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+_default_writer = None
+_default_writer_lock = threading.Lock()
+
+
+def get_intention_writer():
+    """Process-wide IntentionWriter for the default intentions file."""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = IntentionWriter()
+        return _default_writer
@@ -0,0 +1,566 @@
+# kitchen_sim.py
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+from cooperative_cuisine.action import ActionType, InterActionData
+
+from constants import KITCHEN_POSITIONS, TASK_POSITIONS
+from intention_manager import IntentionManager
+from intention_utils import NullIntentionWriter
+from layout_analyzer import load_layout
+from navigation import accessible_positions
+from recipe_compiler import DEFAULT_ITEM_INFO, RecipeBook, dispenser_key
+from stepped_runner import DEFAULT_FRAME, bind_actions
+
+# Player movement and reach, close to cooperative_cuisine's player_config.
+MOVE_SPEED = 6.0
+PLAYER_RADIUS = 0.4
+INTERACTION_RANGE = 1.6
+OPEN_ORDERS = 2
+START_TIME = datetime(2000, 1, 1)
+
+EMPTY = -1
+PLATE = "Plate"
+
+
+def _camel(key):
+    return "".join(part.capitalize() for part in key.split("_"))
+
+
+def _bit(code):
+    return 1 << int(code)
+
+
+def _bits(mask):
+    mask, code = int(mask), 0
+    while mask:
+        if mask & 1:
+            yield code
+        mask >>= 1
+        code += 1
+
+
+class KitchenSim:
+    """A batch of small grid kitchens stepped together.
+
+    Implements the part of cooperative_cuisine the agents rely on: moving
+    with collisions against counters, picking up and dropping (dispensers,
+    plates, putting ingredients on plates and into pans, moving a pan's
+    contents onto a plate), chopping while interacting, unattended cooking,
+    and serving orders. Players do not collide with each other and orders
+    never expire.
+
+    State lives in NumPy arrays shaped (kitchens, slots); a slot is a
+    counter or a player's hand and holds an item code, a bitmask of the
+    codes inside it (plates, pans) and a progress fraction. Movement,
+    facing, chopping and cooking are advanced for every kitchen by one
+    vectorised step(); pick-up/drop is resolved when the action arrives.
+    state() returns the dict shape parse_state consumes.
+    """
+
+    def __init__(self, kitchen_positions=KITCHEN_POSITIONS, task_positions=TASK_POSITIONS,
+                 recipe_book=None, kitchens=1, players=1, seed=0, duration=200.0):
+        self.book = recipe_book or RecipeBook(DEFAULT_ITEM_INFO)
+        self.n = kitchens
+        self.player_ids = [str(p) for p in range(players)]
+        self.duration = duration
+        self._compile_items()
+        self._build_counters(kitchen_positions, task_positions)
+        self.reset(seed)
+
+    @classmethod
+    def from_layout_file(cls, path, **kwargs):
+        layout = load_layout(path)
+        return cls(layout.kitchen_positions, layout.task_positions, **kwargs)
+
+    # -- setup -------------------------------------------------------------
+
+    def _compile_items(self):
+        items = self.book.items
+        self.names = [PLATE] + sorted(name for name in items if name != PLATE)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        if len(self.names) > 62:
+            raise ValueError("Too many item types for 64-bit content masks")
+        self.meal_masks = {}
+        for meal in self.book.meals():
+            mask = 0
+            for need in items[meal].get("needs") or ():
+                mask |= _bit(self.codes[need])
+            self.meal_masks[mask] = self.codes[meal]
+        # (station type, item code) -> (result code, seconds) for work done by hand,
+        # (equipment code, item code) -> (result code, seconds) for unattended cooking.
+        self.active, self.passive = {}, {}
+        self.equipment_station = {}
+        for name, info in items.items():
+            needs = info.get("needs") or ()
+            equipment = info.get("equipment")
+            if equipment and len(needs) == 1 and info.get("type") != "Meal":
+                entry = (self.codes[name], float(info.get("seconds") or 1.0))
+                if self.book.is_passive(equipment):
+                    self.passive[(self.codes[equipment], self.codes[needs[0]])] = entry
+                else:
+                    self.active[(equipment, self.codes[needs[0]])] = entry
+            if info.get("type") == "Equipment" and equipment:
+                self.equipment_station[self.codes[name]] = equipment
+        self.cooked = {result for result, _ in self.passive.values()}
+        self.dispensers = {
+            dispenser_key(name): name for name, info in items.items()
+            if not info.get("needs") and info.get("type") != "Equipment"
+        }
+
+    def _station(self, key):
+        """(counter type, item standing on it) for a TASK_POSITIONS name."""
+        if key in self.dispensers:
+            return "Dispenser", self.dispensers[key]
+        base = key.rstrip("0123456789").rstrip("_")
+        for code, station in self.equipment_station.items():
+            if self.names[code].upper() == base:
+                return station, self.names[code]
+        return _camel(base), None
+
+    def _build_counters(self, kitchen_positions, task_positions):
+        # Same walls the agents' NavigationCache sees; aisles are opened to
+        # stations that would otherwise be out of reach.
+        kitchen_positions = accessible_positions(kitchen_positions, task_positions)
+        roles = {tuple(pos): key for key, pos in task_positions.items()}
+        cells = {(p["x"], p["y"]): _camel(p["type"]) for p in kitchen_positions}
+        cells.update({pos: None for pos in roles if pos not in cells})
+        self.counter_pos = np.array(sorted(cells, key=lambda c: (c[1], c[0])), dtype=float).reshape(-1, 2)
+        self.counter_types, self.counter_items = [], []
+        for x, y in self.counter_pos.astype(int):
+            key = roles.get((x, y))
+            counter_type, item = self._station(key) if key else (cells[(x, y)], None)
+            self.counter_types.append(counter_type)
+            self.counter_items.append(item)
+        self.counter_ids = [f"{t.lower()}-{x}-{y}" for t, (x, y) in zip(self.counter_types, self.counter_pos.astype(int))]
+        self.c = len(self.counter_ids)
+        self.width = int(self.counter_pos[:, 0].max()) + 1
+        self.height = int(self.counter_pos[:, 1].max()) + 1
+        # Blocked grid padded by one cell so lookups just outside the kitchen stay in range.
+        self.blocked = np.ones((self.height + 2, self.width + 2), dtype=bool)
+        self.blocked[1:-1, 1:-1] = False
+        self.blocked[self.counter_pos[:, 1].astype(int) + 1, self.counter_pos[:, 0].astype(int) + 1] = True
+        self.free_cells = np.argwhere(~self.blocked[1:-1, 1:-1])[:, ::-1].astype(float)
+
+        kinds = sorted(set(self.counter_types))
+        self.counter_kind = np.array([kinds.index(t) for t in self.counter_types])
+        n_codes = len(self.names)
+        self.chop_result = np.full((len(kinds), n_codes), EMPTY)
+        self.chop_rate = np.zeros((len(kinds), n_codes))
+        for (station, source), (result, seconds) in self.active.items():
+            if station in kinds:
+                self.chop_result[kinds.index(station), source] = result
+                self.chop_rate[kinds.index(station), source] = 1.0 / seconds
+        self.cook_result = np.full((n_codes, n_codes), EMPTY)
+        self.cook_rate = np.zeros((n_codes, n_codes))
+        for (equipment, source), (result, seconds) in self.passive.items():
+            self.cook_result[equipment, source] = result
+            self.cook_rate[equipment, source] = 1.0 / seconds
+        # Equipment only cooks while standing on its own station type.
+        self.cooks_here = np.zeros((len(kinds), n_codes), dtype=bool)
+        for equipment, station in self.equipment_station.items():
+            if station in kinds:
+                self.cooks_here[kinds.index(station), equipment] = True
+
+    def reset(self, seed=0):
+        n, p, slots = self.n, len(self.player_ids), self.c + len(self.player_ids)
+        self.rngs = [np.random.default_rng(seed + i) for i in range(n)]
+        self.time = 0.0
+        self.item = np.full((n, slots), EMPTY, dtype=np.int16)
+        self.content = np.zeros((n, slots), dtype=np.int64)
+        self.progress = np.zeros((n, slots))
+        for i, name in enumerate(self.counter_items):
+            if name is not None and self.counter_types[i] != "Dispenser":
+                self.item[:, i] = self.codes[name]
+        self.pos = np.stack([rng.choice(self.free_cells, size=p, replace=False) for rng in self.rngs])
+        self.facing = np.zeros((n, p, 2))
+        self.facing[..., 1] = -1.0
+        self.move_dir = np.zeros((n, p, 2))
+        self.move_left = np.zeros((n, p))
+        self.interacting = np.zeros((n, p), dtype=bool)
+        self.nearest = np.full((n, p), EMPTY)
+        self.score = np.zeros(n)
+        self.served = [[] for _ in range(n)]
+        self.orders = [[] for _ in range(n)]
+        self._order_ids = 0
+        # Counter dicts are rebuilt only when stale; whole states are shared
+        # by a kitchen's players until the next step or action.
+        self._counters = [[None] * self.c for _ in range(n)]
+        self._stale = np.ones((n, self.c), dtype=bool)
+        self._states = [None] * n
+        for kitchen in range(n):
+            self._fill_orders(kitchen)
+        self._update_nearest()
+
+    def _fill_orders(self, kitchen):
+        meals = self.book.meals()
+        while meals and len(self.orders[kitchen]) < OPEN_ORDERS:
+            self._order_ids += 1
+            self.orders[kitchen].append({
+                "id": str(self._order_ids),
+                "category": "Order",
+                "meal": meals[int(self.rngs[kitchen].integers(len(meals)))],
+                "start_time": (START_TIME + timedelta(seconds=self.time)).isoformat(),
+                "max_duration": self.duration,
+            })
+
+    # -- time --------------------------------------------------------------
+
+    @property
+    def env_time(self):
+        return START_TIME + timedelta(seconds=self.time)
+
+    @property
+    def env_time_end(self):
+        return START_TIME + timedelta(seconds=self.duration)
+
+    def ended(self):
+        return self.time >= self.duration
+
+    def step(self, frame=DEFAULT_FRAME):
+        """Advance every kitchen by frame (a timedelta)."""
+        dt = frame.total_seconds()
+        self._move(dt)
+        self._update_nearest()
+        self._chop(dt)
+        self._cook(dt)
+        self.time += dt
+        self._states = [None] * self.n
+
+    def _free(self, pos):
+        free = np.ones(pos.shape[:-1], dtype=bool)
+        for dx in (-PLAYER_RADIUS, PLAYER_RADIUS):
+            for dy in (-PLAYER_RADIUS, PLAYER_RADIUS):
+                x = np.clip(np.rint(pos[..., 0] + dx).astype(int) + 1, 0, self.width + 1)
+                y = np.clip(np.rint(pos[..., 1] + dy).astype(int) + 1, 0, self.height + 1)
+                free &= ~self.blocked[y, x]
+        return free
+
+    def _move(self, dt):
+        step = self.move_dir * (MOVE_SPEED * np.minimum(self.move_left, dt))[..., None]
+        # One axis at a time, so players slide along counters.
+        for axis in (0, 1):
+            moved = self.pos.copy()
+            moved[..., axis] += step[..., axis]
+            ok = self._free(moved)
+            self.pos[ok] = moved[ok]
+        self.move_left = np.maximum(self.move_left - dt, 0.0)
+
+    def _update_nearest(self):
+        point = self.pos + self.facing * 0.5
+        dist = np.linalg.norm(point[:, :, None, :] - self.counter_pos[None, None], axis=-1)
+        nearest = dist.argmin(axis=-1)
+        reach = np.linalg.norm(self.counter_pos[nearest] - self.pos, axis=-1)
+        self.nearest = np.where(reach <= INTERACTION_RANGE, nearest, EMPTY)
+
+    def _chop(self, dt):
+        kitchen, player = np.nonzero(self.interacting & (self.nearest != EMPTY))
+        if not len(kitchen):
+            return
+        counter = self.nearest[kitchen, player]
+        kind = self.counter_kind[counter]
+        item = self.item[kitchen, counter]
+        valid = item != EMPTY
+        kitchen, counter, kind, item = kitchen[valid], counter[valid], kind[valid], item[valid]
+        rate = self.chop_rate[kind, item]
+        chopping = rate > 0
+        kitchen, counter, kind, item = kitchen[chopping], counter[chopping], kind[chopping], item[chopping]
+        np.add.at(self.progress, (kitchen, counter), rate[chopping] * dt)
+        done = self.progress[kitchen, counter] >= 1.0
+        self.item[kitchen[done], counter[done]] = self.chop_result[kind[done], item[done]]
+        self.progress[kitchen[done], counter[done]] = 0.0
+        self._dirty(kitchen, counter)
+
+    def _cook(self, dt):
+        item = self.item[:, : self.c]
+        content = self.content[:, : self.c]
+        on_station = (item != EMPTY) & self.cooks_here[self.counter_kind[None, :], np.maximum(item, 0)]
+        kitchen, counter = np.nonzero(on_station & (content > 0))
+        if not len(kitchen):
+            return
+        equipment = item[kitchen, counter]
+        source = np.log2(content[kitchen, counter]).astype(int)
+        rate = self.cook_rate[equipment, source]
+        cooking = rate > 0
+        kitchen, counter, equipment, source = kitchen[cooking], counter[cooking], equipment[cooking], source[cooking]
+        self.progress[kitchen, counter] += rate[cooking] * dt
+        done = self.progress[kitchen, counter] >= 1.0
+        result = self.cook_result[equipment[done], source[done]]
+        self.content[kitchen[done], counter[done]] = np.left_shift(1, result.astype(np.int64))
+        self.progress[kitchen[done], counter[done]] = 0.0
+        self._dirty(kitchen, counter)
+
+    def _dirty(self, kitchens, counters):
+        kitchens, counters = np.broadcast_arrays(kitchens, counters)
+        on_counter = counters < self.c
+        self._stale[kitchens[on_counter], counters[on_counter]] = True
+
+    # -- actions -----------------------------------------------------------
+
+    def perform_action(self, kitchen, action):
+        player = self.player_ids.index(action.player)
+        self._states[kitchen] = None
+        if action.action_type == ActionType.MOVEMENT:
+            direction = np.asarray(action.action_data, dtype=float)
+            norm = np.linalg.norm(direction)
+            if norm > 0:
+                self.move_dir[kitchen, player] = direction / norm
+                self.facing[kitchen, player] = direction / norm
+                self.move_left[kitchen, player] = action.duration
+        elif action.action_type == ActionType.INTERACT:
+            self.interacting[kitchen, player] = action.action_data == InterActionData.START
+        elif action.action_type == ActionType.PICK_UP_DROP:
+            self._pick_up_drop(kitchen, player)
+
+    def _accepts(self, container, content, mask):
+        """Whether the codes in mask can go into container holding content."""
+        if container == self.codes[PLATE]:
+            merged = content | mask
+            return not content & mask and any(merged & ~meal == 0 for meal in self.meal_masks)
+        if container in self.equipment_station and not content:
+            codes = list(_bits(mask))
+            return len(codes) == 1 and (container, codes[0]) in self.passive
+        return False
+
+    def _move_slot(self, kitchen, source, target):
+        self.item[kitchen, target] = self.item[kitchen, source]
+        self.content[kitchen, target] = self.content[kitchen, source]
+        self.progress[kitchen, target] = self.progress[kitchen, source]
+        self.item[kitchen, source] = EMPTY
+        self.content[kitchen, source] = 0
+        self.progress[kitchen, source] = 0.0
+
+    def _pick_up_drop(self, kitchen, player):
+        counter = int(self.nearest[kitchen, player])
+        if counter == EMPTY:
+            return
+        hand = self.c + player
+        counter_type = self.counter_types[counter]
+        held, here = int(self.item[kitchen, hand]), int(self.item[kitchen, counter])
+        if held == EMPTY:
+            if counter_type == "Dispenser":
+                self.item[kitchen, hand] = self.codes[self.counter_items[counter]]
+            elif counter_type == "PlateDispenser":
+                self.item[kitchen, hand] = self.codes[PLATE]
+            elif here != EMPTY:
+                self._move_slot(kitchen, counter, hand)
+        elif counter_type == "ServingWindow":
+            self._serve(kitchen, hand)
+        elif counter_type == "Trashcan":
+            if self.content[kitchen, hand]:
+                self.content[kitchen, hand] = 0
+            else:
+                self.item[kitchen, hand] = EMPTY
+        elif counter_type in ("Dispenser", "PlateDispenser"):
+            return
+        elif here == EMPTY:
+            self._move_slot(kitchen, hand, counter)
+        else:
+            self._combine(kitchen, hand, counter)
+        self._dirty(kitchen, counter)
+
+    def _combine(self, kitchen, hand, counter):
+        held, here = int(self.item[kitchen, hand]), int(self.item[kitchen, counter])
+        held_content, here_content = int(self.content[kitchen, hand]), int(self.content[kitchen, counter])
+        # An ingredient, or a pan's contents, goes onto what stands on the counter ...
+        mask = held_content if held_content else _bit(held)
+        if self._accepts(here, here_content, mask):
+            self.content[kitchen, counter] = here_content | mask
+            if held_content:
+                self.content[kitchen, hand] = 0
+                self.progress[kitchen, hand] = 0.0
+            else:
+                self.item[kitchen, hand] = EMPTY
+            return
+        # ... or the counter's item goes onto the plate in hand.
+        mask = here_content if here_content else _bit(here)
+        if self._accepts(held, held_content, mask):
+            self.content[kitchen, hand] = held_content | mask
+            if here_content:
+                self.content[kitchen, counter] = 0
+                self.progress[kitchen, counter] = 0.0
+            else:
+                self.item[kitchen, counter] = EMPTY
+
+    def _serve(self, kitchen, hand):
+        meal = self.meal_masks.get(int(self.content[kitchen, hand]))
+        if self.item[kitchen, hand] != self.codes[PLATE] or meal is None:
+            return
+        orders = self.orders[kitchen]
+        for order in orders:
+            if order["meal"] == self.names[meal]:
+                orders.remove(order)
+                self.score[kitchen] += 1
+                self.served[kitchen].append(self.names[meal])
+                self.item[kitchen, hand] = EMPTY
+                self.content[kitchen, hand] = 0
+                self._fill_orders(kitchen)
+                return
+
+    # -- state -------------------------------------------------------------
+
+    def _item_state(self, kitchen, slot):
+        code = int(self.item[kitchen, slot])
+        if code == EMPTY:
+            return None
+        progress = float(self.progress[kitchen, slot])
+        item = {
+            "id": f"{kitchen}-{slot}",
+            "category": "Item",
+            "type": self.names[code],
+            "progress_percentage": 100.0 * progress,
+            "inverse_progress": False,
+            "active_effects": [],
+        }
+        if code == self.codes[PLATE] or code in self.equipment_station:
+            content = int(self.content[kitchen, slot])
+            codes = list(_bits(content))
+            item["category"] = "ItemCookingEquipment"
+            item["content_list"] = [
+                {"id": f"{kitchen}-{slot}-{c}", "category": "Item", "type": self.names[c],
+                 "progress_percentage": 100.0 * progress, "inverse_progress": False, "active_effects": []}
+                for c in codes
+            ]
+            ready = self.meal_masks.get(content)
+            if ready is None and len(codes) == 1 and codes[0] in self.cooked:
+                ready = codes[0]
+            item["content_ready"] = None if ready is None else {"type": self.names[ready]}
+        return item
+
+    def _counter_state(self, kitchen, counter):
+        x, y = self.counter_pos[counter]
+        occupied_by = self._item_state(kitchen, counter)
+        if self.counter_types[counter] == "Dispenser":
+            occupied_by = {"id": f"{kitchen}-{counter}", "category": "Item", "type": self.counter_items[counter]}
+        return {
+            "id": self.counter_ids[counter],
+            "category": "Counter",
+            "type": self.counter_types[counter],
+            "pos": [float(x), float(y)],
+            "orientation": [0.0, 1.0],
+            "occupied_by": occupied_by,
+            "active_effects": [],
+        }
+
+    def _counter_states(self, kitchen):
+        """Counter dicts of one kitchen; unchanged counters keep their dict."""
+        counters = self._counters[kitchen]
+        for counter in np.flatnonzero(self._stale[kitchen]).tolist():
+            counters[counter] = self._counter_state(kitchen, counter)
+        self._stale[kitchen] = False
+        return list(counters)
+
+    def state(self, kitchen, player_id=None):
+        """The environment state of one kitchen, as parse_state receives it.
+
+        Players of a kitchen get the same dict until something changes;
+        treat it as read-only.
+        """
+        state = self._states[kitchen]
+        if state is None:
+            state = self._states[kitchen] = self._build_state(kitchen)
+        return state
+
+    def _build_state(self, kitchen):
+        players = []
+        for p, pid in enumerate(self.player_ids):
+            counter = int(self.nearest[kitchen, p])
+            players.append({
+                "id": pid,
+                "pos": self.pos[kitchen, p].tolist(),
+                "facing_direction": self.facing[kitchen, p].tolist(),
+                "holding": self._item_state(kitchen, self.c + p),
+                "current_nearest_counter_pos": None if counter == EMPTY else self.counter_pos[counter].tolist(),
+                "current_nearest_counter_id": None if counter == EMPTY else self.counter_ids[counter],
+            })
+        return {
+            "players": players,
+            "counters": self._counter_states(kitchen),
+            "kitchen": {"width": self.width, "height": self.height},
+            "score": float(self.score[kitchen]),
+            "orders": list(self.orders[kitchen]),
+            "served_meals": list(self.served[kitchen]),
+            "ended": self.ended(),
+            "env_time": self.env_time.isoformat(),
+            "remaining_time": max(self.duration - self.time, 0.0),
+            "all_players_ready": True,
+        }
+
+
+class SimEnvironment:
+    """One kitchen of a KitchenSim behind the Environment methods the runners use.
+
+    step() advances the whole batch, so drive a multi-kitchen sim with
+    run_rollouts rather than one stepped runner per kitchen.
+    """
+
+    def __init__(self, sim, index=0):
+        self.sim = sim
+        self.index = index
+
+    @property
+    def env_time(self):
+        return self.sim.env_time
+
+    @property
+    def env_time_end(self):
+        return self.sim.env_time_end
+
+    def get_json_state(self, player_id):
+        return json.dumps(self.sim.state(self.index, player_id))
+
+    def perform_action(self, action):
+        self.sim.perform_action(self.index, action)
+
+    def step(self, frame):
+        self.sim.step(frame)
+
+
+def make_sim_environment(layout_path, seed, duration, recipe_book=None):
+    """Single-kitchen stand-in for batch_runner.make_environment."""
+    return SimEnvironment(KitchenSim.from_layout_file(layout_path, recipe_book=recipe_book, seed=seed, duration=duration))
+
+
+async def _rollouts(sim, agents, frame, max_ticks):
+    ticks = 0
+    while not sim.ended() and (max_ticks is None or ticks < max_ticks):
+        for kitchen, team in enumerate(agents):
+            for agent in team:
+                state = sim.state(kitchen, agent.own_player_id)
+                agent.parse_state(state)
+                await agent.manage_tasks(state)
+                if agent.current_task:
+                    await agent.handle_task(state)
+        sim.step(frame)
+        ticks += 1
+    return ticks
+
+
+def run_rollouts(sim, agent_factory, frame=DEFAULT_FRAME, max_ticks=None):
+    """Run a fresh team in every kitchen of sim at once.
+
+    agent_factory(intention_manager=...) builds one agent (FullBurgerAgent
+    and BTAgent take the keyword as is). Every kitchen gets its own
+    IntentionManager, and with it its own subtask claims, plate position
+    and path reservations, so teams in one batch never see each other.
+    Intention file writes are dropped. Returns the score of each kitchen.
+    """
+    agents = []
+    for kitchen in range(sim.n):
+        env = SimEnvironment(sim, kitchen)
+        manager = IntentionManager()
+        writer = NullIntentionWriter()
+        team = []
+        for pid in sim.player_ids:
+            agent = agent_factory(intention_manager=manager)
+            agent.own_player_id = pid
+            if hasattr(agent, "intention_writer"):
+                agent.intention_writer = writer
+            bind_actions(agent, env)
+            team.append(agent)
+        agents.append(team)
+    asyncio.run(_rollouts(sim, agents, frame, max_ticks))
+    return sim.score.tolist()
@@ -0,0 +1,210 @@
+# layout_analyzer.py
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from navigation import NavigationCache
+from state_model import grid_key
+
+CACHE_DIR = Path(os.environ.get("MRBTP_LAYOUT_CACHE", Path.home() / ".cache" / "mrbtp" / "layouts"))
+# Bump when the derived format changes so stale cache entries are ignored.
+CACHE_VERSION = 1
+
+# cooperative_cuisine's default layout_chars (environment_config.yaml).
+DEFAULT_LAYOUT_CHARS = {
+    "_": "Free",
+    "A": "Agent",
+    "#": "Counter",
+    "P": "PlateDispenser",
+    "C": "CuttingBoard",
+    "X": "Trashcan",
+    "W": "ServingWindow",
+    "S": "Sink",
+    "+": "SinkAddon",
+    "U": "Pot",
+    "Q": "Pan",
+    "O": "Peel",
+    "F": "Basket",
+    "T": "Tomato",
+    "N": "Onion",
+    "L": "Lettuce",
+    "K": "Potato",
+    "I": "Fish",
+    "D": "Dough",
+    "E": "Cheese",
+    "G": "Sausage",
+    "B": "Bun",
+    "M": "Meat",
+}
+
+WALKABLE = ("Free", "Agent")
+COUNTER_TYPES = ("Counter", "PlateDispenser", "CuttingBoard", "Trashcan", "ServingWindow", "Sink", "SinkAddon")
+# Equipment that comes standing on a station of its own.
+EQUIPMENT_STATIONS = {"Pan": "Stove", "Pot": "Stove", "Peel": "Oven", "Basket": "DeepFryer"}
+
+
+def _snake(name):
+    out = []
+    for i, ch in enumerate(name):
+        if ch.isupper() and i:
+            out.append("_")
+        out.append(ch.upper())
+    return "".join(out)
+
+
+def task_key(counter_type, item=None):
+    """TASK_POSITIONS name for a counter, e.g. GET_TOMATO, PAN, SERVING_WINDOW."""
+    if counter_type == "Dispenser":
+        return f"GET_{item.upper()}" if item else "DISPENSER"
+    if item is not None:
+        return item.upper()
+    return _snake(counter_type)
+
+
+class LayoutInfo:
+    """Everything the agents derive from a layout: blocked cells, named
+    task positions and the tiles from which each of them is reached."""
+
+    def __init__(self, kitchen_positions, task_positions, interaction_tiles, digest=None):
+        self.kitchen_positions = kitchen_positions
+        self.task_positions = task_positions
+        self.interaction_tiles = interaction_tiles
+        self.digest = digest
+
+    def to_dict(self):
+        return {
+            "version": CACHE_VERSION,
+            "digest": self.digest,
+            "kitchen_positions": self.kitchen_positions,
+            "task_positions": {k: list(v) for k, v in self.task_positions.items()},
+            "interaction_tiles": {k: [list(t) for t in v] for k, v in self.interaction_tiles.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["kitchen_positions"],
+            {k: tuple(v) for k, v in data["task_positions"].items()},
+            {k: [tuple(t) for t in v] for k, v in data["interaction_tiles"].items()},
+            digest=data.get("digest"),
+        )
+
+
+def derive(counters):
+    """LayoutInfo from (type, item, (x, y)) triples; item is the dispensed
+    ingredient or the equipment on the counter, if any."""
+    kitchen_positions = []
+    task_positions = {}
+    counts = {}
+    for counter_type, item, pos in sorted(counters, key=lambda c: (c[2][1], c[2][0])):
+        x, y = pos
+        kitchen_positions.append({"x": x, "y": y, "type": _snake(counter_type).lower()})
+        if counter_type == "Counter":
+            continue
+        key = task_key(counter_type, item)
+        counts[key] = counts.get(key, 0) + 1
+        if counter_type == "CuttingBoard":
+            key = f"{key}_{counts[key]}"
+        elif counts[key] > 1:
+            key = f"{key}_{counts[key]}"
+        task_positions[key] = (x, y)
+    navigation = NavigationCache.from_positions(kitchen_positions, task_positions)
+    tiles = {key: navigation.interaction_tiles(pos) for key, pos in task_positions.items()}
+    return LayoutInfo(kitchen_positions, task_positions, tiles)
+
+
+def counters_from_layout(text, layout_chars=DEFAULT_LAYOUT_CHARS):
+    """(type, item, pos) triples from a .layout grid; pos is (column, row)."""
+    counters = []
+    grid = text.split("\n\n")[0] if "\n\n" in text else text
+    for y, row in enumerate(line for line in grid.splitlines() if line.strip()):
+        if row.startswith(";"):
+            break
+        for x, ch in enumerate(row.rstrip()):
+            name = layout_chars.get(ch, "Counter")
+            if name in WALKABLE:
+                continue
+            if name in COUNTER_TYPES:
+                counters.append((name, None, (x, y)))
+            elif name in EQUIPMENT_STATIONS:
+                counters.append((EQUIPMENT_STATIONS[name], name, (x, y)))
+            else:
+                counters.append(("Dispenser", name, (x, y)))
+    return counters
+
+
+def counters_from_state(state):
+    """(type, item, pos) triples from the environment state's counters."""
+    counters = []
+    for counter in state.get("counters", ()):
+        counter_type = counter.get("type", "Counter")
+        occupied_by = counter.get("occupied_by")
+        if isinstance(occupied_by, list):
+            occupied_by = occupied_by[0] if occupied_by else None
+        item = occupied_by.get("type") if isinstance(occupied_by, dict) else None
+        if counter_type.endswith("Dispenser") and counter_type not in ("Dispenser", "PlateDispenser"):
+            counter_type, item = "Dispenser", counter_type[: -len("Dispenser")]
+        elif counter_type not in ("Dispenser",) and item not in EQUIPMENT_STATIONS:
+            item = None
+        counters.append((counter_type, item, grid_key(counter["pos"])))
+    return counters
+
+
+def layout_chars_from_config(env_config_path):
+    """layout_chars from an environment_config.yaml; yaml cannot key on "#"."""
+    with open(env_config_path) as f:
+        chars = (yaml.safe_load(f) or {}).get("layout_chars") or {}
+    aliases = {"hash": "#", "space": " "}
+    return {aliases.get(str(k), str(k)): v for k, v in chars.items()}
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _cached(digest, build, cache_dir=None):
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    path = cache_dir / f"{digest}.json"
+    try:
+        data = json.loads(path.read_text())
+        if data.get("version") == CACHE_VERSION:
+            return LayoutInfo.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+    info = build()
+    info.digest = digest
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(info.to_dict(), f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return info
+
+
+_memory = {}
+
+
+def load_layout(path, layout_chars=DEFAULT_LAYOUT_CHARS, cache_dir=None):
+    """LayoutInfo for a .layout file, cached on disk by content hash."""
+    text = Path(path).read_text()
+    digest = _digest({"layout": text, "chars": layout_chars})
+    if digest not in _memory:
+        _memory[digest] = _cached(digest, lambda: derive(counters_from_layout(text, layout_chars)), cache_dir)
+    return _memory[digest]
+
+
+def layout_for_state(state, cache_dir=None):
+    """LayoutInfo for the kitchen described by a state's counters, cached by hash."""
+    counters = counters_from_state(state)
+    digest = _digest({"counters": [[t, i, list(p)] for t, i, p in counters]})
+    if digest not in _memory:
+        _memory[digest] = _cached(digest, lambda: derive(counters), cache_dir)
+    return _memory[digest]
@@ -1,32 +1,113 @@
 
+import logging
+
 from cooperative_cuisine.base_agent.base_agent import BaseAgent, run_agent_from_args
 from cooperative_cuisine.base_agent.agent_task import Task, TaskStatus
-from intention_utils import save_intentions
-from constants import TASK_POSITIONS
+from intention_broker import get_intention_manager
+from intention_utils import get_intention_writer
+from constants import KITCHEN_POSITIONS, PLATE_STATIONS, TASK_POSITIONS
+from state_model import KitchenState
+from navigation import get_navigation
+from pipeline import BURGER_ORDER, BURGER_PIPELINE, BURGER_SEGMENTS, IDLE, PLATE, Pipeline, burger_pipeline, serve_steps
+from route_optimizer import RouteOptimizer, plate_candidates, row_stops
+from task_allocator import TaskAllocator
+from layout_analyzer import layout_for_state
+from path_planner import ARRIVED, MOVE_SECONDS, WAIT, env_seconds, get_path_planner
 import numpy as np
 from cooperative_cuisine.action import ActionType
 
+logger = logging.getLogger(__name__)
+
+# Route model of burger_pipeline(): the meat segments are fixed around the
+# bun/lettuce/tomato segments, whose order is free.
+ROUTE_SLOTS = (
+    ("MEAT_START", row_stops(BURGER_SEGMENTS["MEAT_START"])),
+    *(None for _ in BURGER_ORDER),
+    ("MEAT_FINISH", row_stops(BURGER_SEGMENTS["MEAT_FINISH"])),
+)
+ROUTE_FREE = tuple((name, row_stops(BURGER_SEGMENTS[name])) for name in BURGER_ORDER)
+ROUTE_FINISH = row_stops(serve_steps(pan="PAN"))
+
+# Team mode: what an agent runs while it has no subtask.
+WAITING = [{"name": "WAITING", "kind": IDLE}]
+# Env seconds a subtask may take before it is handed back to the team.
+SUBTASK_TIMEOUT = 60.0
+
 
 class FullBurgerAgent(BaseAgent):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, intention_manager=None, intention_writer=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.pipeline_step = "GET_PLATE"
+        # Process-wide by default; private ones keep several teams in one process apart.
+        self.intention_manager = intention_manager if intention_manager is not None else get_intention_manager()
+        self.pipeline = Pipeline(BURGER_PIPELINE)
+        self.step_index = 0
         self.plate_counter_pos = None
+        self._idle_pipeline = None
         self.just_arrived = False
         self.returning_pan = False
+        self.kitchen = KitchenState()
+        # Filled in place from the state arrays on every tick; current_agent_pos
+        # gets a copy, so positions kept elsewhere (plans, traces) never change.
+        self._pos = np.zeros(2)
+        # Replaced by positions derived from the real kitchen on the first state.
+        self.layout = None
+        self.task_positions = TASK_POSITIONS
+        self.navigation = get_navigation()
+        self.path_planner = get_path_planner(self.navigation, self.intention_manager)
+        self.route = RouteOptimizer(self.navigation, self.task_positions, plate_candidates(KITCHEN_POSITIONS, TASK_POSITIONS))
+        self.intention_writer = intention_writer if intention_writer is not None else get_intention_writer()
+        # Set on the first tick that sees teammates; the burger is then split
+        # into subtasks shared through the IntentionManager.
+        self.allocator = None
+        self.subtask = None
+        self.subtask_started = None
+
+    @property
+    def pipeline_step(self):
+        return self.pipeline[self.step_index].name
+
+    @pipeline_step.setter
+    def pipeline_step(self, name):
+        self.step_index = self.pipeline.index_of(name)
+
+    def travel_cost(self, target):
+        """Exact walking steps from the current position to target."""
+        return self.navigation.travel_cost(self.current_agent_pos, target)
+
+    def find_free_counter(self):
+        """Free counter on the shortest burger route, else the least walking to the plate stations."""
+        for _, plate, _ in self.route.plan(ROUTE_SLOTS, ROUTE_FREE, finish=ROUTE_FINISH):
+            if self.kitchen.is_free(plate):
+                return np.array(plate, dtype=float)
+        stations = [self.task_positions[name] for name in PLATE_STATIONS if name in self.task_positions]
+        counter = self.kitchen.free_counters.best_for_stations(stations, self.navigation)
+        if counter is None:
+            counter = self.kitchen.free_counters.nearest(self.current_agent_pos, self.navigation)
+        if counter is None:
+            return np.array(self.task_positions["CUTTING_BOARD_1"])
+        return np.array(counter["pos"])
+
+    def use_layout(self, layout):
+        """Switch task positions and path data to a layout derived at runtime."""
+        self.layout = layout
+        if not layout.task_positions:
+            return
+        self.task_positions = layout.task_positions
+        self.navigation = get_navigation(layout.kitchen_positions, layout.task_positions)
+        self.path_planner = get_path_planner(self.navigation, self.intention_manager)
+        self.route = RouteOptimizer(
+            self.navigation, self.task_positions, plate_candidates(layout.kitchen_positions, layout.task_positions)
+        )
 
     def parse_state(self, state):
+        if self.layout is None and state.get("counters"):
+            self.use_layout(layout_for_state(state))
+        self.kitchen.apply(state)
         self.state_counters = state["counters"]
-        for player in state["players"]:
-            if player["id"] == self.own_player_id:
-                self.current_agent_pos = np.array(player["pos"])
-                self.held_item = player["holding"]
-                if player["current_nearest_counter_id"]:
-                    for counter in self.state_counters:
-                        if counter["id"] == player["current_nearest_counter_id"]:
-                            self.nearest_counter = counter
-                            return
-        self.nearest_counter = None
+        if self.kitchen.player_pos(self.own_player_id, self._pos):
+            self.current_agent_pos = self._pos.copy()
+            self.held_item = self.kitchen.player(self.own_player_id)["holding"]
+        self.nearest_counter = self.kitchen.nearest_counter(self.own_player_id)
 
     async def handle_task(self, state):
         t = self.current_task.task_type.upper()
@@ -46,330 +127,179 @@ class FullBurgerAgent(BaseAgent):
             await self._execute_action(action_type=ActionType.PICK_UP_DROP)
             self.finalize_current_task(TaskStatus.SUCCESS, "Picked up or dropped off")
 
-    async def manage_tasks(self, state):
-        if self.current_task:
-            return
-
-        save_intentions({self.own_player_id: {"step": self.pipeline_step}})
-
-        # 1) Get plate
-        if self.pipeline_step == "GET_PLATE":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["PLATE_DISPENSER"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "PLACE_PLATE"
-                self.just_arrived = False
-            return
-
-        # 2) Place plate
-        if self.pipeline_step == "PLACE_PLATE":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                self.plate_counter_pos = np.array(self.nearest_counter["pos"])
-                print(f"Plate placed at {self.plate_counter_pos}")
-                self.pipeline_step = "GET_BUN"
-                self.just_arrived = False
-            else:
-                # Free counter
-                free_counter_pos = None
-                for c in self.state_counters:
-                    if (
-                        c.get("occupied_by") is None
-                        and c.get("type") not in ("CuttingBoard", "Pan")
-                    ):
-                        free_counter_pos = np.array(c["pos"])
-                        break
-                if free_counter_pos is None:
-                    free_counter_pos = np.array(TASK_POSITIONS["CUTTING_BOARD_1"])
-                self.set_current_task(Task(Task.GOTO, task_args=free_counter_pos))
-                self.just_arrived = True
-            return
-
-        # 3) Get bun
-        if self.pipeline_step == "GET_BUN":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    print("Picked bun.")
-                    self.pipeline_step = "PLACE_BUN"
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["GET_BUN"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "PLACE_BUN"
-                self.just_arrived = False
-            return
-
-        # 4) Place bun
-        if self.pipeline_step == "PLACE_BUN":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                print("Bun placed.")
-                self.pipeline_step = "GET_LETTUCE"
-                self.just_arrived = False
-            else:
-                self.set_current_task(Task(Task.GOTO, task_args=self.plate_counter_pos))
-                self.just_arrived = True
-            return
-
-        # 5) Get lettuce
-        if self.pipeline_step == "GET_LETTUCE":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["GET_LETTUCE"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "CUT_LETTUCE"
-                self.just_arrived = False
-            return
-
-        # 6) Cut lettuce
-        if self.pipeline_step == "CUT_LETTUCE":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                self.pipeline_step = "CHOPPING_LETTUCE"
-                self.just_arrived = False
-            else:
-                pos = TASK_POSITIONS["CUTTING_BOARD_1"]
-                self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                self.just_arrived = True
-            return
-
-        if self.pipeline_step == "CHOPPING_LETTUCE":
-            if self.held_item:
-                self.pipeline_step = "CUT_LETTUCE"
-            else:
-                self.set_current_task(Task(Task.INTERACT))
-                self.pipeline_step = "PICK_CHOPPED_LETTUCE"
-            return
-
-        if self.pipeline_step == "PICK_CHOPPED_LETTUCE":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["CUTTING_BOARD_1"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "PLACE_LETTUCE"
-                self.just_arrived = False
-            return
-
-        if self.pipeline_step == "PLACE_LETTUCE":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                print("Lettuce placed.")
-                self.pipeline_step = "GET_TOMATO"
-                self.just_arrived = False
-            else:
-                self.set_current_task(Task(Task.GOTO, task_args=self.plate_counter_pos))
-                self.just_arrived = True
-            return
-
-        # 7) Get tomato
-        if self.pipeline_step == "GET_TOMATO":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["GET_TOMATO"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "CUT_TOMATO"
-                self.just_arrived = False
-            return
-
-        # 8) Cut tomato
-        if self.pipeline_step == "CUT_TOMATO":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                self.pipeline_step = "CHOPPING_TOMATO"
-                self.just_arrived = False
-            else:
-                pos = TASK_POSITIONS["CUTTING_BOARD_1"]
-                self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                self.just_arrived = True
-            return
-
-        if self.pipeline_step == "CHOPPING_TOMATO":
-            if self.held_item:
-                self.pipeline_step = "CUT_TOMATO"
-            else:
-                self.set_current_task(Task(Task.INTERACT))
-                self.pipeline_step = "PICK_CHOPPED_TOMATO"
-            return
-
-        if self.pipeline_step == "PICK_CHOPPED_TOMATO":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["CUTTING_BOARD_1"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "PLACE_TOMATO"
-                self.just_arrived = False
-            return
-
-        if self.pipeline_step == "PLACE_TOMATO":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                print(" Tomato placed.")
-                self.pipeline_step = "GET_MEAT"
-                self.just_arrived = False
-            else:
-                self.set_current_task(Task(Task.GOTO, task_args=self.plate_counter_pos))
-                self.just_arrived = True
-            return
-
-        # 9) Get meat
-        if self.pipeline_step == "GET_MEAT":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["GET_MEAT"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "CUT_MEAT"
-                self.just_arrived = False
-            return
-
-        if self.pipeline_step == "CUT_MEAT":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                self.pipeline_step = "CHOPPING_MEAT"
-                self.just_arrived = False
-            else:
-                pos = TASK_POSITIONS["CUTTING_BOARD_1"]
-                self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                self.just_arrived = True
-            return
-
-        if self.pipeline_step == "CHOPPING_MEAT":
-            if self.held_item:
-                self.pipeline_step = "CUT_MEAT"
-            else:
-                self.set_current_task(Task(Task.INTERACT))
-                self.pipeline_step = "PICK_CHOPPED_MEAT"
-            return
-
-        if self.pipeline_step == "PICK_CHOPPED_MEAT":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["CUTTING_BOARD_1"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
-            else:
-                self.pipeline_step = "COOK_MEAT"
-                self.just_arrived = False
-            return
+    async def handle_task_goto(self, state):
+        # Walk cell by cell: alone along the layout's distance field, with
+        # teammates around along the cells reserved in the shared space-time
+        # table. BaseAgent does the final approach and facing.
+        if len(state.get("players", ())) < 2:
+            step = self.navigation.next_step(self.current_agent_pos, self.current_task.task_args)
+        else:
+            step = self.path_planner.next_cell(
+                self.own_player_id, self.current_agent_pos, self.current_task.task_args, env_seconds(state)
+            )
+        if step is None or step == ARRIVED:
+            await super().handle_task_goto(state)
+        elif step != WAIT:
+            direction = np.array(step, dtype=float) - self.current_agent_pos
+            norm = np.linalg.norm(direction)
+            if norm > 0:
+                await self._execute_action(
+                    action_type=ActionType.MOVEMENT, action_data=direction / norm, duration=MOVE_SECONDS
+                )
+
+    def _target_pos(self, target):
+        if target == PLATE:
+            return self.plate_counter_pos
+        return np.array(self.task_positions[target])
+
+    def _goto(self, pos):
+        self.set_current_task(Task(Task.GOTO, task_args=pos))
+        self.just_arrived = True
+
+    def _put(self, step):
+        self.set_current_task(Task(Task.PUT))
+        self.just_arrived = False
+        if step.message:
+            logger.info("Player %s: %s", self.own_player_id, step.message)
 
-        if self.pipeline_step == "COOK_MEAT":
+    def _run_fetch(self, step):
+        if not self.held_item:
             if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                self.pipeline_step = "COOKING_MEAT"
-                self.just_arrived = False
-            else:
-                pos = TASK_POSITIONS["PAN"]
-                self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                self.just_arrived = True
-            return
-
-        if self.pipeline_step == "COOKING_MEAT":
-            if self.held_item:
-                self.pipeline_step = "COOK_MEAT"
-            else:
-                self.set_current_task(Task(Task.INTERACT))
-                self.pipeline_step = "PICK_COOKED_MEAT"
-            return
-
-        if self.pipeline_step == "PICK_COOKED_MEAT":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["PAN"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
+                self._put(step)
+                if step.advance_on_put:
+                    self.step_index = step.next
             else:
+                self._goto(self._target_pos(step.target))
+        else:
+            if step.returning_pan:
                 self.returning_pan = True
-                self.pipeline_step = "PLACE_MEAT"
-                self.just_arrived = False
-            return
+            self.step_index = step.next
+            self.just_arrived = False
 
-        if self.pipeline_step == "PLACE_MEAT":
-            if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                print("Meat placed.")
-                self.pipeline_step = "RETURN_PAN"
-                self.just_arrived = False
-            else:
-                self.set_current_task(Task(Task.GOTO, task_args=self.plate_counter_pos))
-                self.just_arrived = True
-            return
+    def _run_deliver(self, step):
+        if self.just_arrived:
+            self._put(step)
+            self.step_index = step.next
+        else:
+            pos = self._target_pos(step.target)
+            if pos is None:
+                # A teammate has not placed the plate yet.
+                return
+            self._goto(pos)
+
+    def _run_process(self, step):
+        if self.held_item:
+            self.step_index = step.retry
+        else:
+            self.set_current_task(Task(Task.INTERACT))
+            self.step_index = step.next
+
+    def _run_place_plate(self, step):
+        if self.just_arrived:
+            self._put(step)
+            self.plate_counter_pos = np.array(self.nearest_counter["pos"])
+            logger.info("Player %s: plate placed at %s", self.own_player_id, self.plate_counter_pos)
+            if self.allocator is None:
+                # Visit the ingredients in the order that walks least from this plate.
+                order = self.route.order_for(ROUTE_SLOTS, ROUTE_FREE, self.plate_counter_pos, finish=ROUTE_FINISH)
+                if order:
+                    self.pipeline = Pipeline(burger_pipeline(order))
+            self.step_index = step.next
+        else:
+            self._goto(self.find_free_counter())
 
-        if self.pipeline_step == "RETURN_PAN":
+    def _run_serve(self, step):
+        # Pick the meal up from the plate counter, then carry it to the window.
+        if not self.held_item:
             if self.just_arrived:
-                self.set_current_task(Task(Task.PUT))
-                self.pipeline_step = "SERVE"
-                self.just_arrived = False
+                self._put(step)
             else:
-                pos = TASK_POSITIONS["PAN"]
-                self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                self.just_arrived = True
-            return
+                self._goto(self._target_pos(step.pickup))
+        elif self.just_arrived:
+            self._put(step)
+            self.step_index = step.next
+        else:
+            self._goto(self._target_pos(step.target))
+
+    def _run_idle(self, step):
+        # Runs every tick while idle; log the first one only.
+        if self._idle_pipeline is not self.pipeline:
+            self._idle_pipeline = self.pipeline
+            logger.debug("Player %s: all done, idling", self.own_player_id)
+
+    def _run_wait(self, step):
+        # Stand at the station until the item is done; the next FETCH then
+        # picks it up without walking.
+        if self.kitchen.item_ready(self._target_pos(step.target), step.item):
+            self.step_index = step.next
+        elif not self.just_arrived:
+            self._goto(self._target_pos(step.target))
+
+    # Indexed by pipeline step kind (pipeline.FETCH, pipeline.DELIVER, ...).
+    STEP_HANDLERS = (_run_fetch, _run_deliver, _run_process, _run_place_plate, _run_serve, _run_idle, _run_wait)
+
+    def finalize_current_task(self, status, *args, **kwargs):
+        super().finalize_current_task(status, *args, **kwargs)
+        if status == TaskStatus.FAILED and self.subtask is not None:
+            self._abandon_subtask()
+
+    def _abandon_subtask(self):
+        """Team mode: hand the running subtask back so an idle teammate can redo it."""
+        logger.info("Player %s: abandoning subtask %s", self.own_player_id, self.subtask.name)
+        self.allocator.fail()
+        self.subtask = None
+        self.pipeline = Pipeline(WAITING)
+        self.step_index = 0
+        self.just_arrived = False
+        self.returning_pan = False
+
+    def _next_subtask(self, state):
+        """Team mode: report the finished subtask and claim the next one."""
+        if self.subtask is not None:
+            is_plate = self.subtask.name == "PLATE"
+            self.allocator.complete(plate=self.plate_counter_pos if is_plate else None)
+        self.subtask = self.allocator.next_subtask(state["players"])
+        if self.subtask is not None:
+            self.subtask_started = env_seconds(state)
+            self.pipeline = self.subtask.pipeline
+            self.step_index = 0
+            self.just_arrived = False
+            self.returning_pan = False
 
-        # Serve
-        if self.pipeline_step == "SERVE":
-            if not self.held_item:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.just_arrived = False
-                else:
-                    self.set_current_task(Task(Task.GOTO, task_args=self.plate_counter_pos))
-                    self.just_arrived = True
+    async def manage_tasks(self, state):
+        if self.subtask is not None and env_seconds(state) - self.subtask_started > SUBTASK_TIMEOUT:
+            if self.current_task:
+                self.finalize_current_task(TaskStatus.FAILED, f"Subtask {self.subtask.name} timed out")
             else:
-                if self.just_arrived:
-                    self.set_current_task(Task(Task.PUT))
-                    self.pipeline_step = "DONE"
-                    self.just_arrived = False
-                else:
-                    pos = TASK_POSITIONS["SERVING_WINDOW"]
-                    self.set_current_task(Task(Task.GOTO, task_args=np.array(pos)))
-                    self.just_arrived = True
+                self._abandon_subtask()
+        if self.current_task:
             return
 
-        if self.pipeline_step == "DONE":
-            print("[DEBUG] All done. Idling.")
+        if self.allocator is None and len(state.get("players", ())) > 1:
+            self.allocator = TaskAllocator(
+                self.own_player_id, manager=self.intention_manager,
+                navigation=self.navigation, task_positions=self.task_positions,
+            )
+            self.subtask = None
+            self.pipeline = Pipeline(WAITING)
+            self.step_index = 0
+        if self.allocator is not None:
+            # Read the team's news every tick, not just between subtasks:
+            # the plate may be placed while this agent is half way through its own.
+            self.allocator.refresh()
+            if self.pipeline[self.step_index].kind == IDLE:
+                self._next_subtask(state)
+                if self.subtask is None:
+                    return
+            if self.subtask.name != "PLATE":
+                plate = self.allocator.plate_pos
+                self.plate_counter_pos = None if plate is None else np.array(plate)
+
+        step = self.pipeline[self.step_index]
+        self.intention_writer.record(self.own_player_id, {"step": step.name})
+        self.STEP_HANDLERS[step.kind](self, step)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
     run_agent_from_args(FullBurgerAgent)
-
-
-
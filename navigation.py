@@ -0,0 +1,203 @@
+# navigation.py
+
+from collections import deque
+from functools import lru_cache
+
+from constants import KITCHEN_POSITIONS, TASK_POSITIONS
+from state_model import grid_key
+
+INF = float("inf")
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class NavigationCache:
+    """BFS distance fields over the kitchen grid, built once per layout.
+
+    Every interaction target (a counter, dispenser, station, ...) gets a
+    distance field seeded from the walkable tiles next to it, so travel
+    costs and next steps are table lookups instead of path searches.
+    """
+
+    def __init__(self, blocked, width, height, targets=()):
+        self.width = width
+        self.height = height
+        self.blocked = frozenset(blocked)
+        self._fields = {}
+        for target in targets:
+            self.distance_field(target)
+
+    @classmethod
+    def from_positions(cls, kitchen_positions, task_positions):
+        kitchen_positions = accessible_positions(kitchen_positions, task_positions)
+        blocked = {(p["x"], p["y"]) for p in kitchen_positions}
+        blocked.update(tuple(pos) for pos in task_positions.values())
+        width = max(x for x, _ in blocked) + 1
+        height = max(y for _, y in blocked) + 1
+        return cls(blocked, width, height, targets=task_positions.values())
+
+    def in_bounds(self, cell):
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height
+
+    def walkable(self, cell):
+        return self.in_bounds(cell) and cell not in self.blocked
+
+    def interaction_tiles(self, target):
+        """Walkable tiles from which the target can be reached."""
+        target = grid_key(target)
+        if self.walkable(target):
+            return [target]
+        return [
+            (target[0] + dx, target[1] + dy)
+            for dx, dy in NEIGHBOURS
+            if self.walkable((target[0] + dx, target[1] + dy))
+        ]
+
+    def distance_field(self, target):
+        """Flat list of step counts to the target, indexed by y * width + x."""
+        target = grid_key(target)
+        field = self._fields.get(target)
+        if field is not None:
+            return field
+
+        width = self.width
+        field = [INF] * (width * self.height)
+        queue = deque()
+        for cell in self.interaction_tiles(target):
+            field[cell[1] * width + cell[0]] = 0
+            queue.append(cell)
+        while queue:
+            x, y = queue.popleft()
+            dist = field[y * width + x] + 1
+            for dx, dy in NEIGHBOURS:
+                nxt = (x + dx, y + dy)
+                if not self.walkable(nxt):
+                    continue
+                idx = nxt[1] * width + nxt[0]
+                if field[idx] > dist:
+                    field[idx] = dist
+                    queue.append(nxt)
+
+        self._fields[target] = field
+        return field
+
+    def travel_cost(self, pos, target):
+        """Steps from pos to an interaction tile of target (inf if unreachable)."""
+        cell = grid_key(pos)
+        if not self.in_bounds(cell):
+            return INF
+        return self.distance_field(target)[cell[1] * self.width + cell[0]]
+
+    def next_step(self, pos, target):
+        """Neighbouring cell one step closer to target, or None if arrived/stuck."""
+        field = self.distance_field(target)
+        x, y = grid_key(pos)
+        best, best_dist = None, INF
+        if self.in_bounds((x, y)):
+            best_dist = field[y * self.width + x]
+        if best_dist == 0:
+            return None
+        for dx, dy in NEIGHBOURS:
+            nxt = (x + dx, y + dy)
+            if self.walkable(nxt) and field[nxt[1] * self.width + nxt[0]] < best_dist:
+                best, best_dist = nxt, field[nxt[1] * self.width + nxt[0]]
+        return best
+
+    def path(self, pos, target):
+        """Cells from pos (exclusive) to the interaction tile of target."""
+        cells = []
+        step = self.next_step(pos, target)
+        while step is not None:
+            cells.append(step)
+            step = self.next_step(step, target)
+        return cells
+
+    def station_cost(self, source, target):
+        """Steps between standing at source and standing at target."""
+        tiles = self.interaction_tiles(source)
+        if not tiles:
+            return INF
+        return min(self.travel_cost(tile, target) for tile in tiles)
+
+
+def _floor(blocked, width, height):
+    """Largest connected set of walkable cells."""
+    seen, best = set(), set()
+    for start in ((x, y) for y in range(height) for x in range(width)):
+        if start in blocked or start in seen:
+            continue
+        region, queue = {start}, deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for dx, dy in NEIGHBOURS:
+                nxt = (x + dx, y + dy)
+                if (0 <= nxt[0] < width and 0 <= nxt[1] < height
+                        and nxt not in blocked and nxt not in region):
+                    region.add(nxt)
+                    queue.append(nxt)
+        seen |= region
+        if len(region) > len(best):
+            best = region
+    return best
+
+
+def _aisle(station, floor, blocked, stations, width, height):
+    """Blocked cells to clear so station touches floor, along a shortest path."""
+    parents = {station: None}
+    queue = deque([station])
+    while queue:
+        cell = queue.popleft()
+        for dx, dy in NEIGHBOURS:
+            nxt = (cell[0] + dx, cell[1] + dy)
+            if nxt in parents or not (0 <= nxt[0] < width and 0 <= nxt[1] < height):
+                continue
+            if nxt in floor:
+                path = []
+                while cell != station:
+                    path.append(cell)
+                    cell = parents[cell]
+                return path
+            if nxt in blocked and nxt not in stations:
+                parents[nxt] = cell
+                queue.append(nxt)
+    return []
+
+
+def accessible_positions(kitchen_positions, task_positions):
+    """kitchen_positions without the counters that wall a station in.
+
+    A station is only usable from a walkable tile next to it. Layouts
+    read from a real kitchen always have one; hand-written ones such as
+    KITCHEN_POSITIONS may not (its rows 0-4 are solid counter), so for
+    every station cut off from the main floor the counters on a shortest
+    path to it are dropped, leaving a one-cell aisle.
+    """
+    stations = {tuple(pos) for pos in task_positions.values()}
+    blocked = {(p["x"], p["y"]) for p in kitchen_positions} | stations
+    width = max(x for x, _ in blocked) + 1
+    height = max(y for _, y in blocked) + 1
+    floor = _floor(blocked, width, height)
+    cleared = set()
+    for key in sorted(task_positions):
+        station = tuple(task_positions[key])
+        if any((station[0] + dx, station[1] + dy) in floor for dx, dy in NEIGHBOURS):
+            continue
+        aisle = _aisle(station, floor, blocked, stations, width, height)
+        blocked.difference_update(aisle)
+        floor.update(aisle)
+        cleared.update(aisle)
+    if not cleared:
+        return kitchen_positions
+    return [p for p in kitchen_positions if (p["x"], p["y"]) not in cleared]
+
+
+@lru_cache(maxsize=8)
+def _navigation_for(blocked_key, task_key):
+    kitchen_positions = [{"x": x, "y": y} for x, y in blocked_key]
+    return NavigationCache.from_positions(kitchen_positions, dict(task_key))
+
+
+def get_navigation(kitchen_positions=KITCHEN_POSITIONS, task_positions=TASK_POSITIONS):
+    """Shared NavigationCache for a layout; built on first use only."""
+    blocked_key = tuple(sorted((p["x"], p["y"]) for p in kitchen_positions))
+    task_key = tuple(sorted((k, tuple(v)) for k, v in task_positions.items()))
+    return _navigation_for(blocked_key, task_key)
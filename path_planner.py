@@ -0,0 +1,328 @@
+# path_planner.py
+
+import functools
+import heapq
+import threading
+import time
+import weakref
+from datetime import datetime
+
+import yaml
+
+from intention_broker import get_intention_manager
+from navigation import NEIGHBOURS
+from state_model import INF, grid_key
+
+# Planning horizon in steps; plans are refreshed once half of it is used up.
+DEFAULT_WINDOW = 8
+# Length of one movement action; one frame of a 30 FPS loop per tick.
+MOVE_SECONDS = 1 / 30
+# cooperative_cuisine's player_config.speed_units_per_seconds (cells per second).
+DEFAULT_PLAYER_SPEED = 6.0
+
+ARRIVED = "arrived"
+WAIT = "wait"
+# Intention action under which reservations are shared between processes.
+RESERVE = "reserve"
+
+
+@functools.lru_cache(maxsize=None)
+def player_speed(env_config_path=None):
+    """Walking speed in cells per second from environment_config.yaml."""
+    if env_config_path is None:
+        try:
+            from cooperative_cuisine import ROOT_DIR
+        except ImportError:
+            return DEFAULT_PLAYER_SPEED
+        env_config_path = ROOT_DIR / "configs" / "environment_config.yaml"
+    try:
+        with open(env_config_path) as f:
+            return float(yaml.safe_load(f)["player_config"]["speed_units_per_seconds"])
+    except (OSError, KeyError, TypeError, ValueError):
+        return DEFAULT_PLAYER_SPEED
+
+
+def step_seconds(env_config_path=None):
+    """Time to walk one cell, the length of one planner time step."""
+    return 1.0 / player_speed(env_config_path)
+
+
+def env_seconds(state):
+    """Environment clock in seconds from a state, or the wall clock."""
+    env_time = state.get("env_time") if state else None
+    if isinstance(env_time, str):
+        try:
+            return datetime.fromisoformat(env_time).timestamp()
+        except ValueError:
+            pass
+    return time.monotonic()
+
+
+def reservation_key(agent_id):
+    return f"{RESERVE}:{agent_id}"
+
+
+class ReservationTable:
+    """Space-time reservations shared by every agent's planner.
+
+    (cell, step) slots stop two agents from being on one cell at once;
+    (from, to, step) edges stop two agents swapping cells head-on.
+
+    With a manager (an IntentionManager or RemoteIntentionManager) every
+    reservation is also published as a "reserve" intention, and the
+    reservations other processes published are honoured too, so agents
+    running in separate processes plan around each other. Call refresh()
+    before planning to pick up the latest remote reservations.
+    """
+
+    def __init__(self, manager=None):
+        self._cells = {}
+        self._edges = {}
+        self._keys_by_agent = {}
+        self.lock = threading.Lock()
+        # Weak, so a planner cached for a private manager does not keep it alive.
+        self._manager = weakref.ref(manager) if manager is not None else lambda: None
+        self._remote_snapshot = None
+        self._remote_cells = {}
+        self._remote_edges = {}
+
+    @property
+    def manager(self):
+        return self._manager()
+
+    def refresh(self):
+        """Rebuild the remote reservations if the shared intentions changed."""
+        manager = self.manager
+        if manager is None:
+            return
+        snapshot = manager.get_all_intentions()
+        if snapshot is self._remote_snapshot:
+            return
+        self._remote_snapshot = snapshot
+        cells, edges = {}, {}
+        for intention in snapshot.values():
+            if intention.action != RESERVE:
+                continue
+            agent_id, start, path = intention.target
+            if agent_id in self._keys_by_agent:
+                continue  # planned in this process; the local entries are current
+            for i, cell in enumerate(path):
+                cells[(tuple(cell), start + i)] = agent_id
+                if i:
+                    edges[(tuple(path[i - 1]), tuple(cell), start + i - 1)] = agent_id
+        self._remote_cells = cells
+        self._remote_edges = edges
+
+    def cell_free(self, agent_id, cell, t):
+        owner = self._cells.get((cell, t)) or self._remote_cells.get((cell, t))
+        return owner is None or owner == agent_id
+
+    def move_free(self, agent_id, source, target, t):
+        """Whether agent_id may step source -> target between t and t + 1."""
+        if not self.cell_free(agent_id, target, t + 1):
+            return False
+        owner = self._edges.get((target, source, t)) or self._remote_edges.get((target, source, t))
+        return owner is None or owner == agent_id
+
+    def reserve(self, agent_id, cells, start):
+        """Replace agent_id's reservations with cells[i] at step start + i.
+
+        Returns the agents whose slots were taken over; their plans are
+        no longer valid.
+        """
+        self.release(agent_id)
+        displaced = set()
+        keys = []
+        for i, cell in enumerate(cells):
+            key = (cell, start + i)
+            owner = self._cells.get(key)
+            if owner is not None and owner != agent_id:
+                displaced.add(owner)
+            self._cells[key] = agent_id
+            keys.append(key)
+        edges = [(cells[i - 1], cells[i], start + i - 1) for i in range(1, len(cells))]
+        for edge in edges:
+            self._edges[edge] = agent_id
+        self._keys_by_agent[agent_id] = (keys, edges)
+        if self.manager is not None:
+            self.manager.update_intention(
+                reservation_key(agent_id), RESERVE, (agent_id, start, tuple(cells)), "planned"
+            )
+        return displaced
+
+    def release(self, agent_id):
+        cells, edges = self._keys_by_agent.pop(agent_id, ((), ()))
+        for key in cells:
+            if self._cells.get(key) == agent_id:
+                del self._cells[key]
+        for key in edges:
+            if self._edges.get(key) == agent_id:
+                del self._edges[key]
+        if self.manager is not None and cells:
+            self.manager.clear_intention(reservation_key(agent_id))
+
+    def __len__(self):
+        return len(self._cells)
+
+
+class Plan:
+    __slots__ = ("target", "start", "cells")
+
+    def __init__(self, target, start, cells):
+        self.target = target
+        self.start = start
+        self.cells = cells
+
+    def index_of(self, cell, t):
+        """Index of step t in the plan, or None if the agent is not where it reserved.
+
+        An agent that already crossed into the cell reserved for t + 1 is
+        on plan; it is just early.
+        """
+        i = t - self.start
+        if 0 <= i < len(self.cells) and (
+            self.cells[i] == cell or (i + 1 < len(self.cells) and self.cells[i + 1] == cell)
+        ):
+            return i
+        return None
+
+
+class CooperativePlanner:
+    """Windowed cooperative A* (WHCA*) over a shared reservation table.
+
+    Each agent searches (cell, step) space for ``window`` steps ahead,
+    avoiding slots already reserved by others, with the exact distance
+    from NavigationCache as heuristic, and reserves what it found. An
+    agent is only replanned when its own plan runs out, its target
+    changes, it drifts off its reserved cells or an agent that cannot move
+    claims a slot it had reserved; everyone else keeps theirs. A step is
+    the time it takes to walk one cell at the players' speed.
+    """
+
+    def __init__(self, navigation, table=None, window=DEFAULT_WINDOW, seconds_per_step=None):
+        self.navigation = navigation
+        self.table = table if table is not None else ReservationTable()
+        self.window = window
+        self.seconds_per_step = seconds_per_step if seconds_per_step is not None else step_seconds()
+        self._plans = {}
+        self.replans = 0
+
+    def to_step(self, seconds):
+        return int(seconds / self.seconds_per_step)
+
+    def next_cell(self, agent_id, pos, target, now):
+        """ARRIVED, WAIT or the cell agent_id should move to next.
+
+        now is in seconds (see env_seconds).
+        """
+        cell = grid_key(pos)
+        target = grid_key(target)
+        t = self.to_step(now)
+        with self.table.lock:
+            self.table.refresh()
+            if self.navigation.travel_cost(cell, target) == 0:
+                # Hold the interaction tile while the agent works there.
+                plan = self._plans.get(agent_id)
+                if (plan is not None and plan.target == target and 0 <= t - plan.start < self.window // 2
+                        and set(plan.cells) == {cell}):
+                    return ARRIVED
+                self._plans[agent_id] = Plan(target, t, [cell] * (self.window + 1))
+                for other in self.table.reserve(agent_id, self._plans[agent_id].cells, t):
+                    self._plans.pop(other, None)
+                return ARRIVED
+            plan = self._plans.get(agent_id)
+            i = None
+            if plan is not None and plan.target == target and t - plan.start < self.window // 2:
+                i = plan.index_of(cell, t)
+            if i is not None and i + 1 < len(plan.cells) and not self.table.move_free(
+                agent_id, cell, plan.cells[i + 1], t
+            ):
+                # Another process reserved the next move since we planned it.
+                i = None
+            if i is None:
+                plan = self._replan(agent_id, cell, target, t)
+                i = 0
+            # Early into the next cell: keep walking to its centre.
+            if i + 1 < len(plan.cells) and (plan.cells[i + 1] != cell or plan.cells[i] != cell):
+                return plan.cells[i + 1]
+            return WAIT
+
+    def _replan(self, agent_id, cell, target, t):
+        self.replans += 1
+        self.table.release(agent_id)
+        cells = self._search(agent_id, cell, target, t)
+        plan = self._plans[agent_id] = Plan(target, t, cells)
+        # A boxed-in agent holds its cell regardless; whoever planned through
+        # it is the only one that has to replan.
+        for other in self.table.reserve(agent_id, cells, t):
+            self._plans.pop(other, None)
+        return plan
+
+    def _search(self, agent_id, start, target, t0):
+        """Cells for steps t0 .. t0 + window (fewer if the target is reached)."""
+        nav = self.navigation
+        table = self.table
+        window = self.window
+
+        def h(cell):
+            cost = nav.travel_cost(cell, target)
+            return window * 4 if cost == INF else cost
+
+        counter = 0
+        frontier = [(h(start), counter, 0, start, None)]
+        parents = {}
+        best = None
+        while frontier:
+            f, _, k, cell, parent = heapq.heappop(frontier)
+            if (cell, k) in parents:
+                continue
+            parents[(cell, k)] = parent
+            if k == window or h(cell) == 0:
+                best = (cell, k)
+                break
+            for dx, dy in NEIGHBOURS + ((0, 0),):
+                nxt = (cell[0] + dx, cell[1] + dy)
+                if nxt != cell and not nav.walkable(nxt):
+                    continue
+                if (nxt, k + 1) in parents or not table.move_free(agent_id, cell, nxt, t0 + k):
+                    continue
+                counter += 1
+                heapq.heappush(frontier, (k + 1 + h(nxt), counter, k + 1, nxt, (cell, k)))
+
+        if best is None:
+            # Boxed in: stay put for the whole window.
+            return [start] * (window + 1)
+        cells = []
+        node = best
+        while node is not None:
+            cells.append(node[0])
+            node = parents[node]
+        cells.reverse()
+        return cells
+
+    def forget(self, agent_id):
+        with self.table.lock:
+            self.table.release(agent_id)
+            self._plans.pop(agent_id, None)
+
+
+# manager -> {id(navigation): planner}; dropped along with private managers.
+_planners = weakref.WeakKeyDictionary()
+_planners_lock = threading.Lock()
+
+
+def get_path_planner(navigation, manager=None):
+    """Planner shared by all agents of this process on a layout.
+
+    Its reservation table is published through manager (by default
+    get_intention_manager(), i.e. the intention broker when
+    MRBTP_INTENTION_BROKER is set), so agents in other processes see it.
+    """
+    if manager is None:
+        manager = get_intention_manager()
+    with _planners_lock:
+        planners = _planners.setdefault(manager, {})
+        planner = planners.get(id(navigation))
+        if planner is None or planner.navigation is not navigation:
+            planner = planners[id(navigation)] = CooperativePlanner(navigation, ReservationTable(manager))
+        return planner
@@ -0,0 +1,154 @@
+# pipeline.py
+
+# Step kinds. Each kind is one handler on the agent, looked up by index.
+FETCH = 0        # walk to target and pick up until something is held
+DELIVER = 1      # walk to target and put down what is held
+PROCESS = 2      # interact with the station in front of the agent
+PLACE_PLATE = 3  # deliver to a free counter and remember it as the plate
+SERVE = 4        # pick the meal up from the plate and deliver it
+IDLE = 5
+WAIT = 6         # stand at target until item is ready there (unattended cooking)
+
+KIND_NAMES = ("FETCH", "DELIVER", "PROCESS", "PLACE_PLATE", "SERVE", "IDLE", "WAIT")
+
+# Target naming the agent's own plate counter rather than a TASK_POSITIONS entry.
+PLATE = "plate_counter_pos"
+
+
+def step(name, kind, target=None, **options):
+    """One row of a pipeline table.
+
+    options: next (defaults to the following row), retry (PROCESS: step to go
+    back to if the item is still held), message (logged when the step issues
+    its PUT), advance_on_put (FETCH: move on right after picking up),
+    returning_pan (FETCH: the pick-up lifts the pan itself), item (WAIT: the
+    item type to wait for).
+    """
+    return dict(name=name, kind=kind, target=target, **options)
+
+
+def plate_steps():
+    return [
+        step("GET_PLATE", FETCH, "PLATE_DISPENSER"),
+        step("PLACE_PLATE", PLACE_PLATE),
+    ]
+
+
+def fetch_steps(item, dispenser):
+    """Take item from its dispenser straight to the plate."""
+    return [
+        step(f"GET_{item}", FETCH, dispenser, advance_on_put=True, message=f"Picked {item.lower()}."),
+        step(f"PLACE_{item}", DELIVER, PLATE, message=f"{item.capitalize()} placed."),
+    ]
+
+
+def chop_steps(item, dispenser, board):
+    """Take item to the board, chop it and pick the chopped result up."""
+    return [
+        step(f"GET_{item}", FETCH, dispenser),
+        step(f"CUT_{item}", DELIVER, board),
+        step(f"CHOPPING_{item}", PROCESS, retry=f"CUT_{item}"),
+        step(f"PICK_CHOPPED_{item}", FETCH, board),
+    ]
+
+
+def start_cook_steps(item, pan):
+    """Put the held item in the pan; it cooks on its own from here."""
+    return [step(f"COOK_{item}", DELIVER, pan)]
+
+
+def collect_cook_steps(item, pan, cooked):
+    """Wait for the cooked item and lift the pan off again."""
+    return [
+        step(f"WAIT_{item}", WAIT, pan, item=cooked),
+        step(f"PICK_COOKED_{item}", FETCH, pan, returning_pan=True),
+    ]
+
+
+def place_steps(item):
+    return [step(f"PLACE_{item}", DELIVER, PLATE, message=f"{item.capitalize()} placed.")]
+
+
+def serve_steps(pan=None):
+    steps = []
+    if pan is not None:
+        steps.append(step("RETURN_PAN", DELIVER, pan))
+    steps += [
+        step("SERVE", SERVE, "SERVING_WINDOW", pickup=PLATE),
+        step("DONE", IDLE),
+    ]
+    return steps
+
+
+# The burger as named segments. The patty is the longest job, so it goes on
+# the pan first and the bun, lettuce and tomato are done while it cooks;
+# their order is free (see route_optimizer).
+BURGER_SEGMENTS = {
+    "MEAT_START": [
+        *chop_steps("MEAT", "GET_MEAT", "CUTTING_BOARD_1"),
+        *start_cook_steps("MEAT", "PAN"),
+    ],
+    "BUN": fetch_steps("BUN", "GET_BUN"),
+    "LETTUCE": [*chop_steps("LETTUCE", "GET_LETTUCE", "CUTTING_BOARD_1"), *place_steps("LETTUCE")],
+    "TOMATO": [*chop_steps("TOMATO", "GET_TOMATO", "CUTTING_BOARD_1"), *place_steps("TOMATO")],
+    "MEAT_FINISH": [*collect_cook_steps("MEAT", "PAN", "CookedPatty"), *place_steps("MEAT")],
+}
+BURGER_ORDER = ("BUN", "LETTUCE", "TOMATO")
+
+
+def burger_pipeline(order=BURGER_ORDER):
+    return [
+        *plate_steps(),
+        *BURGER_SEGMENTS["MEAT_START"],
+        *(row for name in order for row in BURGER_SEGMENTS[name]),
+        *BURGER_SEGMENTS["MEAT_FINISH"],
+        *serve_steps(pan="PAN"),
+    ]
+
+
+BURGER_PIPELINE = burger_pipeline()
+
+
+class CompiledStep:
+    __slots__ = ("index", "name", "kind", "target", "next", "retry", "message",
+                 "advance_on_put", "returning_pan", "pickup", "item")
+
+    def __init__(self, index, row, indices):
+        self.index = index
+        self.name = row["name"]
+        self.kind = row["kind"]
+        self.target = row.get("target")
+        self.next = indices[row["next"]] if "next" in row else index + 1
+        self.retry = indices[row["retry"]] if "retry" in row else index
+        self.message = row.get("message")
+        self.advance_on_put = row.get("advance_on_put", False)
+        self.returning_pan = row.get("returning_pan", False)
+        self.pickup = row.get("pickup")
+        self.item = row.get("item")
+
+    def __repr__(self):
+        return f"<Step {self.index} {self.name} {KIND_NAMES[self.kind]} -> {self.next}>"
+
+
+class Pipeline:
+    """A pipeline table compiled to integer-indexed steps."""
+
+    def __init__(self, rows):
+        indices = {row["name"]: i for i, row in enumerate(rows)}
+        if len(indices) != len(rows):
+            raise ValueError("Pipeline step names must be unique")
+        self.steps = [CompiledStep(i, row, indices) for i, row in enumerate(rows)]
+        self.indices = indices
+        last = self.steps[-1]
+        if last.kind != IDLE:
+            raise ValueError("Pipeline must end in an IDLE step")
+        last.next = last.index
+
+    def __getitem__(self, index):
+        return self.steps[index]
+
+    def __len__(self):
+        return len(self.steps)
+
+    def index_of(self, name):
+        return self.indices[name]
@@ -0,0 +1,143 @@
+# recipe_compiler.py
+
+import yaml
+
+from constants import EQUIPMENT_STATIONS
+
+# item_info.yaml entries for the burger, used when the environment's own
+# item_info.yaml cannot be found.
+DEFAULT_ITEM_INFO = {
+    "CuttingBoard": {"type": "Equipment"},
+    "Stove": {"type": "Equipment"},
+    "Pan": {"type": "Equipment", "equipment": "Stove"},
+    "Bun": {"type": "Ingredient"},
+    "Lettuce": {"type": "Ingredient"},
+    "Tomato": {"type": "Ingredient"},
+    "Meat": {"type": "Ingredient"},
+    "ChoppedLettuce": {"type": "Ingredient", "needs": ["Lettuce"], "equipment": "CuttingBoard", "seconds": 3.0},
+    "ChoppedTomato": {"type": "Ingredient", "needs": ["Tomato"], "equipment": "CuttingBoard", "seconds": 3.0},
+    "RawPatty": {"type": "Ingredient", "needs": ["Meat"], "equipment": "CuttingBoard", "seconds": 4.0},
+    "CookedPatty": {"type": "Ingredient", "needs": ["RawPatty"], "equipment": "Pan", "seconds": 10.0},
+    "Burger": {
+        "type": "Meal",
+        "needs": ["Bun", "ChoppedLettuce", "ChoppedTomato", "CookedPatty"],
+        "equipment": None,
+    },
+}
+
+
+def dispenser_key(item):
+    return f"GET_{item.upper()}"
+
+
+def meals_from_recipe_graphs(recipe_graphs):
+    """Meal names from env.recipe_validation.get_recipe_graphs()."""
+    return [graph["meal"] for graph in recipe_graphs if isinstance(graph, dict) and "meal" in graph]
+
+
+class RecipeBook:
+    """Recipes from item_info.yaml compiled into behaviour tree templates.
+
+    A template is a tuple of ops that ends with the agent holding an item:
+    ("get", item, dispenser), ("put_at", item, station),
+    ("interact", result, station, source) for work the agent does itself
+    (chopping) and ("collect", result, station) for equipment that works on
+    its own once filled (a pan on a stove). Templates are pure data and
+    memoized per item, so shared steps such as "get Tomato and chop it"
+    are derived once and reused by every meal that needs them. The agent
+    instantiates fresh py_trees nodes from them.
+    """
+
+    def __init__(self, item_info, meals=None):
+        self.items = item_info
+        self._meals = None if meals is None else tuple(meals)
+        self._templates = {}
+        self._plans = {}
+
+    @classmethod
+    def from_yaml(cls, path, meals=None):
+        with open(path) as f:
+            return cls(yaml.safe_load(f), meals=meals)
+
+    @classmethod
+    def load_default(cls):
+        """The environment's item_info.yaml if cooperative_cuisine ships one."""
+        try:
+            from cooperative_cuisine import ROOT_DIR
+            return cls.from_yaml(ROOT_DIR / "configs" / "item_info.yaml")
+        except (ImportError, OSError):
+            return cls(DEFAULT_ITEM_INFO)
+
+    def restrict_to(self, meals):
+        """Same recipes, limited to the given meals (e.g. the env's recipe graphs)."""
+        return RecipeBook(self.items, meals=meals)
+
+    def meals(self):
+        if self._meals is not None:
+            return [m for m in self._meals if m in self.items]
+        return [name for name, info in self.items.items() if info.get("type") == "Meal"]
+
+    def _station(self, equipment):
+        return EQUIPMENT_STATIONS.get(equipment, equipment.upper())
+
+    def is_passive(self, equipment):
+        """Equipment that sits on other equipment (Pan on Stove) cooks unattended."""
+        return bool((self.items.get(equipment) or {}).get("equipment"))
+
+    def seconds(self, item):
+        return float((self.items.get(item) or {}).get("seconds") or 0.0)
+
+    def template(self, item):
+        """Ops that end with the agent holding item."""
+        ops = self._templates.get(item)
+        if ops is not None:
+            return ops
+        info = self.items.get(item) or {}
+        needs = info.get("needs") or ()
+        if not needs:
+            ops = (("get", item, dispenser_key(item)),)
+        elif len(needs) == 1 and info.get("equipment"):
+            source = needs[0]
+            station = self._station(info["equipment"])
+            if self.is_passive(info["equipment"]):
+                finish = ("collect", item, station)
+            else:
+                finish = ("interact", item, station, source)
+            ops = self.template(source) + (("put_at", source, station), finish)
+        else:
+            raise ValueError(f"Cannot build a single-item template for {item}")
+        self._templates[item] = ops
+        return ops
+
+    def plan(self, meal):
+        """(sections, assembly_station) for meal; sections are (need, ops) pairs.
+
+        Meals without equipment are assembled on the plate. Meals made in
+        equipment (e.g. soups in a pot) have their needs put into that
+        station instead, and the plate is filled from it at the end.
+        """
+        plan = self._plans.get(meal)
+        if plan is not None:
+            return plan
+        info = self.items.get(meal)
+        if info is None or info.get("type") != "Meal":
+            raise ValueError(f"Unknown meal: {meal}")
+        station = self._station(info["equipment"]) if info.get("equipment") else None
+        sections = tuple((need, self.template(need)) for need in info.get("needs") or ())
+        plan = self._plans[meal] = (sections, station)
+        return plan
+
+    def positions_needed(self, meal):
+        sections, station = self.plan(meal)
+        keys = {"PLATE_DISPENSER", "SERVING_WINDOW"}
+        if station:
+            keys.add(station)
+        for _, ops in sections:
+            keys.update(op[2] for op in ops)
+        return keys
+
+    def can_make(self, meal, task_positions):
+        try:
+            return self.positions_needed(meal) <= set(task_positions)
+        except ValueError:
+            return False
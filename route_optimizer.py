@@ -0,0 +1,110 @@
+# route_optimizer.py
+
+from navigation import accessible_positions
+from pipeline import PLATE
+from state_model import INF, grid_key
+
+
+def plate_candidates(kitchen_positions, task_positions):
+    """Plain counters that could hold the plate."""
+    stations = {grid_key(pos) for pos in task_positions.values()}
+    return [
+        (p["x"], p["y"]) for p in accessible_positions(kitchen_positions, task_positions)
+        if p.get("type") == "counter" and (p["x"], p["y"]) not in stations
+    ]
+
+
+def row_stops(rows):
+    """Stations a pipeline segment walks to, in order."""
+    stops = []
+    for row in rows:
+        for stop in (row.get("pickup"), row.get("target")):
+            if stop is not None and (not stops or stops[-1] != stop):
+                stops.append(stop)
+    return tuple(stops)
+
+
+class RouteOptimizer:
+    """Plate counter and segment order with the least walking.
+
+    A route is a list of slots, each either a fixed segment or a free one
+    (None) to be filled from the free segments; a segment is a
+    (name, stops) pair whose stops are TASK_POSITIONS names or PLATE.
+    Every plate candidate is tried and the free segments are ordered by
+    Held-Karp style dynamic programming over (segments used, last
+    segment), with exact NavigationCache costs. Results are cached per
+    route, so each layout and recipe is only solved once.
+    """
+
+    def __init__(self, navigation, task_positions, candidates):
+        self.navigation = navigation
+        self.task_positions = task_positions
+        self.candidates = list(candidates)
+        self._costs = {}
+        self._plans = {}
+
+    def _cost(self, a, b):
+        key = (a, b)
+        cost = self._costs.get(key)
+        if cost is None:
+            cost = self._costs[key] = 0 if a == b else self.navigation.station_cost(a, b)
+        return cost
+
+    def _walk(self, stops, position, plate):
+        """(steps to visit stops from position, where the walk ends)."""
+        total = 0
+        for stop in stops:
+            pos = plate if stop == PLATE else grid_key(self.task_positions[stop])
+            total += self._cost(position, pos)
+            position = pos
+        return total, position
+
+    def plan(self, slots, free, start="PLATE_DISPENSER", finish=(PLATE, "SERVING_WINDOW")):
+        """Ranked [(steps, plate, order)]; order names the free segments slot by slot.
+
+        The walk starts at start, puts the plate down, runs the slots and
+        ends with the finish stops.
+        """
+        key = (tuple(slots), tuple(free), start, tuple(finish))
+        ranked = self._plans.get(key)
+        if ranked is None:
+            ranked = []
+            for plate in self.candidates:
+                cost, order = self._solve(slots, free, start, finish, plate)
+                if cost < INF:
+                    ranked.append((cost, plate, order))
+            ranked.sort()
+            self._plans[key] = ranked
+        return ranked
+
+    def order_for(self, slots, free, plate, start="PLATE_DISPENSER", finish=(PLATE, "SERVING_WINDOW")):
+        """Best order of the free segments once the plate is down at plate."""
+        return self._solve(slots, free, start, finish, grid_key(plate))[1]
+
+    def _solve(self, slots, free, start, finish, plate):
+        cost, position = self._walk((start, PLATE), grid_key(self.task_positions[start]), plate)
+        # (used mask, index of last free segment or -1) -> (cost, end position, order)
+        states = {(0, -1): (cost, position, ())}
+        for slot in slots:
+            nxt = {}
+            for (mask, last), (cost, position, order) in states.items():
+                if slot is not None:
+                    steps, end = self._walk(slot[1], position, plate)
+                    options = [((mask, -1), cost + steps, end, order)]
+                else:
+                    options = []
+                    for j, (name, stops) in enumerate(free):
+                        if mask & (1 << j):
+                            continue
+                        steps, end = self._walk(stops, position, plate)
+                        options.append(((mask | 1 << j, j), cost + steps, end, order + (name,)))
+                for state, cost2, end, order2 in options:
+                    if state not in nxt or cost2 < nxt[state][0]:
+                        nxt[state] = (cost2, end, order2)
+            states = nxt
+        best, best_order = INF, ()
+        for cost, position, order in states.values():
+            total = cost + self._walk(finish, position, plate)[0]
+            if total < best:
+                best, best_order = total, order
+        return best, best_order
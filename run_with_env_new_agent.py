@@ -1,3 +1,4 @@
+import argparse
 import json
 from datetime import timedelta
 
@@ -5,12 +6,19 @@ from cooperative_cuisine import ROOT_DIR
 from cooperative_cuisine.environment import Environment
 
 from cocu_base_agents.new_agent.bt_agent import BTAgent
+from cocu_base_agents.new_agent.stepped_runner import run_via_env_stepped
+from cocu_base_agents.new_agent.recipe_compiler import RecipeBook, meals_from_recipe_graphs
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stepped", action="store_true", help="advance the env in lock-step with the agent")
+    args = parser.parse_args()
+
+    item_info_path = ROOT_DIR / "configs" / "item_info.yaml"
     env = Environment(
         env_config=ROOT_DIR / "configs" / "environment_config.yaml",
         layout_config=ROOT_DIR / "configs" / "layouts" / "basic.layout",
-        item_info=ROOT_DIR / "configs" / "item_info.yaml"
+        item_info=item_info_path
     )
     env.add_player("0")
     
@@ -22,4 +30,9 @@ if __name__ == "__main__":
     
     agent = BTAgent()
     agent.own_player_id = "0"
-    agent.run_via_env_reference(env)
\ No newline at end of file
+    # One behaviour tree per meal the environment can order, compiled on first use.
+    agent.load_recipes(RecipeBook.from_yaml(item_info_path, meals=meals_from_recipe_graphs(recipe_graphs)))
+    if args.stepped:
+        run_via_env_stepped(agent, env)
+    else:
+        agent.run_via_env_reference(env)
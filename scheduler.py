@@ -0,0 +1,167 @@
+# scheduler.py
+
+from constants import TASK_POSITIONS
+from state_model import INF
+
+# Rough walking time per grid cell, used only to estimate when cooking ends.
+SECONDS_PER_STEP = 0.3
+
+START = "start"      # prepare an item and leave it cooking in its station
+PREP = "prep"        # prepare an item start to finish and put it on the plate
+COLLECT = "collect"  # fetch a cooked item from its station and put it on the plate
+
+
+class Segment:
+    __slots__ = ("kind", "need", "ops")
+
+    def __init__(self, kind, need, ops):
+        self.kind = kind
+        self.need = need
+        self.ops = ops
+
+    def __repr__(self):
+        return f"<Segment {self.kind} {self.need}>"
+
+
+def split_section(ops):
+    """(ops up to the first unattended cook, the collect onwards)."""
+    for i, op in enumerate(ops):
+        if op[0] == "collect":
+            return ops[:i], ops[i:]
+    return ops, ()
+
+
+class Scheduler:
+    """Orders a meal's preparation so unattended cooking overlaps other prep.
+
+    Every station an item is put on is modelled as busy until the item is
+    taken off again: a cutting board for the length of the chop, equipment
+    that cooks on its own (see RecipeBook.is_passive) from the moment it is
+    filled until its item is collected. A segment only starts once the
+    stations it fills are free. The longest cooks are started first,
+    independent prep fills the wait, and each collect is placed as soon as
+    its estimated ready time has passed. Schedules and the station
+    bookings behind them ((station, from, until) in estimated seconds) are
+    cached per meal.
+    """
+
+    def __init__(self, recipe_book, navigation=None, task_positions=TASK_POSITIONS):
+        self.recipe_book = recipe_book
+        self.navigation = navigation
+        self.task_positions = task_positions
+        self._schedules = {}
+        self._bookings = {}
+
+    def travel_seconds(self, source, target):
+        if self.navigation is None or source not in self.task_positions or target not in self.task_positions:
+            return 0.0
+        steps = self.navigation.station_cost(self.task_positions[source], self.task_positions[target])
+        return 0.0 if steps == INF else steps * SECONDS_PER_STEP
+
+    def duration(self, ops, position):
+        """(estimated seconds to run ops from position, station the agent ends at)."""
+        seconds = 0.0
+        for op in ops:
+            seconds += self.travel_seconds(position, op[2])
+            position = op[2]
+            if op[0] == "interact":
+                seconds += self.recipe_book.seconds(op[1])
+        return seconds, position
+
+    def schedule(self, meal):
+        segments = self._schedules.get(meal)
+        if segments is None:
+            segments, self._bookings[meal] = self._build(meal)
+            self._schedules[meal] = segments
+        return segments
+
+    def bookings(self, meal):
+        """[(station, from, until)] for every item left on a station in meal's schedule."""
+        self.schedule(meal)
+        return self._bookings[meal]
+
+    def _build(self, meal):
+        sections, station = self.recipe_book.plan(meal)
+        if station is not None:
+            # Assembled in the equipment itself; there is nothing to overlap.
+            return [Segment(PREP, need, ops) for need, ops in sections], []
+
+        to_start, prep = [], []
+        for need, ops in sections:
+            prefix, suffix = split_section(ops)
+            if suffix:
+                to_start.append((need, prefix, suffix, suffix[0][2]))
+            else:
+                prep.append((need, ops))
+        to_start.sort(key=lambda entry: self.recipe_book.seconds(entry[0]), reverse=True)
+
+        run = _Run(self)
+        cooking = []      # (ready time, need, suffix, station)
+        segments = []
+
+        while to_start or prep or cooking:
+            startable = [entry for entry in to_start if run.free(entry[1])]
+            ready = [entry for entry in cooking if entry[0] <= run.clock]
+            runnable = [entry for entry in prep if run.free(entry[1])]
+            if startable:
+                need, prefix, suffix, station = startable[0]
+                to_start.remove(startable[0])
+                run.ops(prefix)
+                cooking.append((run.clock + self.recipe_book.seconds(need), need, suffix, station))
+                segments.append(Segment(START, need, prefix))
+            elif ready or (cooking and not runnable):
+                entry = min(ready or cooking, key=lambda e: e[0])
+                cooking.remove(entry)
+                ready_at, need, suffix, station = entry
+                run.clock = max(run.clock, ready_at)
+                run.ops(suffix)
+                segments.append(Segment(COLLECT, need, suffix))
+            elif runnable:
+                need, ops = runnable[0]
+                prep.remove(runnable[0])
+                run.ops(ops)
+                segments.append(Segment(PREP, need, ops))
+            elif not run.wait():
+                break
+        return segments, run.bookings
+
+
+class _Run:
+    """Clock, position and station occupancy while a schedule is built."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.clock = 0.0
+        self.position = "PLATE_DISPENSER"
+        self.taken = {}    # station -> (time the item went on, time it comes off or INF)
+        self.bookings = []
+
+    def free(self, ops):
+        """True if every station ops put something on is free now."""
+        return all(
+            self.taken.get(op[2], (0.0, 0.0))[1] <= self.clock for op in ops if op[0] == "put_at"
+        )
+
+    def wait(self):
+        """Move the clock to the next time a station frees up; False if none will."""
+        times = [until for _, until in self.taken.values() if self.clock < until < INF]
+        if not times:
+            return False
+        self.clock = min(times)
+        return True
+
+    def ops(self, ops):
+        scheduler = self.scheduler
+        for op in ops:
+            self.clock += scheduler.travel_seconds(self.position, op[2])
+            self.position = op[2]
+            if op[0] == "put_at":
+                # Waits for a station that is still in use.
+                self.clock = max(self.clock, self.taken.get(op[2], (0.0, 0.0))[1])
+                self.taken[op[2]] = (self.clock, INF)
+            elif op[0] in ("interact", "collect"):
+                if op[0] == "interact":
+                    self.clock += scheduler.recipe_book.seconds(op[1])
+                since = self.taken.get(op[2], (self.clock, INF))[0]
+                self.taken[op[2]] = (since, self.clock)
+                self.bookings.append((op[2], since, self.clock))
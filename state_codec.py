@@ -0,0 +1,151 @@
+# state_codec.py
+
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _plain(obj):
+    """Fallback for values the codecs cannot encode natively (NumPy, mostly)."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+class JsonCodec:
+    name = "json"
+
+    def encode(self, obj):
+        return json.dumps(obj, default=_plain).encode()
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def encode(self, obj):
+        return orjson.dumps(obj, default=_plain, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+
+    def encode(self, obj):
+        return msgpack.packb(obj, default=_plain, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {"json": JsonCodec, "orjson": OrjsonCodec, "msgpack": MsgpackCodec}
+_MODULES = {"json": json, "orjson": orjson, "msgpack": msgpack}
+
+
+def available_codecs():
+    return [name for name in CODECS if _MODULES[name] is not None]
+
+
+def get_codec(name=None):
+    """Codec by name; None picks the fastest JSON-compatible one installed."""
+    if name is None:
+        name = "orjson" if orjson is not None else "json"
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec {name!r}; choose from {sorted(CODECS)}")
+    if _MODULES[name] is None:
+        raise ValueError(f"Codec {name!r} needs the {name} package, which is not installed")
+    return CODECS[name]()
+
+
+def _by_id(items):
+    return {item["id"]: item for item in items}
+
+
+class DeltaEncoder:
+    """Server side of the delta protocol, one per connected agent.
+
+    Every state gets a sequence number. The agent acknowledges the last
+    state it applied and the next one is sent relative to that state: only
+    counters and players that differ from it, the ids of those that are
+    gone, and the small top-level fields (orders, time, score ...) in full.
+    Without a usable acknowledgement the full state is sent.
+    """
+
+    def __init__(self, history=4):
+        self.history = history
+        self.seq = 0
+        self._sent = {}
+
+    def encode(self, state, ack=None):
+        self.seq += 1
+        counters = _by_id(state.get("counters", ()))
+        players = _by_id(state.get("players", ()))
+        base = self._sent.get(ack)
+        self._sent[self.seq] = (counters, players)
+        # Older states can no longer be acknowledged.
+        for seq in [s for s in self._sent if s < self.seq - self.history or (ack is not None and s < ack)]:
+            del self._sent[seq]
+        if base is None:
+            return {"seq": self.seq, "base": None, "state": state}
+        old_counters, old_players = base
+        delta = {k: v for k, v in state.items() if k not in ("counters", "players")}
+        delta["counters"] = [c for cid, c in counters.items() if old_counters.get(cid) != c]
+        delta["players"] = [p for pid, p in players.items() if old_players.get(pid) != p]
+        delta["removed_counters"] = [cid for cid in old_counters if cid not in counters]
+        delta["removed_players"] = [pid for pid in old_players if pid not in players]
+        return {"seq": self.seq, "base": ack, "state": delta}
+
+
+class DeltaDecoder:
+    """Agent side of the delta protocol: rebuilds full states from deltas.
+
+    ack is the sequence number to send with the next request; it is None
+    until a full state arrived, or after a delta that did not match.
+    """
+
+    def __init__(self):
+        self.ack = None
+        self._counters = {}
+        self._players = {}
+        self._fields = {}
+
+    def apply(self, message):
+        """Full state for message, or None if it was relative to a state we do not have."""
+        state = message["state"]
+        if message["base"] is None:
+            self._counters = _by_id(state.get("counters", ()))
+            self._players = _by_id(state.get("players", ()))
+        elif message["base"] == self.ack:
+            for cid in state.pop("removed_counters", ()):
+                self._counters.pop(cid, None)
+            for pid in state.pop("removed_players", ()):
+                self._players.pop(pid, None)
+            self._counters.update(_by_id(state.get("counters", ())))
+            self._players.update(_by_id(state.get("players", ())))
+        else:
+            self.ack = None
+            return None
+        self._fields = {k: v for k, v in state.items() if k not in ("counters", "players")}
+        self.ack = message["seq"]
+        full = dict(self._fields)
+        full["counters"] = list(self._counters.values())
+        full["players"] = list(self._players.values())
+        return full
@@ -0,0 +1,193 @@
+# state_link.py
+
+import argparse
+import asyncio
+import json
+import time
+from enum import Enum
+
+import numpy as np
+import websockets
+from cooperative_cuisine.action import Action, ActionType, InterActionData
+
+from agent_scripts import load_agent_class
+from batch_runner import make_environment
+from state_codec import CODECS, DeltaDecoder, DeltaEncoder, JsonCodec, get_codec
+from stepped_runner import DEFAULT_FRAME
+
+# The handshake is always plain JSON so either side can name its codec.
+HANDSHAKE = JsonCodec()
+
+
+def _wire(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def action_message(action_type, action_data=None, duration=0.0):
+    """An agent action as plain data every codec can carry (enums by value)."""
+    return {"type": "action", "action_type": _wire(action_type), "action_data": _wire(action_data), "duration": duration}
+
+
+def action_from_message(player_id, message):
+    """Rebuild the Action the environment expects from action_message output."""
+    action_type = ActionType(message["action_type"])
+    action_data = message.get("action_data")
+    if action_type == ActionType.INTERACT and action_data is not None:
+        action_data = InterActionData(action_data)
+    elif action_type == ActionType.MOVEMENT and action_data is not None:
+        action_data = np.asarray(action_data, dtype=float)
+    return Action(player_id, action_type, action_data, duration=message.get("duration", 0.0))
+
+
+class StateServer:
+    """Local stand-in for the game server with pluggable codecs and deltas.
+
+    Agents connect, say which player they control, which codec they speak
+    and whether they want deltas, then loop get_state / action like
+    against the real server. The environment runs on its own clock, one
+    frame per frame of wall time, until env_time_end.
+    """
+
+    def __init__(self, env, frame=DEFAULT_FRAME):
+        self.env = env
+        self.frame = frame
+
+    def ended(self):
+        return self.env.env_time >= self.env.env_time_end
+
+    async def run_clock(self):
+        seconds = self.frame.total_seconds()
+        while not self.ended():
+            started = time.perf_counter()
+            self.env.step(self.frame)
+            await asyncio.sleep(max(0.0, seconds - (time.perf_counter() - started)))
+
+    async def serve_connection(self, send, recv):
+        """Run one agent's session over a send(bytes) / recv() -> bytes pair."""
+        hello = HANDSHAKE.decode(await recv())
+        codec = get_codec(hello.get("codec"))
+        encoder = DeltaEncoder() if hello.get("delta") else None
+        player_id = hello["player_id"]
+        await send(HANDSHAKE.encode({"type": "hello", "codec": codec.name, "delta": encoder is not None}))
+        while True:
+            request = codec.decode(await recv())
+            if request["type"] == "action":
+                self.env.perform_action(action_from_message(player_id, request))
+                continue
+            if self.ended():
+                await send(codec.encode({"type": "ended"}))
+                return
+            state = json.loads(self.env.get_json_state(player_id))
+            if encoder is None:
+                message = {"seq": None, "base": None, "state": state}
+            else:
+                message = encoder.encode(state, request.get("ack"))
+            message["type"] = "state"
+            await send(codec.encode(message))
+
+    async def serve(self, host="localhost", port=8765):
+        async def handler(websocket, *args):
+            await self.serve_connection(websocket.send, websocket.recv)
+
+        async with websockets.serve(handler, host, port):
+            await self.run_clock()
+
+
+class RemoteSession:
+    """Agent side of a StateServer connection.
+
+    Mirrors the real-time loop: request a state, parse_state,
+    manage_tasks, handle_task. Actions go back over the same connection.
+    bytes_received and decode_seconds tell what the codec and deltas save.
+    """
+
+    def __init__(self, agent, send, recv, codec=None, delta=True):
+        self.agent = agent
+        self.send = send
+        self.recv = recv
+        self.codec = get_codec(codec)
+        self.delta = delta
+        self.decoder = DeltaDecoder()
+        self.ticks = 0
+        self.bytes_received = 0
+        self.decode_seconds = 0.0
+
+    async def _execute_action(self, action_type, action_data=None, duration=0.0, **kwargs):
+        await self.send(self.codec.encode(action_message(action_type, action_data, duration)))
+
+    async def _next_state(self):
+        """Next full state, or None once the episode has ended."""
+        while True:
+            await self.send(self.codec.encode({"type": "get_state", "ack": self.decoder.ack}))
+            data = await self.recv()
+            started = time.perf_counter()
+            message = self.codec.decode(data)
+            if message["type"] == "ended":
+                return None
+            state = self.decoder.apply(message)
+            self.decode_seconds += time.perf_counter() - started
+            self.bytes_received += len(data)
+            if state is not None:
+                return state
+            # The delta was against a state we no longer hold; ask again with no ack.
+
+    async def run(self):
+        agent = self.agent
+        await self.send(HANDSHAKE.encode({
+            "type": "hello", "player_id": agent.own_player_id, "codec": self.codec.name, "delta": self.delta,
+        }))
+        reply = HANDSHAKE.decode(await self.recv())
+        self.delta = reply["delta"]
+        agent._execute_action = self._execute_action
+        while True:
+            state = await self._next_state()
+            if state is None:
+                return self.ticks
+            agent.parse_state(state)
+            await agent.manage_tasks(state)
+            if agent.current_task:
+                await agent.handle_task(state)
+            self.ticks += 1
+
+
+async def connect_agent(agent, uri, codec=None, delta=True):
+    async with websockets.connect(uri, max_size=None) as websocket:
+        session = RemoteSession(agent, websocket.send, websocket.recv, codec=codec, delta=delta)
+        await session.run()
+        return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in state server and agent client.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="serve an environment")
+    serve.add_argument("--layout", default="basic")
+    serve.add_argument("--seed", type=int, default=0)
+    serve.add_argument("--duration", type=float, default=200)
+    serve.add_argument("--players", type=int, default=1)
+    serve.add_argument("--port", type=int, default=8765)
+    agent = sub.add_parser("agent", help="run an agent against a server")
+    agent.add_argument("--agent", default="MRBTPAgent")
+    agent.add_argument("--player-id", default="0")
+    agent.add_argument("--uri", default="ws://localhost:8765")
+    agent.add_argument("--codec", choices=sorted(CODECS), default=None)
+    agent.add_argument("--no-delta", action="store_true", help="always receive full states")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        env = make_environment(args.layout, args.seed, args.duration)
+        for player in range(1, args.players):
+            env.add_player(str(player))
+        asyncio.run(StateServer(env).serve(port=args.port))
+    else:
+        instance = load_agent_class(args.agent)()
+        instance.own_player_id = args.player_id
+        session = asyncio.run(connect_agent(instance, args.uri, codec=args.codec, delta=not args.no_delta))
+        print(
+            f"{session.ticks} ticks, {session.bytes_received / max(session.ticks, 1):.0f} B/tick, "
+            f"{1e6 * session.decode_seconds / max(session.ticks, 1):.1f} us decode/tick"
+        )
+
+
+if __name__ == "__main__":
+    main()
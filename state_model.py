@@ -0,0 +1,358 @@
+# state_model.py
+
+import numpy as np
+
+# One row per counter / player; rows are rewritten in place every tick.
+COUNTER_DTYPE = np.dtype([("pos", np.float64, (2,)), ("type", np.int16), ("occupied", np.bool_), ("item", np.int16)])
+PLAYER_DTYPE = np.dtype([("pos", np.float64, (2,)), ("holding", np.int16)])
+NO_CODE = -1
+
+
+def grid_key(pos):
+    """Integer grid cell for a (possibly float) position."""
+    return int(round(pos[0])), int(round(pos[1]))
+
+
+def counter_key(counter):
+    """Cheap change key for a counter, read off its top-level fields only.
+
+    Item ids are stable while an item sits on a counter, so a new item, a
+    step of chopping or cooking progress, something added to a plate or a
+    finished pan all change the key; nothing inside the item is walked.
+    """
+    item = counter.get("occupied_by")
+    if isinstance(item, list):
+        # A stack (e.g. of plates): its height and top item.
+        return counter.get("type"), len(item), item[-1].get("id") if item else None
+    if not item:
+        return counter.get("type"), None
+    ready = item.get("content_ready")
+    return (
+        counter.get("type"),
+        item.get("id"),
+        item.get("type"),
+        item.get("progress_percentage"),
+        len(item.get("content_list") or ()),
+        ready.get("type") if ready else None,
+    )
+
+
+class KitchenState:
+    """Persistent view of the environment state.
+
+    Counters are indexed by id and by grid cell. Each new state is folded in
+    by replacing only the counters whose contents changed, so lookups such as
+    the player's nearest counter or the occupancy of a cell are dict hits
+    instead of scans over ``state["counters"]``. An unchanged counter costs
+    an identity check when the state reuses its dict (the delta decoder and
+    KitchenSim do) and a counter_key() comparison otherwise.
+    """
+
+    def __init__(self):
+        self.counters_by_id = {}
+        self._keys = {}
+        self.counters_by_pos = {}
+        self.players_by_id = {}
+        self.free_counters = FreeCounterIndex()
+        self.arrays = StateArrays()
+        # Bumped whenever any counter changes, cheap to compare between ticks.
+        self.version = 0
+        # Grid cell -> version in which its counter last changed.
+        self.cell_versions = {}
+
+    def apply(self, state):
+        """Fold a (full or partial) state in; returns the ids of changed counters."""
+        changed = []
+        by_id, keys = self.counters_by_id, self._keys
+        for counter in state.get("counters", ()):
+            cid = counter["id"]
+            if by_id.get(cid) is counter:
+                continue
+            key = counter_key(counter)
+            if keys.get(cid) == key:
+                # Same contents in a new dict: keep it so the next tick is an identity hit.
+                by_id[cid] = self.counters_by_pos[grid_key(counter["pos"])] = counter
+                continue
+            keys[cid] = key
+            by_id[cid] = counter
+            cell = grid_key(counter["pos"])
+            self.counters_by_pos[cell] = counter
+            self.cell_versions[cell] = self.version + 1
+            self.free_counters.update(counter)
+            self.arrays.set_counter(counter)
+            changed.append(cid)
+        if changed:
+            self.version += 1
+
+        for player in state.get("players", ()):
+            self.players_by_id[player["id"]] = player
+            self.arrays.set_player(player)
+        return changed
+
+    def player(self, player_id):
+        return self.players_by_id.get(player_id)
+
+    def player_pos(self, player_id, out):
+        """Copy the player's position into out; False if the player is unknown."""
+        return self.arrays.player_pos(player_id, out)
+
+    def nearest_counter(self, player_id):
+        """Counter the player currently faces, or None."""
+        player = self.players_by_id.get(player_id)
+        if player is None or not player.get("current_nearest_counter_id"):
+            return None
+        return self.counters_by_id.get(player["current_nearest_counter_id"])
+
+    def counter_at(self, pos):
+        return self.counters_by_pos.get(grid_key(pos))
+
+    def cell_version(self, pos):
+        """Version in which the counter at pos last changed (0 if never seen)."""
+        return self.cell_versions.get(grid_key(pos), 0)
+
+    def is_occupied(self, pos):
+        counter = self.counters_by_pos.get(grid_key(pos))
+        return counter is not None and counter.get("occupied_by") is not None
+
+    def is_free(self, pos):
+        """True if a counter stands at pos and holds nothing."""
+        return self.arrays.is_free(pos)
+
+    def free_counters_within(self, pos, distance, types=("Counter",)):
+        """(n, 2) positions of free counters of the given types within Manhattan distance."""
+        return self.arrays.free_within(pos, distance, types)
+
+    def item_ready(self, pos, item_type):
+        """True once item_type sits at pos, directly or inside equipment such as a pan."""
+        counter = self.counters_by_pos.get(grid_key(pos))
+        occupied_by = counter.get("occupied_by") if counter else None
+        items = occupied_by if isinstance(occupied_by, list) else [occupied_by]
+        for item in items:
+            if not item:
+                continue
+            if item.get("type") == item_type:
+                return True
+            ready = item.get("content_ready")
+            if ready and ready.get("type") == item_type:
+                return True
+            if any(content.get("type") == item_type for content in item.get("content_list") or ()):
+                return True
+        return False
+
+
+def _item_type(occupied_by):
+    if isinstance(occupied_by, list):
+        occupied_by = occupied_by[0] if occupied_by else None
+    return occupied_by.get("type") if isinstance(occupied_by, dict) else None
+
+
+def _grown(array):
+    bigger = np.zeros(2 * len(array), array.dtype)
+    bigger[: len(array)] = array
+    return bigger
+
+
+class StateArrays:
+    """Counters and players as preallocated NumPy structured arrays.
+
+    Each counter or player id gets a row the first time it is seen and the
+    row is overwritten in place afterwards; the buffers only grow (by
+    doubling) when a kitchen has more counters or players than they hold,
+    so steady-state ticks allocate nothing. Type and item names are
+    interned as small integer codes, which turns questions such as "free
+    plain counters within d cells" into one boolean mask over the buffer.
+    """
+
+    def __init__(self, counters=64, players=4):
+        self.counters = np.zeros(counters, COUNTER_DTYPE)
+        self.players = np.zeros(players, PLAYER_DTYPE)
+        self.n_counters = 0
+        self.n_players = 0
+        self.codes = {}
+        self.names = []
+        self._counter_rows = {}
+        self._cell_rows = {}
+        self._player_rows = {}
+
+    def code(self, name):
+        """Integer code for a type or item name, NO_CODE for None."""
+        if name is None:
+            return NO_CODE
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def name(self, code):
+        return None if code == NO_CODE else self.names[code]
+
+    def set_counter(self, counter):
+        row = self._counter_rows.get(counter["id"])
+        if row is None:
+            row = self._counter_rows[counter["id"]] = self.n_counters
+            self.n_counters += 1
+            if row == len(self.counters):
+                self.counters = _grown(self.counters)
+        occupied_by = counter.get("occupied_by")
+        record = self.counters[row]
+        record["pos"] = counter["pos"]
+        record["type"] = self.code(counter.get("type"))
+        record["occupied"] = occupied_by is not None
+        record["item"] = self.code(_item_type(occupied_by))
+        self._cell_rows[grid_key(counter["pos"])] = row
+
+    def set_player(self, player):
+        row = self._player_rows.get(player["id"])
+        if row is None:
+            row = self._player_rows[player["id"]] = self.n_players
+            self.n_players += 1
+            if row == len(self.players):
+                self.players = _grown(self.players)
+        record = self.players[row]
+        record["pos"] = player["pos"]
+        record["holding"] = self.code(_item_type(player.get("holding")))
+
+    def player_pos(self, player_id, out):
+        row = self._player_rows.get(player_id)
+        if row is None:
+            return False
+        out[:] = self.players["pos"][row]
+        return True
+
+    def is_free(self, pos):
+        row = self._cell_rows.get(grid_key(pos))
+        return row is not None and not self.counters["occupied"][row]
+
+    def free_within(self, pos, distance, types=("Counter",)):
+        counters = self.counters[: self.n_counters]
+        codes = [self.codes[t] for t in types if t in self.codes]
+        mask = ~counters["occupied"] & np.isin(counters["type"], codes)
+        mask &= np.abs(counters["pos"] - pos).sum(axis=1) <= distance
+        return counters["pos"][mask]
+
+
+INF = float("inf")
+
+# Counters a plate may be put down on; stations, dispensers, the trash
+# and the serving window never count as free.
+PLATE_COUNTER_TYPES = ("Counter",)
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+class FreeCounterIndex:
+    """Grid-bucket spatial index over free counters.
+
+    Buckets are ``bucket_size`` cells wide and searched ring by ring outward
+    from the query point. A ring is only opened while its Manhattan lower
+    bound can still beat the best counter found so far.
+    """
+
+    def __init__(self, bucket_size=4, types=PLATE_COUNTER_TYPES):
+        self.bucket_size = bucket_size
+        self.types = types
+        self._buckets = {}
+        self._cells = {}
+        self._extent = None
+
+    def __len__(self):
+        return len(self._cells)
+
+    def _bucket_key(self, cell):
+        return cell[0] // self.bucket_size, cell[1] // self.bucket_size
+
+    def update(self, counter):
+        """Add or drop the counter depending on its current occupancy."""
+        cid = counter["id"]
+        cell = grid_key(counter["pos"])
+        key = self._bucket_key(cell)
+        free = (
+            counter.get("occupied_by") is None
+            and counter.get("type") in self.types
+        )
+        if free:
+            self._buckets.setdefault(key, {})[cell] = counter
+            self._cells[cid] = cell
+            if self._extent is None:
+                self._extent = [key[0], key[1], key[0], key[1]]
+            else:
+                ext = self._extent
+                ext[0], ext[1] = min(ext[0], key[0]), min(ext[1], key[1])
+                ext[2], ext[3] = max(ext[2], key[0]), max(ext[3], key[1])
+        elif cid in self._cells:
+            del self._cells[cid]
+            self._buckets[key].pop(cell, None)
+
+    def _ring(self, center, r):
+        bx, by = center
+        if r == 0:
+            return [center]
+        keys = [(x, by - r) for x in range(bx - r, bx + r + 1)]
+        keys += [(x, by + r) for x in range(bx - r, bx + r + 1)]
+        keys += [(bx - r, y) for y in range(by - r + 1, by + r)]
+        keys += [(bx + r, y) for y in range(by - r + 1, by + r)]
+        return keys
+
+    def _search(self, center, cost, bound):
+        """Counter minimising cost(cell); bound(d) lower-bounds cost at Manhattan distance d."""
+        if not self._cells:
+            return None
+        cx, cy = self._bucket_key(center)
+        ext = self._extent
+        max_ring = max(cx - ext[0], cy - ext[1], ext[2] - cx, ext[3] - cy, 0)
+        best, best_cost = None, INF
+        for r in range(max_ring + 1):
+            # Any cell in ring r is at least this far from the centre.
+            min_dist = max(0, (r - 1) * self.bucket_size + 1)
+            if best is not None and bound(min_dist) >= best_cost:
+                break
+            for key in self._ring((cx, cy), r):
+                bucket = self._buckets.get(key)
+                if not bucket:
+                    continue
+                for cell, counter in bucket.items():
+                    c = cost(cell)
+                    if c < best_cost:
+                        best, best_cost = counter, c
+        return best
+
+    def nearest(self, pos, navigation=None):
+        """Free counter closest to pos, by walking steps when navigation is given."""
+        center = grid_key(pos)
+        if navigation is None:
+            return self._search(center, lambda cell: manhattan(cell, center), lambda d: d)
+        # The agent stands next to the counter, so at most one step is saved.
+        return self._search(
+            center,
+            lambda cell: navigation.station_cost(cell, center),
+            lambda d: d - 1,
+        )
+
+    def best_for_stations(self, stations, navigation=None):
+        """Free counter minimising the summed travel to every station.
+
+        Stations nobody can stand next to are left out of the sum.
+        """
+        stations = [grid_key(s) for s in stations]
+        if navigation is not None:
+            stations = [s for s in stations if navigation.interaction_tiles(s)]
+        if not stations:
+            return None
+        k = len(stations)
+        center = (
+            round(sum(s[0] for s in stations) / k),
+            round(sum(s[1] for s in stations) / k),
+        )
+        spread = sum(manhattan(center, s) for s in stations)
+        if navigation is None:
+            cost = lambda cell: sum(manhattan(cell, s) for s in stations)
+            slack = 0
+        else:
+            cost = lambda cell: sum(navigation.station_cost(cell, s) for s in stations)
+            # Both ends stand on a tile next to their counter.
+            slack = 2 * k
+        # Triangle inequality: sum d(c, s) >= k * d(c, centre) - sum d(centre, s).
+        return self._search(center, cost, lambda d: k * d - spread - slack)
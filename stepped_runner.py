@@ -0,0 +1,45 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from cooperative_cuisine.action import Action
+
+# Environment time that passes per agent tick; matches a 30 FPS real-time loop.
+DEFAULT_FRAME = timedelta(seconds=1 / 30)
+
+
+def bind_actions(agent, env):
+    """Route the agent's actions straight into env instead of a socket/real-time loop."""
+
+    async def execute_action(action_type, action_data=None, duration=0.0, **kwargs):
+        env.perform_action(Action(agent.own_player_id, action_type, action_data, duration=duration))
+
+    agent._execute_action = execute_action
+
+
+async def run_stepped(agent, env, frame=DEFAULT_FRAME, max_ticks=None):
+    """Drive agent and env in lock-step on the environment's simulated clock.
+
+    Every tick does what the real-time loop does: read the player's state,
+    parse_state, manage_tasks, handle_task. The env is then advanced by
+    exactly one frame, so nothing waits on the wall clock and an episode
+    runs as fast as the CPU allows. Returns the number of ticks taken.
+    """
+    bind_actions(agent, env)
+    ticks = 0
+    while env.env_time < env.env_time_end:
+        if max_ticks is not None and ticks >= max_ticks:
+            break
+        state = json.loads(env.get_json_state(agent.own_player_id))
+        agent.parse_state(state)
+        await agent.manage_tasks(state)
+        if agent.current_task:
+            await agent.handle_task(state)
+        env.step(frame)
+        ticks += 1
+    return ticks
+
+
+def run_via_env_stepped(agent, env, frame=DEFAULT_FRAME, max_ticks=None):
+    """Synchronous counterpart of run_via_env_reference using lock-step time."""
+    return asyncio.run(run_stepped(agent, env, frame=frame, max_ticks=max_ticks))
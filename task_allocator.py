@@ -0,0 +1,269 @@
+# task_allocator.py
+
+from constants import TASK_POSITIONS
+from intention_broker import get_intention_manager
+from pipeline import (
+    DELIVER, IDLE, PLATE, Pipeline, chop_steps, collect_cook_steps, fetch_steps,
+    place_steps, plate_steps, serve_steps, start_cook_steps, step,
+)
+from scheduler import SECONDS_PER_STEP
+from state_model import INF
+
+CLAIM = "claim"
+# Added to the cost of a subtask for an agent that already gave it up this
+# round, so anyone else idle takes it first.
+FAILED_PENALTY = 1e6
+
+
+class Subtask:
+    """A self-contained slice of the recipe that one agent runs end to end.
+
+    priority is roughly how many seconds of the critical path the subtask
+    carries; the allocator prefers high-priority subtasks when there are
+    more subtasks than idle agents.
+    """
+
+    def __init__(self, name, rows, station, priority=0.0, after=()):
+        self.name = name
+        self.pipeline = Pipeline(rows + [step("DONE", IDLE)])
+        self.station = station
+        self.priority = priority
+        self.after = frozenset(after)
+
+    def __repr__(self):
+        return f"<Subtask {self.name}>"
+
+
+def burger_subtasks():
+    """The burger split so that its pieces can run on different agents."""
+    return [
+        Subtask("PLATE", plate_steps(), "PLATE_DISPENSER", priority=20.0),
+        Subtask("MEAT_START", [
+            *chop_steps("MEAT", "GET_MEAT", "CUTTING_BOARD_1"),
+            *start_cook_steps("MEAT", "PAN"),
+        ], "GET_MEAT", priority=14.0),
+        Subtask("LETTUCE", [
+            *chop_steps("LETTUCE", "GET_LETTUCE", "CUTTING_BOARD_1"),
+            *place_steps("LETTUCE"),
+        ], "GET_LETTUCE", priority=3.0),
+        Subtask("TOMATO", [
+            *chop_steps("TOMATO", "GET_TOMATO", "CUTTING_BOARD_1"),
+            *place_steps("TOMATO"),
+        ], "GET_TOMATO", priority=3.0),
+        Subtask("BUN", fetch_steps("BUN", "GET_BUN"), "GET_BUN", priority=1.0),
+        Subtask("MEAT_FINISH", [
+            *collect_cook_steps("MEAT", "PAN", "CookedPatty"),
+            *place_steps("MEAT"),
+            step("RETURN_PAN", DELIVER, "PAN"),
+        ], "PAN", after=("MEAT_START",)),
+        Subtask("SERVE", serve_steps()[:-1], PLATE,
+                after=("PLATE", "MEAT_FINISH", "LETTUCE", "TOMATO", "BUN")),
+    ]
+
+
+def greedy_assignment(cost):
+    """Cheapest remaining (row, column) pair first."""
+    pairs = sorted(
+        (c, i, j) for i, row in enumerate(cost) for j, c in enumerate(row)
+    )
+    rows, cols, result = set(), set(), []
+    for _, i, j in pairs:
+        if i not in rows and j not in cols:
+            rows.add(i)
+            cols.add(j)
+            result.append((i, j))
+    return sorted(result)
+
+
+def optimal_assignment(cost):
+    """Minimum-cost assignment (Hungarian method with potentials).
+
+    Works on rectangular matrices; every row is assigned when there are no
+    more rows than columns, otherwise every column is.
+    """
+    if not cost or not cost[0]:
+        return []
+    n, m = len(cost), len(cost[0])
+    if n > m:
+        transposed = [[cost[i][j] for i in range(n)] for j in range(m)]
+        return sorted((i, j) for j, i in optimal_assignment(transposed))
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # column -> row, 1-based, 0 = free
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        way = [0] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = match[j0], INF, 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    return sorted((match[j] - 1, j - 1) for j in range(1, m + 1) if match[j])
+
+
+ASSIGNMENT_METHODS = {"optimal": optimal_assignment, "greedy": greedy_assignment}
+
+
+class TaskAllocator:
+    """Shares one burger between the agents of a team.
+
+    Every agent runs its own allocator. Claims are intentions in the
+    IntentionManager (action "claim", target (round, subtask)), finished
+    subtasks are broadcast as messages, so all allocators see the same
+    picture and solve the same assignment: idle agents x unclaimed ready
+    subtasks, costed by walking time to the subtask's first station minus
+    its priority. Only idle agents are (re)assigned; running claims are
+    never moved. If two agents still claim the same subtask the lower id
+    keeps it. An agent that gives a subtask up (fail) broadcasts it, and
+    every allocator then prefers the other idle agents for it. The team is
+    every agent seen claiming or reporting, so players that do not take
+    part are never waited on. Call refresh() every tick so that news such
+    as the plate position reaches agents that are busy with a subtask.
+    """
+
+    def __init__(self, agent_id, subtasks=None, manager=None, navigation=None, method="optimal",
+                 task_positions=TASK_POSITIONS):
+        self.agent_id = agent_id
+        self.subtasks = subtasks if subtasks is not None else burger_subtasks()
+        self.by_name = {s.name: s for s in self.subtasks}
+        self.manager = manager or get_intention_manager()
+        self.navigation = navigation
+        self.task_positions = task_positions
+        self.assign = ASSIGNMENT_METHODS[method]
+        self.consumer_id = f"allocator-{agent_id}"
+        self.round = 0
+        self.done = set()
+        self.failed = {}
+        self.plate_pos = None
+        self.current = None
+        self.team = {agent_id}
+        self.manager.get_messages(self.consumer_id)
+
+    def refresh(self):
+        """Apply the messages the team sent since the last call."""
+        for entry in self.manager.get_messages(self.consumer_id):
+            message = entry["message"]
+            self.team.add(entry["from"])
+            if not isinstance(message, dict) or message.get("round") != self.round:
+                continue
+            if "done" in message:
+                self._mark_done(message["done"], message.get("plate"))
+            elif "failed" in message:
+                self.failed.setdefault(message["failed"], set()).add(entry["from"])
+
+    def _mark_done(self, name, plate=None):
+        if plate is not None:
+            self.plate_pos = plate
+        self.done.add(name)
+        if name == "SERVE":
+            self.round += 1
+            self.done = set()
+            self.failed = {}
+            self.plate_pos = None
+
+    def _claims(self):
+        """{agent_id: subtask name} for claims in the current round."""
+        claims = {}
+        for agent_id, intention in self.manager.get_all_intentions().items():
+            target = intention.target
+            if intention.action != CLAIM:
+                continue
+            self.team.add(agent_id)
+            if isinstance(target, (tuple, list)) and target[0] == self.round:
+                claims[agent_id] = target[1]
+        return claims
+
+    def _cost(self, player, subtask):
+        pos = player.get("pos")
+        penalty = FAILED_PENALTY if player["id"] in self.failed.get(subtask.name, ()) else 0.0
+        if subtask.station == PLATE:
+            target = self.plate_pos if self.plate_pos is not None else self.task_positions["SERVING_WINDOW"]
+        else:
+            target = self.task_positions[subtask.station]
+        steps = 0.0
+        if self.navigation is not None and pos is not None:
+            steps = self.navigation.travel_cost(pos, target)
+            if steps == INF:
+                steps = 1e6
+        return steps * SECONDS_PER_STEP - subtask.priority + penalty
+
+    def next_subtask(self, players):
+        """Claim and return the subtask this agent should run next, or None.
+
+        players is the state's player list; positions feed the cost matrix.
+        """
+        self.refresh()
+        claims = self._claims()
+        if self.agent_id in claims:
+            return None
+        claimed = set(claims.values())
+        ready = [
+            s for s in self.subtasks
+            if s.name not in self.done and s.name not in claimed and s.after <= self.done
+        ]
+        if not ready:
+            return None
+        idle = sorted(
+            (p for p in players if p["id"] in self.team and p["id"] not in claims),
+            key=lambda p: p["id"],
+        )
+        ids = [p["id"] for p in idle]
+        if self.agent_id not in ids:
+            return None
+        cost = [[self._cost(p, s) for s in ready] for p in idle]
+        mine = dict(self.assign(cost)).get(ids.index(self.agent_id))
+        if mine is None:
+            return None
+        subtask = ready[mine]
+        target = (self.round, subtask.name)
+        self.manager.update_intention(self.agent_id, CLAIM, target, "in_progress")
+        rivals = self.manager.agents_targeting(target)
+        if len(rivals) > 1 and min(rivals) != self.agent_id:
+            self.manager.clear_intention(self.agent_id)
+            return None
+        self.current = subtask
+        return subtask
+
+    def complete(self, plate=None):
+        """The current subtask finished; publish it and free this agent."""
+        subtask, self.current = self.current, None
+        if subtask is None:
+            return
+        if plate is not None:
+            plate = [float(c) for c in plate]
+        self.manager.broadcast_message(
+            self.agent_id, {"round": self.round, "done": subtask.name, "plate": plate}
+        )
+        self.manager.clear_intention(self.agent_id)
+        self.refresh()
+
+    def fail(self):
+        """Give the current subtask back so another idle agent can take it."""
+        subtask, self.current = self.current, None
+        if subtask is None:
+            return
+        self.manager.broadcast_message(self.agent_id, {"round": self.round, "failed": subtask.name})
+        self.manager.clear_intention(self.agent_id)
+        self.refresh()
+
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The modules live flat in the repository root.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Agents write intentions and cache layouts under ~/.cache by default;
+# keep test runs out of it. Read at import time, so set before any import.
+_scratch = tempfile.mkdtemp(prefix="mrbtp-tests-")
+os.environ.setdefault("MRBTP_INTENTIONS_FILE", os.path.join(_scratch, "intentions.json"))
+os.environ.setdefault("MRBTP_LAYOUT_CACHE", os.path.join(_scratch, "layouts"))
+
+# A small burger kitchen in .layout format.
+SMALL_LAYOUT = """\
+#QQ#TLBM#
+C_______#
+C_______#
+#_______W
+#PX######
+"""
+
+
+@pytest.fixture
+def small_layout(tmp_path):
+    path = tmp_path / "small.layout"
+    path.write_text(SMALL_LAYOUT)
+    return str(path)
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+
+from agent_scripts import agent_scripts, load_agent_class  # noqa: E402
+from batch_runner import episode_specs, run_batch, run_episode  # noqa: E402
+
+
+def test_registered_scripts_exist_and_load():
+    for name, script in agent_scripts().items():
+        assert script.is_file(), name
+        assert load_agent_class(name).__name__ in ("BTAgent", "FullBurgerAgent")
+
+
+@pytest.mark.parametrize("agent", sorted(agent_scripts()))
+def test_one_episode_in_the_simulator(small_layout, agent):
+    spec = next(episode_specs([agent], [small_layout], [3], 120.0, sim=True))
+    result = run_episode(spec)
+    assert "error" not in result, result.get("error")
+    assert result["steps"] > 0
+    assert result["burgers_served"] >= 1
+
+
+def test_batch_report_streams_every_episode(small_layout, tmp_path):
+    report = tmp_path / "report.jsonl"
+    specs = list(episode_specs(["FullBurgerAgent"], [small_layout], [0, 1], 30.0, sim=True))
+    results, summary = run_batch(specs, workers=2, report_path=report)
+    lines = [json.loads(line) for line in report.read_text().splitlines()]
+    assert len(results) == 2 and len(lines) == 3
+    assert lines[-1] == {"summary": summary}
+    assert summary[f"FullBurgerAgent/{small_layout}"]["errors"] == 0
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+
+from benchmark import check_baseline, compare, counted, percentile, timed  # noqa: E402
+
+
+class SleepyAgent:
+    def parse_state(self, state):
+        time.sleep(0.001)
+
+    async def manage_tasks(self, state):
+        time.sleep(0.001)
+
+
+def test_timed_excludes_later_wrappers():
+    agent = SleepyAgent()
+    latencies = []
+    timed(agent, latencies)
+    parse_state = agent.parse_state
+
+    def slow_observer(state):
+        parse_state(state)
+        time.sleep(0.02)
+
+    agent.parse_state = slow_observer
+    agent.parse_state({})
+    asyncio.run(agent.manage_tasks({}))
+    assert len(latencies) == 1
+    assert 2e6 <= latencies[0] < 15e6
+
+
+def test_compare_flags_regressions_only():
+    baseline = {"agents": {"A": {"ticks_per_second": 100.0, "latency_p50_us": 10.0}}}
+    results = {"agents": {"A": {"ticks_per_second": 95.0, "latency_p50_us": 20.0}}}
+    assert compare(results, baseline, 0.10) == ["A.latency_p50_us: 10 -> 20"]
+    assert percentile([1, 2, 3, 4], 50) == 3
+
+
+class HoardingAgent:
+    def __init__(self):
+        self.kept = []
+
+    def parse_state(self, state):
+        pass
+
+    async def manage_tasks(self, state):
+        self.kept.extend(object() for _ in range(1000))
+
+
+def test_counted_reports_blocks_not_bytes():
+    agent = HoardingAgent()
+    allocations = []
+    counted(agent, allocations)
+    agent.parse_state({})
+    asyncio.run(agent.manage_tasks({}))
+    # A thousand small objects are about a thousand blocks, whatever their size.
+    assert 900 <= allocations[0] < 1500
+
+
+def test_missing_baseline_fails(tmp_path, capsys):
+    results = {"agents": {"A": {"ticks_per_second": 100.0}}}
+    assert check_baseline(results, tmp_path / "missing.json", 0.1) == 2
+    assert "no baseline" in capsys.readouterr().err
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results))
+    assert check_baseline(results, baseline, 0.1) == 0
+    baseline.write_text(json.dumps({"agents": {"A": {"ticks_per_second": 200.0}}}))
+    assert check_baseline(results, baseline, 0.1) == 1
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+py_trees = pytest.importorskip("py_trees")
+
+from bt_agent import BTAgent, WaitForItem  # noqa: E402
+from kitchen_sim import KitchenSim, run_rollouts  # noqa: E402
+from recipe_compiler import DEFAULT_ITEM_INFO, RecipeBook  # noqa: E402
+
+SOUP_ITEM_INFO = dict(
+    DEFAULT_ITEM_INFO,
+    Pot={"type": "Equipment", "equipment": "Stove"},
+    TomatoSoup={"type": "Meal", "needs": ["Tomato", "Tomato"], "equipment": "Pot"},
+)
+
+
+def test_equipment_meal_waits_before_plating():
+    agent = BTAgent()
+    agent.load_recipes(RecipeBook(SOUP_ITEM_INFO))
+    names = [child.name for child in agent.tree_for("TomatoSoup").root.children]
+    assert names.index("Wait_TomatoSoup") < names.index("GetPlate") < names.index("Serve")
+    wait = agent.tree_for("TomatoSoup").root.children[names.index("Wait_TomatoSoup")]
+    waits = [node for node in wait.children if isinstance(node, WaitForItem)]
+    assert [(w.position, w.item_type) for w in waits] == [("POT", "TomatoSoup")]
+
+
+def test_burger_tree_collects_the_patty():
+    agent = BTAgent()
+    names = [child.name for child in agent.tree_for("Burger").root.children]
+    assert names[:2] == ["GetPlate", "PlacePlate"]
+    assert "Collect_CookedPatty" in names
+    assert names[-1] == "Serve"
+
+
+def test_published_position_is_not_the_parse_buffer():
+    agent = BTAgent()
+    state = {
+        "counters": [],
+        "players": [{"id": "0", "pos": [1.0, 2.0], "holding": None, "current_nearest_counter_id": None}],
+    }
+    agent.parse_state(state)
+    kept = agent.current_agent_pos
+    state["players"][0]["pos"] = [3.0, 2.0]
+    agent.parse_state(state)
+    assert kept.tolist() == [1.0, 2.0]
+    assert agent.current_agent_pos.tolist() == [3.0, 2.0]
+
+
+@pytest.mark.parametrize("players", [1, 2])
+def test_serves_burgers_in_the_simulator(small_layout, players):
+    sim = KitchenSim.from_layout_file(small_layout, players=players, seed=3, duration=120.0)
+    agents = []
+
+    def factory(**kwargs):
+        agents.append(BTAgent(**kwargs))
+        return agents[-1]
+
+    assert run_rollouts(sim, factory)[0] >= 1
+    # The pan went back to the stove after every patty.
+    assert all(not agent.held_item or agent.held_item.get("type") != "Pan" for agent in agents)
+
+
+class CountingTree:
+    """Stands in for the compiled tree: stays RUNNING and counts ticks."""
+
+    def __init__(self):
+        self.root = py_trees.behaviours.Running("Busy")
+        self.root.status = py_trees.common.Status.RUNNING
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+
+
+def _idle_agent():
+    agent = BTAgent()
+    agent.behaviour_tree = CountingTree()
+    agent.held_item = None
+    agent.nearest_counter = None
+    return agent
+
+
+def test_unchanged_fingerprint_skips_the_tick():
+    agent = _idle_agent()
+    for _ in range(5):
+        asyncio.run(agent.manage_tasks({}))
+    assert agent.behaviour_tree.ticks == 1
+    agent.held_item = {"type": "Bun"}
+    asyncio.run(agent.manage_tasks({}))
+    assert agent.behaviour_tree.ticks == 2
+
+
+def test_skipped_ticks_are_capped():
+    agent = _idle_agent()
+    agent.max_skipped_ticks = 3
+    for _ in range(1 + 3):
+        asyncio.run(agent.manage_tasks({}))
+    assert agent.behaviour_tree.ticks == 1
+    # Nothing changed, but the tree is ticked again after max_skipped_ticks.
+    asyncio.run(agent.manage_tasks({}))
+    assert agent.behaviour_tree.ticks == 2
+    for _ in range(3):
+        asyncio.run(agent.manage_tasks({}))
+    assert agent.behaviour_tree.ticks == 2
+
+
+def test_finished_tree_is_always_ticked():
+    agent = _idle_agent()
+    agent.behaviour_tree.root.status = py_trees.common.Status.SUCCESS
+    for _ in range(3):
+        asyncio.run(agent.manage_tasks({}))
+    assert agent.behaviour_tree.ticks == 3
@@ -0,0 +1,55 @@
+import pytest
+
+py_trees = pytest.importorskip("py_trees")
+
+from bt_profiler import TreeProfiler  # noqa: E402
+
+
+def _tree():
+    root = py_trees.composites.Sequence("Root", memory=False)
+    root.add_children([py_trees.behaviours.Success("Ready"), py_trees.behaviours.Running("Cook")])
+    return py_trees.trees.BehaviourTree(root)
+
+
+def test_summary_counts_ticks_statuses_and_transitions():
+    tree = _tree()
+    profiler = TreeProfiler(tree).enable()
+    for _ in range(3):
+        tree.tick()
+    by_path = {s.path: s for s in profiler.stats.values()}
+    assert set(by_path) == {"Root", "Root;Ready", "Root;Cook"}
+    root = by_path["Root"]
+    assert root.ticks == 3
+    assert root.statuses == {"RUNNING": 3}
+    assert root.transitions == {("INVALID", "RUNNING"): 1}
+    assert by_path["Root;Ready"].statuses == {"SUCCESS": 3}
+    assert root.cumulative_ns >= by_path["Root;Cook"].cumulative_ns
+
+    lines = profiler.summary().splitlines()
+    assert lines[0].split()[:2] == ["node", "ticks"]
+    # Sorted by cumulative time, so the root comes first.
+    assert lines[1].split()[:3] == ["Root", "3", "3"]
+    assert "INVALID->RUNNING:1" in lines[1]
+    assert len(lines) == 4
+
+
+def test_disable_restores_the_original_ticks():
+    tree = _tree()
+    profiler = TreeProfiler(tree).enable()
+    tree.tick()
+    profiler.disable()
+    assert not profiler.enabled
+    assert all("tick" not in node.__dict__ for node in tree.root.iterate())
+    tree.tick()
+    assert all(s.ticks == 1 for s in profiler.stats.values())
+    assert tree.root.status == py_trees.common.Status.RUNNING
+
+
+def test_attach_profiles_a_second_tree():
+    first, second = _tree(), _tree()
+    profiler = TreeProfiler(first).enable().attach(second)
+    second.tick()
+    ticked = [s.path for s in profiler.stats.values() if s.ticks]
+    assert sorted(ticked) == ["Root", "Root;Cook", "Root;Ready"]
+    profiler.disable()
+    assert all("tick" not in node.__dict__ for node in second.root.iterate())
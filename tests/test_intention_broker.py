@@ -0,0 +1,108 @@
+import os
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+from intention_broker import IntentionBroker, RemoteIntentionManager
+from intention_manager import Subscription
+
+
+@pytest.fixture
+def address(tmp_path):
+    return str(tmp_path / "run" / "intentions.sock")
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_remote_manager_mirrors_intentions(address):
+    broker = IntentionBroker(address).start()
+    try:
+        assert os.stat(os.path.dirname(address)).st_mode & 0o777 == 0o700
+        assert os.stat(address + ".key").st_mode & 0o777 == 0o600
+        writer = RemoteIntentionManager(address)
+        reader = RemoteIntentionManager(address)
+        writer.update_intention("0", "goto", (1, 2), "in_progress")
+        wait_for(lambda: "0" in reader.get_all_intentions())
+        assert reader.get_all_intentions()["0"].target == (1, 2)
+        assert reader.agents_targeting((1, 2)) == {"0"}
+        writer.close()
+        reader.close()
+    finally:
+        broker.close()
+    assert not os.path.exists(address)
+
+
+def test_wrong_authkey_is_rejected(address):
+    broker = IntentionBroker(address).start()
+    try:
+        with pytest.raises(AuthenticationError):
+            Client(address, family="AF_UNIX", authkey=b"wrong")
+        # The broker keeps serving honest clients.
+        RemoteIntentionManager(address).close()
+    finally:
+        broker.close()
+
+
+def test_refuses_a_live_socket(address):
+    broker = IntentionBroker(address).start()
+    try:
+        with pytest.raises(OSError):
+            IntentionBroker(address).start()
+    finally:
+        broker.close()
+
+
+def test_unsubscribe_shuts_down_executor(address):
+    broker = IntentionBroker(address).start()
+    try:
+        remote = RemoteIntentionManager(address)
+        received = []
+        subscription = remote.subscribe(received.append, mode=Subscription.THREAD)
+        executor = remote._executors[subscription]
+        remote.update_intention("0", "goto", (1, 2), "in_progress")
+        wait_for(lambda: received)
+        remote.unsubscribe(subscription)
+        assert executor._shutdown
+        remote.close()
+    finally:
+        broker.close()
+
+
+def test_stream_reconnects_after_broker_restart(address, monkeypatch):
+    monkeypatch.setenv("MRBTP_INTENTION_AUTHKEY", "fixed")
+    broker = IntentionBroker(address).start()
+    remote = RemoteIntentionManager(address)
+    remote.update_intention("0", "goto", (1, 2), "in_progress")
+    wait_for(lambda: "0" in remote.get_all_intentions())
+    broker.close()
+    broker = IntentionBroker(address).start()
+    try:
+        broker.manager.update_intention("1", "goto", (3, 4), "in_progress")
+        wait_for(lambda: remote.reconnects == 1)
+        assert set(remote.get_all_intentions()) == {"1"}
+        remote.update_intention("0", "goto", (5, 6), "in_progress")
+        assert broker.manager.get_all_intentions()["0"].target == (5, 6)
+        remote.close()
+    finally:
+        broker.close()
+
+
+def test_lost_broker_is_reported(address, monkeypatch):
+    monkeypatch.setattr("intention_broker.RECONNECT_ATTEMPTS", 1)
+    broker = IntentionBroker(address).start()
+    remote = RemoteIntentionManager(address)
+    broker.close()
+    wait_for(lambda: not remote.connected)
+    with pytest.raises(ConnectionError):
+        remote.get_all_intentions()
+    with pytest.raises(ConnectionError):
+        remote.update_intention("0", "goto", (1, 2), "in_progress")
+    remote.close()
@@ -0,0 +1,204 @@
+import asyncio
+import sys
+import threading
+
+import pytest
+
+from intention_manager import IntentionManager, IntentionSnapshot, MessageBus, Subscription
+
+
+def test_failing_subscriber_keeps_receiving(caplog):
+    manager = IntentionManager()
+    received = []
+
+    def callback(changes):
+        received.append(changes)
+        if len(received) == 1:
+            raise RuntimeError("boom")
+
+    manager.subscribe(callback)
+    manager.update_intention("0", "goto", (1, 2), "in_progress")
+    manager.update_intention("0", "goto", (3, 4), "in_progress")
+    assert [c["0"].target for c in received] == [(1, 2), (3, 4)]
+    assert "boom" in caplog.text
+
+
+def test_failing_async_subscriber_keeps_receiving():
+    async def run():
+        manager = IntentionManager()
+        received = []
+
+        async def callback(changes):
+            received.append(changes)
+            raise RuntimeError("boom")
+
+        manager.subscribe(callback, mode=Subscription.ASYNCIO)
+        manager.update_intention("0", "goto", (1, 2), "in_progress")
+        await asyncio.sleep(0.01)
+        manager.clear_intention("0")
+        await asyncio.sleep(0.01)
+        return received
+
+    received = asyncio.run(run())
+    assert [c["0"] for c in received][-1] is None
+
+
+def test_delivery_reads_latest_value():
+    manager = IntentionManager()
+    received = []
+    subscription = manager.subscribe(received.append)
+    manager.update_intention("0", "goto", (1, 2), "in_progress")
+    manager.update_intention("0", "goto", (3, 4), "in_progress")
+    # A stale push arriving late must not roll the subscriber back.
+    stale = received[0]["0"]
+    subscription.push("0", stale)
+    assert received[-1]["0"].target == (3, 4)
+
+
+def test_concurrent_writers_leave_subscriber_current():
+    manager = IntentionManager()
+    latest = {}
+    manager.subscribe(lambda changes: latest.update(changes), mode=Subscription.THREAD)
+
+    def write(agent_id):
+        for i in range(200):
+            manager.update_intention(agent_id, "goto", i, "in_progress")
+
+    threads = [threading.Thread(target=write, args=(str(n),)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    manager._executor.shutdown(wait=True)
+    assert {a: i.target for a, i in latest.items()} == {str(n): 199 for n in range(4)}
+
+
+def test_message_bus_cursors_are_independent():
+    bus = MessageBus(capacity=2)
+    bus.register("a")
+    bus.register("b")
+    for n in range(3):
+        bus.publish("0", n)
+    assert [m["message"] for m in bus.read("a")] == [1, 2]
+    assert bus.overruns["a"] == 1
+    bus.publish("0", 3)
+    assert [m["message"] for m in bus.read("a")] == [3]
+    assert [m["message"] for m in bus.read("b")] == [2, 3]
+
+
+def test_conflicts_follow_targets():
+    manager = IntentionManager()
+    manager.update_intention("0", "goto", [1, 1], "in_progress")
+    manager.update_intention("1", "goto", (1, 1), "in_progress")
+    assert manager.agents_targeting((1, 1)) == {"0", "1"}
+    assert manager.has_conflict([1, 1])
+    manager.clear_intention("1")
+    assert not manager.has_conflict((1, 1))
+    events = [e["message"]["event"] for e in manager.get_conflict_events("test")]
+    assert events == ["started", "resolved"]
+
+
+def test_conflict_events_arrive_in_write_order():
+    manager = IntentionManager(message_capacity=8192)
+    manager.update_intention("anchor", "goto", (1, 1), "in_progress")
+
+    def churn(agent_id):
+        for i in range(200):
+            manager.update_intention(agent_id, "goto", (1, 1), "in_progress")
+            manager.clear_intention(agent_id)
+
+    threads = [threading.Thread(target=churn, args=(str(n),)) for n in range(4)]
+    interval = sys.getswitchinterval()
+    # Switch threads as often as possible to shake out interleavings.
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    events = [e["message"] for e in manager.conflict_events.read("test", max_messages=None)]
+    assert events
+    versions = [e["version"] for e in events]
+    assert versions == sorted(versions)
+    # Replaying the stream never resolves a conflict that has not started.
+    active = False
+    for event in events:
+        if event["event"] == "started":
+            assert not active
+            active = True
+        elif event["event"] == "resolved":
+            assert active
+            active = False
+        else:
+            assert active and len(event["agents"]) >= 2
+    assert not active
+
+
+def test_every_consumer_needs_its_own_cursor():
+    manager = IntentionManager()
+    manager.broadcast_message("0", "hello")
+    assert [m["message"] for m in manager.get_messages("a")] == ["hello"]
+    assert [m["message"] for m in manager.get_messages("b")] == ["hello"]
+    assert manager.get_messages("a") == []
+    with pytest.raises(TypeError):
+        manager.get_messages()
+    with pytest.raises(ValueError):
+        manager.get_messages(None)
+
+
+def test_snapshots_are_isolated_from_later_writes():
+    manager = IntentionManager()
+    manager.update_intention("0", "goto", (1, 1), "in_progress")
+    before = manager.get_all_intentions()
+    manager.update_intention("0", "goto", (2, 2), "in_progress")
+    manager.update_intention("1", "pickup", (3, 3), "in_progress")
+    manager.clear_intention("0")
+    assert dict(before) == {"0": before["0"]} and before["0"].target == (1, 1)
+    after = manager.get_all_intentions()
+    assert set(after) == {"1"} and len(after) == 1
+    with pytest.raises(TypeError):
+        after["2"] = None
+
+
+def test_snapshot_shares_untouched_buckets():
+    snapshot = IntentionSnapshot()
+    for n in range(100):
+        snapshot = snapshot.set(str(n), n, n + 1)
+    changed = snapshot.set("0", -1, 101)
+    shared = sum(a is b for a, b in zip(snapshot._buckets, changed._buckets))
+    assert shared == IntentionSnapshot.BUCKETS - 1
+    assert snapshot["0"] == 0 and changed["0"] == -1
+
+
+def test_every_write_bumps_the_version():
+    manager = IntentionManager()
+    assert manager.version == 0
+    manager.update_intention("0", "goto", (1, 1), "in_progress")
+    manager.update_intention("0", "goto", (1, 1), "done")
+    manager.clear_intention("0")
+    assert manager.version == 3
+    # Clearing an agent without an intention is not a write.
+    manager.clear_intention("0")
+    assert manager.version == 3
+    assert manager.get_all_intentions().version == 3
+
+
+def test_changes_since():
+    manager = IntentionManager(history=4)
+    manager.update_intention("0", "goto", (1, 1), "in_progress")
+    manager.update_intention("1", "goto", (2, 2), "in_progress")
+    version, changes = manager.changes_since(0)
+    assert version == 2 and set(changes) == {"0", "1"}
+    manager.clear_intention("0")
+    manager.update_intention("1", "goto", (3, 3), "in_progress")
+    version, changes = manager.changes_since(2)
+    assert version == 4
+    assert changes["0"] is None and changes["1"].target == (3, 3)
+    assert manager.changes_since(4) == (4, {})
+    for n in range(5):
+        manager.update_intention("2", "goto", (n, n), "in_progress")
+    # Older than the retained history: the caller must take a fresh snapshot.
+    assert manager.changes_since(2) == (9, None)
@@ -0,0 +1,25 @@
+import json
+
+from intention_utils import IntentionWriter, load_intentions
+
+
+def test_writer_skips_unchanged_and_merges(tmp_path):
+    path = tmp_path / "nested" / "intentions.json"
+    writer = IntentionWriter(str(path), flush_interval=60)
+    try:
+        assert writer.record("0", {"step": "GET_PLATE"})
+        assert not writer.record("0", {"step": "GET_PLATE"})
+        assert writer.record("1", {"step": "GET_MEAT"})
+        writer.flush()
+        assert load_intentions(str(path)) == {"0": {"step": "GET_PLATE"}, "1": {"step": "GET_MEAT"}}
+        writer.record("0", {"step": "PLACE_PLATE"})
+    finally:
+        writer.close()
+    assert json.loads(path.read_text())["0"] == {"step": "PLACE_PLATE"}
+
+
+def test_missing_or_corrupt_file_reads_empty(tmp_path):
+    assert load_intentions(str(tmp_path / "absent.json")) == {}
+    bad = tmp_path / "bad.json"
+    bad.write_text("{")
+    assert load_intentions(str(bad)) == {}
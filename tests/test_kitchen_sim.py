@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+
+from kitchen_sim import KitchenSim, run_rollouts  # noqa: E402
+from stepped_runner import DEFAULT_FRAME  # noqa: E402
+from mrbtp_agent import FullBurgerAgent  # noqa: E402
+
+
+def _sim(path, **kwargs):
+    return KitchenSim.from_layout_file(path, players=2, duration=120.0, **kwargs)
+
+
+def test_kitchens_score_like_separate_runs(small_layout):
+    batch = run_rollouts(_sim(small_layout, kitchens=3, seed=3), FullBurgerAgent)
+    alone = [run_rollouts(_sim(small_layout, kitchens=1, seed=3 + i), FullBurgerAgent)[0] for i in range(3)]
+    assert batch == alone
+    assert any(batch)
+
+
+def test_default_kitchen_is_playable():
+    sim = KitchenSim(players=2, duration=120.0)
+    # Every station of the shipped layout can be reached from the floor.
+    assert run_rollouts(sim, FullBurgerAgent)[0] > 0
+
+
+def test_unchanged_counters_keep_their_dicts():
+    sim = KitchenSim(kitchens=2, players=1)
+    first = sim.state(0)
+    assert sim.state(0) is first
+    sim.step(DEFAULT_FRAME)
+    second = sim.state(0)
+    assert second is not first
+    assert all(a is b for a, b in zip(first["counters"], second["counters"]))
+    assert sim.state(1)["counters"][0] is not second["counters"][0]
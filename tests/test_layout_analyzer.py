@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import layout_analyzer
+from layout_analyzer import CACHE_VERSION, DEFAULT_LAYOUT_CHARS, layout_for_state, load_layout
+
+
+@pytest.fixture(autouse=True)
+def empty_memory(monkeypatch):
+    monkeypatch.setattr(layout_analyzer, "_memory", {})
+
+
+def _no_derive(counters):
+    raise AssertionError("layout derived again")
+
+
+def test_same_content_shares_one_entry(small_layout, tmp_path):
+    copy = tmp_path / "copy.layout"
+    copy.write_text(open(small_layout).read())
+    info = load_layout(small_layout, cache_dir=tmp_path / "cache")
+    assert load_layout(copy, cache_dir=tmp_path / "cache") is info
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == [f"{info.digest}.json"]
+    assert info.task_positions["SERVING_WINDOW"] == (8, 3)
+
+
+def test_disk_entry_is_used_by_a_new_process(small_layout, tmp_path, monkeypatch):
+    first = load_layout(small_layout, cache_dir=tmp_path)
+    monkeypatch.setattr(layout_analyzer, "_memory", {})
+    monkeypatch.setattr(layout_analyzer, "derive", _no_derive)
+    again = load_layout(small_layout, cache_dir=tmp_path)
+    assert again is not first
+    assert again.to_dict() == first.to_dict()
+
+
+def test_changed_layout_or_chars_get_a_new_key(small_layout, tmp_path):
+    info = load_layout(small_layout, cache_dir=tmp_path)
+    edited = tmp_path / "edited.layout"
+    edited.write_text(open(small_layout).read().replace("W", "#", 1).replace("C___", "C__W", 1))
+    moved = load_layout(edited, cache_dir=tmp_path)
+    assert moved.digest != info.digest
+    assert moved.task_positions["SERVING_WINDOW"] == (3, 1)
+    chars = dict(DEFAULT_LAYOUT_CHARS, W="Counter")
+    assert load_layout(small_layout, chars, cache_dir=tmp_path).digest not in (info.digest, moved.digest)
+    assert len(list(tmp_path.glob("*.json"))) == 3
+
+
+@pytest.mark.parametrize("content", [json.dumps({"version": CACHE_VERSION - 1}), "{not json"])
+def test_stale_or_broken_entries_are_rebuilt(small_layout, tmp_path, monkeypatch, content):
+    digest = load_layout(small_layout, cache_dir=tmp_path).digest
+    path = tmp_path / f"{digest}.json"
+    path.write_text(content)
+    monkeypatch.setattr(layout_analyzer, "_memory", {})
+    info = load_layout(small_layout, cache_dir=tmp_path)
+    assert info.task_positions["SERVING_WINDOW"] == (8, 3)
+    assert json.loads(path.read_text())["version"] == CACHE_VERSION
+
+
+def test_state_key_ignores_items_on_plain_counters(tmp_path):
+    state = {
+        "counters": [
+            {"type": "Counter", "pos": [0, 0], "occupied_by": None},
+            {"type": "Stove", "pos": [1, 0], "occupied_by": {"type": "Pan"}},
+            {"type": "TomatoDispenser", "pos": [2, 0], "occupied_by": None},
+            {"type": "ServingWindow", "pos": [3, 0], "occupied_by": None},
+        ]
+    }
+    info = layout_for_state(state, cache_dir=tmp_path)
+    assert set(info.task_positions) == {"PAN", "GET_TOMATO", "SERVING_WINDOW"}
+    state["counters"][0]["occupied_by"] = {"type": "Plate"}
+    assert layout_for_state(state, cache_dir=tmp_path) is info
+    state["counters"][1]["occupied_by"] = {"type": "Pot"}
+    assert layout_for_state(state, cache_dir=tmp_path).digest != info.digest
@@ -0,0 +1,21 @@
+import logging
+
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+
+from intention_manager import IntentionManager  # noqa: E402
+from mrbtp_agent import WAITING, FullBurgerAgent  # noqa: E402
+from pipeline import Pipeline  # noqa: E402
+
+
+def test_idle_is_logged_once_per_pipeline(caplog):
+    agent = FullBurgerAgent(intention_manager=IntentionManager())
+    agent.own_player_id = "0"
+    agent.pipeline = Pipeline(WAITING)
+    with caplog.at_level(logging.DEBUG, logger="mrbtp_agent"):
+        for _ in range(3):
+            agent._run_idle(agent.pipeline[0])
+        agent.pipeline = Pipeline(WAITING)
+        agent._run_idle(agent.pipeline[0])
+    assert [r.getMessage() for r in caplog.records] == ["Player 0: all done, idling"] * 2
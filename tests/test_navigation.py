@@ -0,0 +1,52 @@
+from constants import KITCHEN_POSITIONS, TASK_POSITIONS
+from navigation import INF, NavigationCache, accessible_positions, get_navigation
+
+# A floor cell in the open part of the shipped kitchen.
+FLOOR = (5, 6)
+
+
+def test_every_shipped_station_is_reachable():
+    navigation = get_navigation()
+    for key, pos in TASK_POSITIONS.items():
+        assert navigation.interaction_tiles(pos), key
+        assert navigation.travel_cost(FLOOR, pos) < INF, key
+
+
+def test_shipped_layout_only_loses_counters_on_aisles():
+    kept = {(p["x"], p["y"]) for p in accessible_positions(KITCHEN_POSITIONS, TASK_POSITIONS)}
+    dropped = {(p["x"], p["y"]) for p in KITCHEN_POSITIONS} - kept
+    assert dropped
+    stations = {tuple(pos) for pos in TASK_POSITIONS.values()}
+    assert not dropped & stations
+    navigation = get_navigation()
+    assert all(navigation.walkable(cell) for cell in dropped)
+    # Counters away from the stations stay put.
+    assert (5, 2) in kept and (14, 4) in kept
+
+
+def test_open_layout_is_left_alone():
+    kitchen = [{"x": x, "y": 0, "type": "counter"} for x in range(5)]
+    kitchen += [{"x": x, "y": 3, "type": "counter"} for x in range(5)]
+    tasks = {"GET_BUN": (2, 0)}
+    assert accessible_positions(kitchen, tasks) is kitchen
+
+
+def test_next_step_walks_the_shortest_path():
+    navigation = get_navigation()
+    target = TASK_POSITIONS["PAN"]
+    cell, steps = FLOOR, 0
+    while navigation.next_step(cell, target) is not None:
+        cell = navigation.next_step(cell, target)
+        steps += 1
+    assert steps == navigation.travel_cost(FLOOR, target)
+    assert navigation.travel_cost(cell, target) == 0
+    assert cell in navigation.interaction_tiles(target)
+
+
+def test_walled_in_station_gets_an_aisle():
+    kitchen = [{"x": x, "y": y, "type": "counter"} for y in range(3) for x in range(3)]
+    tasks = {"GET_BUN": (1, 0)}
+    kitchen = [p for p in kitchen if (p["x"], p["y"]) != (1, 0)]
+    kitchen += [{"x": x, "y": 4, "type": "counter"} for x in range(3)]
+    navigation = NavigationCache.from_positions(kitchen, tasks)
+    assert navigation.travel_cost((1, 3), tasks["GET_BUN"]) == 2
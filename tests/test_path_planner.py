@@ -0,0 +1,93 @@
+import pytest
+
+from intention_manager import IntentionManager
+from navigation import NavigationCache
+from path_planner import (
+    ARRIVED, DEFAULT_PLAYER_SPEED, WAIT, CooperativePlanner, ReservationTable, player_speed, step_seconds,
+)
+
+# Two-lane corridor: cells (1..5, 1..2) are free, everything around is a counter.
+WIDTH, HEIGHT = 7, 4
+FREE = {(x, y) for x in range(1, 6) for y in (1, 2)}
+BLOCKED = {(x, y) for x in range(WIDTH) for y in range(HEIGHT)} - FREE
+
+
+@pytest.fixture
+def navigation():
+    return NavigationCache(BLOCKED, WIDTH, HEIGHT)
+
+
+def walk(planners, starts, targets, steps=30):
+    """Teleport every agent to its next cell once per planner step."""
+    pos = dict(starts)
+    arrived = set()
+    for t in range(steps):
+        moves = {}
+        for agent_id, planner in planners.items():
+            step = planner.next_cell(agent_id, pos[agent_id], targets[agent_id], t * planner.seconds_per_step)
+            if step == ARRIVED:
+                arrived.add(agent_id)
+            elif step != WAIT:
+                moves[agent_id] = step
+        for a, cell in moves.items():
+            for b in moves:
+                assert not (b != a and cell == pos[b] and moves[b] == pos[a]), f"swap at step {t}"
+        pos.update(moves)
+        assert len(set(pos.values())) == len(pos), f"collision at step {t}: {pos}"
+        if arrived == set(planners):
+            return pos
+    raise AssertionError(f"not everyone arrived: {pos}")
+
+
+def test_agents_pass_each_other(navigation):
+    planner = CooperativePlanner(navigation, seconds_per_step=1.0)
+    planners = {"a": planner, "b": planner}
+    pos = walk(planners, {"a": (1, 1), "b": (5, 1)}, {"a": (6, 1), "b": (0, 1)})
+    assert pos == {"a": (5, 1), "b": (1, 1)}
+
+
+def test_separate_processes_share_reservations(navigation):
+    # Two planners with their own tables stand in for two agent processes
+    # publishing through one intention manager (the broker in deployment).
+    manager = IntentionManager()
+    planners = {
+        "a": CooperativePlanner(navigation, ReservationTable(manager), seconds_per_step=1.0),
+        "b": CooperativePlanner(navigation, ReservationTable(manager), seconds_per_step=1.0),
+    }
+    walk(planners, {"a": (1, 1), "b": (5, 1)}, {"a": (6, 1), "b": (0, 1)})
+    assert any(i.action == "reserve" for i in manager.get_all_intentions().values())
+
+
+def test_unshared_tables_do_not_coordinate(navigation):
+    planners = {
+        "a": CooperativePlanner(navigation, ReservationTable(), seconds_per_step=1.0),
+        "b": CooperativePlanner(navigation, ReservationTable(), seconds_per_step=1.0),
+    }
+    with pytest.raises(AssertionError, match="collision|swap"):
+        walk(planners, {"a": (1, 1), "b": (5, 1)}, {"a": (6, 1), "b": (0, 1)})
+
+
+def test_crossing_early_stays_on_plan(navigation):
+    planner = CooperativePlanner(navigation, seconds_per_step=1.0)
+    first = planner.next_cell("a", (1, 1), (6, 1), 0.0)
+    replans = planner.replans
+    # Rounded into the next cell before the step is over: keep centring on it.
+    assert planner.next_cell("a", first, (6, 1), 0.5) == first
+    assert planner.replans == replans
+
+
+def test_release_clears_shared_reservation(navigation):
+    manager = IntentionManager()
+    planner = CooperativePlanner(navigation, ReservationTable(manager), seconds_per_step=1.0)
+    planner.next_cell("a", (1, 1), (6, 1), 0.0)
+    assert "reserve:a" in manager.get_all_intentions()
+    planner.forget("a")
+    assert "reserve:a" not in manager.get_all_intentions()
+
+
+def test_step_length_follows_player_speed(tmp_path):
+    config = tmp_path / "environment_config.yaml"
+    config.write_text("player_config:\n  radius: 0.4\n  speed_units_per_seconds: 4\n")
+    assert player_speed(str(config)) == 4.0
+    assert step_seconds(str(config)) == 0.25
+    assert player_speed(str(tmp_path / "missing.yaml")) == DEFAULT_PLAYER_SPEED
@@ -0,0 +1,80 @@
+import itertools
+import random
+
+import pytest
+
+from pipeline import PLATE
+from route_optimizer import RouteOptimizer, row_stops
+
+START = "PLATE_DISPENSER"
+FINISH = (PLATE, "SERVING_WINDOW")
+
+
+class GridNavigation:
+    """Manhattan distances stand in for the layout's distance field."""
+
+    def station_cost(self, a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def _kitchen(seed, free_segments):
+    rng = random.Random(seed)
+    names = [START, "SERVING_WINDOW"] + [f"S{i}" for i in range(6)]
+    cells = rng.sample([(x, y) for x in range(10) for y in range(8)], len(names) + 4)
+    task_positions = dict(zip(names, cells))
+    candidates = cells[len(names):]
+    stations = names[2:]
+
+    def segment(name):
+        stops = rng.sample(stations, rng.randint(1, 3))
+        stops.insert(rng.randrange(len(stops) + 1), PLATE)
+        return name, tuple(stops)
+
+    fixed = [segment("fixed_a"), segment("fixed_b")]
+    free = [segment(f"free_{i}") for i in range(free_segments)]
+    return task_positions, candidates, fixed, free
+
+
+def _cost(navigation, task_positions, plate, slots):
+    stops = [START, PLATE]
+    for _, segment_stops in slots:
+        stops.extend(segment_stops)
+    stops.extend(FINISH)
+    cells = [plate if stop == PLATE else task_positions[stop] for stop in stops]
+    return sum(navigation.station_cost(a, b) for a, b in zip(cells, cells[1:]))
+
+
+def _brute_force(navigation, task_positions, plate, slots, free):
+    best = None
+    for chosen in itertools.permutations(free, slots.count(None)):
+        picks = iter(chosen)
+        filled = [slot if slot is not None else next(picks) for slot in slots]
+        cost = _cost(navigation, task_positions, plate, filled)
+        if best is None or cost < best:
+            best = cost
+    return best
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_plan_matches_brute_force(seed):
+    navigation = GridNavigation()
+    task_positions, candidates, (fixed_a, fixed_b), free = _kitchen(seed, free_segments=5)
+    # Fewer free slots than free segments, so choosing which ones run matters too.
+    slots = [fixed_a, None, None, fixed_b, None, None]
+    route = RouteOptimizer(navigation, task_positions, candidates)
+    ranked = route.plan(slots, free)
+    assert len(ranked) == len(candidates)
+    by_name = dict(free)
+    for cost, plate, order in ranked:
+        assert cost == _brute_force(navigation, task_positions, plate, slots, free)
+        picks = iter((name, by_name[name]) for name in order)
+        filled = [slot if slot is not None else next(picks) for slot in slots]
+        assert _cost(navigation, task_positions, plate, filled) == cost
+    assert [cost for cost, _, _ in ranked] == sorted(cost for cost, _, _ in ranked)
+    _, best_plate, best_order = ranked[0]
+    assert route.order_for(slots, free, best_plate) == best_order
+
+
+def test_row_stops_skips_repeated_stations():
+    rows = [{"pickup": "GET_BUN", "target": PLATE}, {"pickup": PLATE, "target": "SERVING_WINDOW"}, {"target": None}]
+    assert row_stops(rows) == ("GET_BUN", PLATE, "SERVING_WINDOW")
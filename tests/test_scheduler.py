@@ -0,0 +1,78 @@
+import pytest
+
+from navigation import get_navigation
+from recipe_compiler import DEFAULT_ITEM_INFO, RecipeBook
+from scheduler import COLLECT, PREP, START, Scheduler
+
+# Two cooks share the one pan and three chops share the one board.
+DOUBLE_ITEM_INFO = dict(
+    DEFAULT_ITEM_INFO,
+    FriedOnion={"type": "Ingredient", "needs": ["ChoppedOnion"], "equipment": "Pan", "seconds": 6.0},
+    ChoppedOnion={"type": "Ingredient", "needs": ["Onion"], "equipment": "CuttingBoard", "seconds": 2.0},
+    Onion={"type": "Ingredient"},
+    Deluxe={
+        "type": "Meal",
+        "needs": ["Bun", "ChoppedLettuce", "ChoppedTomato", "CookedPatty", "FriedOnion"],
+        "equipment": None,
+    },
+)
+
+
+def scheduler(item_info):
+    return Scheduler(RecipeBook(item_info), get_navigation())
+
+
+def overlaps(bookings):
+    by_station = {}
+    for station, since, until in bookings:
+        by_station.setdefault(station, []).append((since, until))
+    for spans in by_station.values():
+        spans.sort()
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            if start < end:
+                return True
+    return False
+
+
+def test_burger_starts_the_patty_and_preps_while_it_cooks():
+    segments = scheduler(DEFAULT_ITEM_INFO).schedule("Burger")
+    kinds = [(s.kind, s.need) for s in segments]
+    assert kinds[0] == (START, "CookedPatty")
+    assert kinds.index((COLLECT, "CookedPatty")) > kinds.index((PREP, "Bun"))
+    assert {need for kind, need in kinds if kind == PREP} == {"Bun", "ChoppedLettuce", "ChoppedTomato"}
+
+
+@pytest.mark.parametrize("item_info, meal", [(DEFAULT_ITEM_INFO, "Burger"), (DOUBLE_ITEM_INFO, "Deluxe")])
+def test_no_station_is_booked_twice(item_info, meal):
+    bookings = scheduler(item_info).bookings(meal)
+    assert not overlaps(bookings)
+    stations = {station for station, _, _ in bookings}
+    assert stations == {"CUTTING_BOARD_1", "PAN"}
+
+
+def test_board_is_booked_for_the_chop_and_the_pan_for_the_cook():
+    bookings = scheduler(DEFAULT_ITEM_INFO).bookings("Burger")
+    board = [until - since for station, since, until in bookings if station == "CUTTING_BOARD_1"]
+    assert sorted(board) == pytest.approx([3.0, 3.0, 4.0])
+    (pan,) = [until - since for station, since, until in bookings if station == "PAN"]
+    assert pan >= 10.0
+
+
+def test_second_cook_waits_for_the_pan():
+    segments = scheduler(DOUBLE_ITEM_INFO).schedule("Deluxe")
+    kinds = [(s.kind, s.need) for s in segments]
+    # The longest cook goes first; the second cannot start before it is collected.
+    assert kinds[0] == (START, "CookedPatty")
+    assert kinds.index((START, "FriedOnion")) > kinds.index((COLLECT, "CookedPatty"))
+    assert len(segments) == 7
+
+
+def test_equipment_meals_are_not_interleaved():
+    info = dict(
+        DEFAULT_ITEM_INFO,
+        Pot={"type": "Equipment", "equipment": "Stove"},
+        TomatoSoup={"type": "Meal", "needs": ["Tomato", "Tomato"], "equipment": "Pot"},
+    )
+    sched = scheduler(info)
+    assert [s.kind for s in sched.schedule("TomatoSoup")] == [PREP, PREP]
+    assert sched.bookings("TomatoSoup") == []
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from state_codec import DeltaDecoder, DeltaEncoder, available_codecs, get_codec
+
+
+def state(counters, players=(), time="t"):
+    return {"counters": list(counters), "players": list(players), "env_time": time, "score": 0}
+
+
+def counter(cid, item=None):
+    return {"id": cid, "pos": [0.0, 1.0], "occupied_by": item}
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_codec_round_trip(name):
+    codec = get_codec(name)
+    original = state([counter("a", {"type": "Plate", "content_list": []})], [{"id": "0", "pos": [1.5, 2.0]}])
+    assert codec.decode(codec.encode(original)) == original
+    # NumPy values from the agents are sent as plain numbers and lists.
+    assert codec.decode(codec.encode({"pos": np.array([1.0, 2.0]), "n": np.int64(3)})) == {"pos": [1.0, 2.0], "n": 3}
+
+
+def test_unknown_or_missing_codec():
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+    assert get_codec().name in available_codecs()
+
+
+def test_delta_round_trip():
+    encoder, decoder = DeltaEncoder(), DeltaDecoder()
+    first = state([counter("a"), counter("b")], [{"id": "0", "pos": [1, 1]}])
+    assert decoder.apply(encoder.encode(first, decoder.ack)) == first
+
+    second = state([counter("a", {"type": "Plate"})], [{"id": "0", "pos": [1, 2]}], time="u")
+    message = encoder.encode(second, decoder.ack)
+    assert message["base"] == 1
+    assert message["state"]["counters"] == [counter("a", {"type": "Plate"})]
+    assert message["state"]["removed_counters"] == ["b"]
+    assert decoder.apply(message) == second
+
+
+def test_delta_against_unknown_base_is_refused():
+    encoder, decoder = DeltaEncoder(history=1), DeltaDecoder()
+    decoder.apply(encoder.encode(state([counter("a")]), None))
+    stale = decoder.ack
+    for _ in range(3):
+        encoder.encode(state([counter("a")]), None)
+    # The acknowledged state fell out of the encoder's history: full state again.
+    assert encoder.encode(state([counter("a")]), stale)["base"] is None
+    # A delta built on a base the decoder does not hold is rejected.
+    assert decoder.apply({"seq": 9, "base": 7, "state": state([])}) is None
+    assert decoder.ack is None
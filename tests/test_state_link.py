@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+pytest.importorskip("websockets")
+
+from cooperative_cuisine.action import ActionType, InterActionData  # noqa: E402
+
+from state_codec import available_codecs, get_codec  # noqa: E402
+from state_link import RemoteSession, StateServer, action_from_message, action_message  # noqa: E402
+
+ACTIONS = [
+    (ActionType.MOVEMENT, np.array([0.6, -0.8]), 1 / 30),
+    (ActionType.PICK_UP_DROP, None, 0.0),
+    (ActionType.INTERACT, InterActionData.START, 0.0),
+    (ActionType.INTERACT, InterActionData.STOP, 0.0),
+]
+
+
+@pytest.mark.parametrize("name", available_codecs())
+@pytest.mark.parametrize("action_type, action_data, duration", ACTIONS)
+def test_action_round_trip(name, action_type, action_data, duration):
+    codec = get_codec(name)
+    action = action_from_message("0", codec.decode(codec.encode(action_message(action_type, action_data, duration))))
+    assert action.player == "0"
+    assert action.action_type == action_type
+    if action_type == ActionType.MOVEMENT:
+        assert np.allclose(action.action_data, action_data)
+    else:
+        assert action.action_data == action_data
+    assert action.duration == duration
+
+
+class FakeEnv:
+    def __init__(self, ticks):
+        self.env_time = 0
+        self.env_time_end = ticks
+        self.actions = []
+
+    def get_json_state(self, player_id):
+        counters = [{"id": "c", "pos": [0, 0], "occupied_by": None}]
+        return json.dumps({"counters": counters, "players": [{"id": player_id, "t": self.env_time}]})
+
+    def perform_action(self, action):
+        self.actions.append(action)
+
+    def step(self, frame):
+        self.env_time += 1
+
+
+class PickAgent:
+    own_player_id = "0"
+    current_task = True
+
+    def parse_state(self, state):
+        self.state = state
+
+    async def manage_tasks(self, state):
+        pass
+
+    async def handle_task(self, state):
+        await self._execute_action(action_type=ActionType.PICK_UP_DROP)
+
+
+def pipe():
+    queue = asyncio.Queue()
+    return queue.put, queue.get
+
+
+@pytest.mark.parametrize("name", available_codecs())
+@pytest.mark.parametrize("delta", [True, False])
+def test_session_against_server(name, delta):
+    async def run():
+        env = FakeEnv(ticks=3)
+        server = StateServer(env)
+        to_server, from_agent = pipe()
+        to_agent, from_server = pipe()
+        agent = PickAgent()
+        session = RemoteSession(agent, to_server, from_server, codec=name, delta=delta)
+
+        async def clock():
+            # One env tick per agent tick, so the test is deterministic.
+            while not server.ended():
+                await asyncio.sleep(0)
+                env.step(None)
+
+        await asyncio.gather(server.serve_connection(to_agent, from_agent), session.run(), clock())
+        return env, session
+
+    env, session = asyncio.run(run())
+    assert session.ticks >= 1
+    assert env.actions and all(a.action_type == ActionType.PICK_UP_DROP for a in env.actions)
@@ -0,0 +1,133 @@
+import numpy as np
+
+from constants import KITCHEN_POSITIONS, PLATE_STATIONS, TASK_POSITIONS
+from navigation import get_navigation
+from route_optimizer import plate_candidates
+from state_model import FreeCounterIndex, KitchenState
+
+
+def counter(cid, pos, occupied_by=None, kind="Counter"):
+    return {"id": cid, "type": kind, "pos": list(pos), "occupied_by": occupied_by}
+
+
+def player(pid, pos, holding=None):
+    return {"id": pid, "pos": list(pos), "holding": holding, "current_nearest_counter_id": None}
+
+
+def test_apply_only_replaces_changed_counters():
+    kitchen = KitchenState()
+    first = {"counters": [counter("a", (0, 0)), counter("b", (1, 0))], "players": []}
+    assert sorted(kitchen.apply(first)) == ["a", "b"]
+    version = kitchen.version
+    assert kitchen.apply(first) == []
+    assert kitchen.version == version
+    second = {"counters": [counter("a", (0, 0), {"type": "Plate"}), counter("b", (1, 0))]}
+    assert kitchen.apply(second) == ["a"]
+    assert kitchen.cell_version((0, 0)) == version + 1
+    assert not kitchen.is_free((0, 0)) and kitchen.is_free((1, 0))
+
+
+def test_apply_notices_progress_and_content_changes():
+    kitchen = KitchenState()
+    board = {"id": "i1", "type": "Tomato", "progress_percentage": 0.0}
+    plate = {"id": "i2", "type": "Plate", "content_list": [], "content_ready": None}
+    kitchen.apply({"counters": [counter("a", (0, 0), board), counter("b", (1, 0), plate)]})
+    assert kitchen.apply({"counters": [counter("a", (0, 0), dict(board, progress_percentage=40.0))]}) == ["a"]
+    full = dict(plate, content_list=[{"id": "i3", "type": "Bun"}])
+    assert kitchen.apply({"counters": [counter("b", (1, 0), full)]}) == ["b"]
+    # An equal copy is not a change.
+    assert kitchen.apply({"counters": [counter("b", (1, 0), dict(full))]}) == []
+
+
+class CountingDict(dict):
+    reads = 0
+
+    def get(self, key, default=None):
+        CountingDict.reads += 1
+        return super().get(key, default)
+
+
+def test_apply_skips_reused_counters_without_reading_them():
+    kitchen = KitchenState()
+    same = CountingDict(counter("a", (0, 0), {"id": "i1", "type": "Plate", "content_list": []}))
+    kitchen.apply({"counters": [same]})
+    CountingDict.reads = 0
+    # The delta decoder hands unchanged counters back as the same dict.
+    assert kitchen.apply({"counters": [same]}) == []
+    assert CountingDict.reads == 0
+
+
+def test_free_counters_within_distance_and_type():
+    kitchen = KitchenState()
+    kitchen.apply({"counters": [
+        counter("a", (0, 0)), counter("b", (3, 0)), counter("c", (1, 0), kind="CuttingBoard"),
+        counter("d", (0, 1), {"type": "Plate"}),
+    ]})
+    free = kitchen.free_counters_within((0, 0), 2)
+    assert free.tolist() == [[0.0, 0.0]]
+
+
+def test_player_pos_fills_the_buffer():
+    kitchen = KitchenState()
+    kitchen.apply({"players": [player("0", (2.5, 1.0))]})
+    out = np.zeros(2)
+    assert kitchen.player_pos("0", out)
+    assert out.tolist() == [2.5, 1.0]
+    assert not kitchen.player_pos("9", out)
+
+
+def free_index(*counters):
+    index = FreeCounterIndex()
+    for c in counters:
+        index.update(c)
+    return index
+
+
+def test_only_plain_counters_are_free():
+    index = free_index(
+        counter("a", (0, 0)), counter("t", (1, 0), kind="Trashcan"),
+        counter("w", (2, 0), kind="ServingWindow"), counter("p", (3, 0), kind="PlateDispenser"),
+    )
+    assert len(index) == 1
+    assert index.nearest((3, 0))["id"] == "a"
+
+
+def test_nearest_follows_occupancy():
+    index = free_index(counter("a", (0, 0)), counter("b", (5, 0)), counter("c", (9, 9)))
+    assert index.nearest((4, 1))["id"] == "b"
+    index.update(counter("b", (5, 0), {"type": "Plate"}))
+    assert index.nearest((4, 1))["id"] == "a"
+    index.update(counter("b", (5, 0)))
+    assert index.nearest((4, 1))["id"] == "b"
+    assert FreeCounterIndex().nearest((0, 0)) is None
+
+
+def test_nearest_matches_a_scan():
+    counters = [counter(f"{x}-{y}", (x, y)) for x in range(0, 15, 3) for y in range(0, 12, 4)]
+    index = free_index(*counters)
+    for pos in [(0, 0), (7, 5), (14, 11), (3, 9)]:
+        best = min(abs(c["pos"][0] - pos[0]) + abs(c["pos"][1] - pos[1]) for c in counters)
+        found = index.nearest(pos)
+        assert abs(found["pos"][0] - pos[0]) + abs(found["pos"][1] - pos[1]) == best
+
+
+def test_best_for_stations_by_walking_distance():
+    navigation = get_navigation()
+    free = [p for p in plate_candidates(KITCHEN_POSITIONS, TASK_POSITIONS)]
+    index = free_index(*(counter(f"c{x}-{y}", (x, y)) for x, y in free))
+    stations = [TASK_POSITIONS[name] for name in PLATE_STATIONS]
+    found = index.best_for_stations(stations, navigation)
+    assert found is not None
+
+    def total(cell):
+        return sum(navigation.station_cost(cell, s) for s in stations)
+
+    assert total(tuple(found["pos"])) == min(total(cell) for cell in free)
+
+
+def test_best_for_stations_skips_unreachable_stations():
+    navigation = get_navigation()
+    index = free_index(counter("near", (2, 4)), counter("far", (13, 4)))
+    # (5, 2) is solid counter on every side; it must not spoil the sum.
+    found = index.best_for_stations([TASK_POSITIONS["PAN"], (5, 2)], navigation)
+    assert found["id"] == "near"
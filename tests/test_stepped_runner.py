@@ -0,0 +1,100 @@
+import asyncio
+import json
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+
+from intention_manager import IntentionManager  # noqa: E402
+from kitchen_sim import make_sim_environment  # noqa: E402
+from mrbtp_agent import FullBurgerAgent  # noqa: E402
+from stepped_runner import DEFAULT_FRAME, run_stepped  # noqa: E402
+
+TICKS = 300
+
+
+def _action(player, action_type, action_data, duration):
+    if hasattr(action_data, "tolist"):
+        action_data = action_data.tolist()
+    return player, action_type, action_data, duration
+
+
+class RecordingEnv:
+    """Wraps an environment and keeps every state handed to the agent."""
+
+    def __init__(self, env):
+        self.env = env
+        self.states = []
+
+    @property
+    def env_time(self):
+        return self.env.env_time
+
+    @property
+    def env_time_end(self):
+        return self.env.env_time_end
+
+    def get_json_state(self, player_id):
+        state = self.env.get_json_state(player_id)
+        self.states.append(state)
+        return state
+
+    def perform_action(self, action):
+        self.env.perform_action(action)
+
+    def step(self, frame):
+        self.env.step(frame)
+
+
+class ReplayEnv:
+    """Hands out a fixed state sequence, one per step, and records actions."""
+
+    def __init__(self, states):
+        self.states = states
+        self.actions = []
+        self.env_time = timedelta(0)
+        self.env_time_end = DEFAULT_FRAME * len(states)
+
+    def get_json_state(self, player_id):
+        return self.states[round(self.env_time / DEFAULT_FRAME)]
+
+    def perform_action(self, action):
+        self.actions.append(_action(action.player, action.action_type, action.action_data, action.duration))
+
+    def step(self, frame):
+        self.env_time += frame
+
+
+def _agent():
+    return FullBurgerAgent(intention_manager=IntentionManager())
+
+
+async def _normal_loop(agent, states):
+    """What the real-time loop does for every state message it receives."""
+    actions = []
+
+    async def execute_action(action_type, action_data=None, duration=0.0, **kwargs):
+        actions.append(_action(agent.own_player_id, action_type, action_data, duration))
+
+    agent._execute_action = execute_action
+    for message in states:
+        state = json.loads(message)
+        agent.parse_state(state)
+        await agent.manage_tasks(state)
+        if agent.current_task:
+            await agent.handle_task(state)
+    return actions
+
+
+def test_stepped_run_acts_like_the_normal_loop(small_layout):
+    recording = RecordingEnv(make_sim_environment(small_layout, seed=3, duration=120.0))
+    asyncio.run(run_stepped(_agent(), recording, max_ticks=TICKS))
+    states = recording.states
+    assert len(states) == TICKS
+
+    replay = ReplayEnv(states)
+    assert asyncio.run(run_stepped(_agent(), replay)) == TICKS
+    expected = asyncio.run(_normal_loop(_agent(), states))
+    assert expected
+    assert replay.actions == expected
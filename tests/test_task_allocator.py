@@ -0,0 +1,92 @@
+import pytest
+
+from intention_manager import IntentionManager
+from task_allocator import (
+    FAILED_PENALTY, TaskAllocator, burger_subtasks, greedy_assignment, optimal_assignment,
+)
+
+PLAYERS = [{"id": "0", "pos": [1, 1]}, {"id": "1", "pos": [2, 1]}, {"id": "2", "pos": [3, 1]}]
+
+
+@pytest.fixture
+def team():
+    manager = IntentionManager()
+    return [TaskAllocator(p["id"], manager=manager) for p in PLAYERS]
+
+
+def claim_all(team):
+    return {a.agent_id: a.next_subtask(PLAYERS) for a in team}
+
+
+def test_idle_agents_split_the_ready_subtasks(team):
+    # The first call only reveals the team; the second one assigns.
+    claim_all(team)
+    for allocator in team:
+        allocator.manager.clear_intention(allocator.agent_id)
+        allocator.current = None
+    claimed = claim_all(team)
+    names = [s.name for s in claimed.values() if s is not None]
+    assert len(names) == len(set(names)) == 3
+    assert "PLATE" in names
+
+
+def test_plate_position_reaches_busy_teammates(team):
+    plate_agent = lettuce_agent = None
+    claim_all(team)
+    for allocator in team:
+        if allocator.current and allocator.current.name == "PLATE":
+            plate_agent = allocator
+        elif allocator.current:
+            lettuce_agent = allocator
+    assert plate_agent is not None and lettuce_agent is not None
+    assert lettuce_agent.plate_pos is None
+    plate_agent.complete(plate=(4.0, 2.0))
+    # Still busy with its own subtask: refresh() alone must deliver the plate.
+    lettuce_agent.refresh()
+    assert lettuce_agent.plate_pos == [4.0, 2.0]
+    assert "PLATE" in lettuce_agent.done
+
+
+def test_failed_subtask_goes_to_another_agent(team):
+    claim_all(team)
+    quitter = next(a for a in team if a.current is not None)
+    name = quitter.current.name
+    quitter.fail()
+    assert quitter.current is None
+    assert quitter.agent_id not in {a for a, i in quitter.manager.get_all_intentions().items()}
+    others = [a for a in team if a is not quitter]
+    for allocator in others:
+        allocator.refresh()
+        assert allocator.failed[name] == {quitter.agent_id}
+    # The quitter is idle again, but the penalty keeps it off its old subtask.
+    subtask = quitter.next_subtask(PLAYERS)
+    assert subtask is None or subtask.name != name
+    by_name = {s.name: s for s in burger_subtasks()}
+    assert quitter._cost(PLAYERS[0], by_name[name]) > FAILED_PENALTY / 2
+
+
+def test_serve_starts_a_new_round(team):
+    allocator = team[0]
+    allocator.plate_pos = [1, 2]
+    allocator.failed = {"BUN": {"1"}}
+    allocator._mark_done("SERVE")
+    assert allocator.round == 1
+    assert allocator.plate_pos is None and not allocator.done and not allocator.failed
+
+
+@pytest.mark.parametrize("cost", [
+    [[4, 1, 3], [2, 0, 5], [3, 2, 2]],
+    [[1, 9], [9, 1], [5, 5]],
+    [[7, 3, 1, 8]],
+])
+def test_optimal_assignment_beats_greedy(cost):
+    def total(pairs):
+        return sum(cost[i][j] for i, j in pairs)
+
+    optimal = optimal_assignment(cost)
+    assert len(optimal) == min(len(cost), len(cost[0]))
+    assert total(optimal) <= total(greedy_assignment(cost))
+
+
+def test_optimal_assignment_finds_the_minimum():
+    assert optimal_assignment([[4, 1, 3], [2, 0, 5], [3, 2, 2]]) == [(0, 1), (1, 0), (2, 2)]
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("cooperative_cuisine")
+
+from state_codec import available_codecs  # noqa: E402
+from trace_log import TraceReader, TraceRecorder, record, replay  # noqa: E402
+
+
+class Task:
+    def __init__(self, task_type, task_args=None):
+        self.task_type = task_type
+        self.task_args = task_args
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.records = []
+
+    def record(self, agent_id, intention):
+        self.records.append((agent_id, intention))
+        return True
+
+
+class StepAgent:
+    """Goes to the x coordinate it sees in the state; writes its step like FullBurgerAgent."""
+
+    own_player_id = "0"
+
+    def __init__(self):
+        self.current_task = None
+        self.pipeline_step = "START"
+        self.intention_writer = RecordingWriter()
+
+    def parse_state(self, state):
+        self.x = state["x"]
+
+    async def manage_tasks(self, state):
+        self.pipeline_step = f"STEP_{self.x}"
+        self.current_task = Task("GOTO", [self.x, 1])
+        self.intention_writer.record(self.own_player_id, {"step": self.pipeline_step})
+
+    async def handle_task(self, state):
+        self.current_task = None
+
+    async def _execute_action(self, *args, **kwargs):
+        raise AssertionError("replay must not act")
+
+
+def record_ticks(path, codec, ticks=5):
+    agent = StepAgent()
+    with TraceRecorder(path, codec=codec) as recorder:
+        record(agent, recorder)
+
+        async def run():
+            for x in range(ticks):
+                state = {"x": x}
+                agent.parse_state(state)
+                await agent.manage_tasks(state)
+        asyncio.run(run())
+    return agent
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_record_read_and_replay(tmp_path, codec):
+    path = tmp_path / "run.trace"
+    record_ticks(path, codec)
+    reader = TraceReader(path)
+    try:
+        assert len(reader) == 5
+        assert reader[2]["args"] == [2, 1] and reader[2]["status"] == "STEP_2"
+    finally:
+        reader.close()
+    agent = StepAgent()
+    live_writer = agent.intention_writer
+    assert replay(agent, path) == []
+    assert live_writer.records == []
+
+
+def test_truncated_tail_is_skipped(tmp_path):
+    path = tmp_path / "run.trace"
+    record_ticks(path, "json")
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    reader = TraceReader(path)
+    assert len(reader) == 4
+    reader.close()
+
+
+@pytest.mark.parametrize("content", [b"", b"MRBTP", b"NOTATRACEFILE", b"MRBTPTRC\x09js"])
+def test_not_a_trace(tmp_path, content):
+    path = tmp_path / "bad.trace"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match="not a trace file"):
+        TraceReader(path)
@@ -0,0 +1,215 @@
+# trace_log.py
+
+import argparse
+import asyncio
+import mmap
+import os
+import struct
+import time
+
+from agent_scripts import agent_scripts, load_agent_class
+from batch_runner import make_environment
+from intention_manager import IntentionManager
+from intention_utils import NullIntentionWriter
+from state_codec import available_codecs, get_codec
+from stepped_runner import run_via_env_stepped
+
+MAGIC = b"MRBTPTRC"
+LENGTH = struct.Struct("<I")
+# Prefer the compact binary codec when it is installed.
+DEFAULT_CODEC = "msgpack" if "msgpack" in available_codecs() else None
+
+
+def decision(agent):
+    """(task type, task args, status) the agent settled on this tick.
+
+    status is the behaviour tree's root status and running leaf for
+    BTAgent, the pipeline step for FullBurgerAgent.
+    """
+    task = agent.current_task
+    tree = getattr(agent, "behaviour_tree", None)
+    if tree is not None:
+        tip = tree.root.tip()
+        status = f"{tree.root.status.name}:{tip.name if tip is not None else ''}"
+    else:
+        status = getattr(agent, "pipeline_step", None)
+    if task is None:
+        return None, None, status
+    return task.task_type, task.task_args, status
+
+
+class TraceRecorder:
+    """Append-only log of (state, decision) records, one per tick.
+
+    The file starts with MAGIC and the codec name; every record is a
+    4-byte little-endian length followed by the encoded record. Records go
+    through a buffered append, so a tick costs one encode and a memcpy; a
+    crash loses at most the unflushed tail, which the reader skips.
+    """
+
+    def __init__(self, path, codec=DEFAULT_CODEC):
+        self.codec = get_codec(codec)
+        self.file = open(path, "wb")
+        name = self.codec.name.encode()
+        self.file.write(MAGIC + bytes([len(name)]) + name)
+        self.ticks = 0
+
+    def write(self, state, agent):
+        task_type, task_args, status = decision(agent)
+        payload = self.codec.encode({
+            "tick": self.ticks, "state": state, "task": task_type, "args": task_args, "status": status,
+        })
+        self.file.write(LENGTH.pack(len(payload)))
+        self.file.write(payload)
+        self.ticks += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record(agent, recorder):
+    """Wrap the agent so every parse_state/manage_tasks pair is logged."""
+    parse_state = agent.parse_state
+    manage_tasks = agent.manage_tasks
+    current = [None]
+
+    def recorded_parse_state(state):
+        current[0] = state
+        parse_state(state)
+
+    async def recorded_manage_tasks(state):
+        await manage_tasks(state)
+        recorder.write(current[0], agent)
+
+    agent.parse_state = recorded_parse_state
+    agent.manage_tasks = recorded_manage_tasks
+    return agent
+
+
+class TraceReader:
+    """Memory-mapped view of a trace; records are decoded on access."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        # A recorder that died before writing its header leaves an empty
+        # file, which mmap cannot map.
+        if os.fstat(self.file.fileno()).st_size <= len(MAGIC):
+            self.file.close()
+            raise ValueError(f"{path} is not a trace file")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        size = self.map[len(MAGIC)]
+        start = len(MAGIC) + 1
+        if self.map[: len(MAGIC)] != MAGIC or len(self.map) < start + size:
+            self.close()
+            raise ValueError(f"{path} is not a trace file")
+        self.codec = get_codec(self.map[start:start + size].decode())
+        self.offsets = self._index(start + size)
+
+    def _index(self, offset):
+        offsets = []
+        end = len(self.map)
+        while offset + LENGTH.size <= end:
+            (length,) = LENGTH.unpack_from(self.map, offset)
+            if offset + LENGTH.size + length > end:
+                break  # truncated last record
+            offsets.append((offset + LENGTH.size, length))
+            offset += LENGTH.size + length
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        offset, length = self.offsets[i]
+        return self.codec.decode(self.map[offset:offset + length])
+
+    def __iter__(self):
+        for i in range(len(self.offsets)):
+            yield self[i]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+async def replay_async(agent, reader):
+    """Feed every recorded state through the agent as fast as the CPU allows.
+
+    Actions are dropped: the effect of each one is already in the next
+    recorded state, and so are intention file writes, which would
+    otherwise clobber the live file. Claims and path reservations go to a
+    private IntentionManager rather than the shared one. Returns the ticks
+    whose decision differs from the recording as (tick, recorded, replayed).
+    """
+
+    async def execute_action(*args, **kwargs):
+        pass
+
+    agent._execute_action = execute_action
+    if hasattr(agent, "intention_writer"):
+        agent.intention_writer = NullIntentionWriter()
+    if hasattr(agent, "intention_manager"):
+        # Read when the allocator and the layout's planner are created on the first states.
+        agent.intention_manager = IntentionManager()
+    codec = reader.codec
+    mismatches = []
+    for entry in reader:
+        state = entry["state"]
+        agent.parse_state(state)
+        await agent.manage_tasks(state)
+        recorded = (entry["task"], entry["args"], entry["status"])
+        # Round-trip through the codec so NumPy task args compare as lists.
+        replayed = tuple(codec.decode(codec.encode(list(decision(agent)))))
+        if replayed != recorded:
+            mismatches.append((entry["tick"], recorded, replayed))
+        if agent.current_task:
+            await agent.handle_task(state)
+    return mismatches
+
+
+def replay(agent, path):
+    reader = TraceReader(path)
+    try:
+        return asyncio.run(replay_async(agent, reader))
+    finally:
+        reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record an episode or replay a recorded one.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="run a stepped episode and record it")
+    rec.add_argument("--agent", default="MRBTPAgent", choices=sorted(agent_scripts()))
+    rec.add_argument("--layout", default="basic")
+    rec.add_argument("--seed", type=int, default=0)
+    rec.add_argument("--duration", type=float, default=200)
+    rec.add_argument("--codec", default=DEFAULT_CODEC)
+    rec.add_argument("trace")
+    rep = sub.add_parser("replay", help="replay a trace and report diverging decisions")
+    rep.add_argument("--agent", default="MRBTPAgent", choices=sorted(agent_scripts()))
+    rep.add_argument("trace")
+    args = parser.parse_args()
+
+    agent = load_agent_class(args.agent)()
+    agent.own_player_id = "0"
+    if args.command == "record":
+        with TraceRecorder(args.trace, codec=args.codec) as recorder:
+            record(agent, recorder)
+            run_via_env_stepped(agent, make_environment(args.layout, args.seed, args.duration))
+        print(f"Recorded {recorder.ticks} ticks to {args.trace}")
+        return
+    started = time.perf_counter()
+    mismatches = replay(agent, args.trace)
+    print(f"Replayed in {time.perf_counter() - started:.2f}s, {len(mismatches)} diverging ticks")
+    for tick, recorded, replayed in mismatches[:20]:
+        print(f"  tick {tick}: recorded {recorded}, replayed {replayed}")
+
+
+if __name__ == "__main__":
+    main()